@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+/embeddings 输出格式基准
+对比JSON浮点数组（EmbeddingResponse + tolist）与 base64 / .npy 各数据类型的
+序列化耗时、响应体大小和反量化误差
+
+用法:
+    python scripts/benchmark_embedding_output.py [--texts 1000] [--dim 384] [--repeat 5]
+"""
+
+import argparse
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.schemas import EmbeddingBinaryResponse, EmbeddingBuffer, EmbeddingResponse  # noqa: E402
+from src.transport import (  # noqa: E402
+    EMBEDDING_DTYPES, decode_embedding_buffer, encode_base64, encode_npy, quantize_embeddings
+)
+
+
+def render(content) -> bytes:
+    """与 JSONResponse.render 相同的JSON序列化"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def encode_json(embeddings: np.ndarray) -> bytes:
+    response = EmbeddingResponse(
+        embeddings=embeddings.tolist(), model_name="benchmark", dimensions=embeddings.shape[1], processing_time=0.0
+    )
+    return render(response.model_dump())
+
+
+def encode_base64_envelope(embeddings: np.ndarray, dtype: str) -> bytes:
+    vectors, scale = quantize_embeddings(embeddings, dtype)
+    response = EmbeddingBinaryResponse(
+        embeddings=EmbeddingBuffer(data=encode_base64(vectors), shape=list(vectors.shape), dtype=dtype, scale=scale),
+        model_name="benchmark", dimensions=vectors.shape[1], processing_time=0.0
+    )
+    return render(response.model_dump())
+
+
+def encode_npy_body(embeddings: np.ndarray, dtype: str) -> bytes:
+    vectors, _ = quantize_embeddings(embeddings, dtype)
+    return encode_npy(vectors)
+
+
+def measure(fn, repeat: int):
+    """返回结果与最快一轮的耗时（秒）"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="/embeddings 输出格式基准")
+    parser.add_argument("--texts", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(args.texts, args.dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    body, json_seconds = measure(lambda: encode_json(embeddings), args.repeat)
+    json_size = len(body)
+    rows = [("json", "float32", json_seconds, json_size, 0.0)]
+
+    for dtype in EMBEDDING_DTYPES:
+        body, seconds = measure(lambda: encode_base64_envelope(embeddings, dtype), args.repeat)
+        buffer = json.loads(body)["embeddings"]
+        decoded = decode_embedding_buffer(buffer["data"], buffer["shape"], buffer["dtype"], buffer["scale"])
+        rows.append(("base64", dtype, seconds, len(body), float(np.max(np.abs(decoded - embeddings)))))
+
+        body, seconds = measure(lambda: encode_npy_body(embeddings, dtype), args.repeat)
+        decoded = np.load(io.BytesIO(body)).astype(np.float32)
+        if dtype == "int8":
+            decoded *= np.float32(quantize_embeddings(embeddings, dtype)[1])
+        rows.append(("npy", dtype, seconds, len(body), float(np.max(np.abs(decoded - embeddings)))))
+
+    print(f"=== /embeddings 输出 ({args.texts} × {args.dim}) ===")
+    print(f"{'编码':<8}{'类型':<9}{'序列化(ms)':>12}{'加速':>8}{'大小(KB)':>11}{'体积比':>8}{'最大误差':>12}")
+    for encoding, dtype, seconds, size, error in rows:
+        print(
+            f"{encoding:<8}{dtype:<9}{seconds * 1000:>12.2f}{json_seconds / seconds:>7.0f}x"
+            f"{size / 1024:>11.1f}{size / json_size:>8.2f}{error:>12.2e}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
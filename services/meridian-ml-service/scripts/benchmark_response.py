@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+聚类响应构建基准
+对比原响应路径（convert_numpy_types递归转换 → 逐项校验构建ClusterInfo/BaseClusteringResponse →
+FastAPI按response_model重新校验并序列化）与快速路径（NumPy数组 + model_construct + orjson）
+从聚类结果到响应字节的耗时，并检查两者解析后的内容一致；另列出 response_mode=compact 的耗时与体积
+
+用法:
+    python scripts/benchmark_response.py [--items 10000] [--clusters 40] [--reduced-dim 10] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from src.clustering import analyze_cluster_content, convert_numpy_types  # noqa: E402
+from src.pipeline import ContentAnalysisStage  # noqa: E402
+from src.responses import ORJSON_AVAILABLE, FastJSONResponse  # noqa: E402
+from src.schemas import (  # noqa: E402
+    BaseClusteringResponse, ClusterInfo, ClusteringStats, CompactClusteringResponse, ContentAnalysisConfig,
+    OptimizationResult
+)
+
+
+def make_pipeline_data(n_items: int, n_clusters: int, reduced_dim: int) -> dict:
+    """模拟ClusteringStage的输出（标签与降维坐标为NumPy数组）"""
+    rng = np.random.default_rng(0)
+    labels = rng.integers(-1, n_clusters, n_items).astype(np.int64)
+    reduced = rng.normal(size=(n_items, reduced_dim)).astype(np.float32)
+    texts = [f"Title {i}" for i in range(n_items)]
+    metadata = [
+        {"id": i, "source": "ai_worker", "original_format": "ai_worker_embedding", "title": texts[i],
+         "url": f"https://example.com/{i}", "publish_date": None, "status": None}
+        for i in range(n_items)
+    ]
+    clustered = labels[labels >= 0]
+    ids, sizes = np.unique(clustered, return_counts=True)
+    n_outliers = int(np.sum(labels == -1))
+    return {
+        "cluster_labels": labels,
+        "reduced_embeddings": reduced,
+        "membership_strengths": np.where(labels >= 0, rng.uniform(0.5, 1.0, n_items), 0.0).astype(np.float32),
+        "item_indices": None,
+        "clustering_stats": {
+            "n_samples": n_items, "n_clusters": len(ids), "n_outliers": n_outliers,
+            "outlier_ratio": n_outliers / n_items,
+            "cluster_sizes": {int(label): int(size) for label, size in zip(ids, sizes)},
+            "dbcv_score": 0.5, "pre_reduction_explained_variance": None,
+        },
+        "config_used": {"umap_n_components": reduced_dim, "hdbscan_min_cluster_size": 5},
+        "optimization": {"used": False},
+        "cluster_content": analyze_cluster_content(texts, labels),
+        "texts": texts,
+        "metadata": metadata,
+        "items_info": {"total_items": n_items, "data_type": "ai_worker_embedding"},
+    }
+
+
+def legacy_response(data: dict, top_n: int) -> bytes:
+    """原响应路径：结果先转为Python列表，逐项校验构建模型，再按response_model校验并序列化"""
+    data = {**data, "cluster_labels": data["cluster_labels"].tolist(),
+            "reduced_embeddings": data["reduced_embeddings"].tolist()}
+    data = convert_numpy_types(data)
+    cluster_labels = data["cluster_labels"]
+    texts, metadata, reduced = data["texts"], data["metadata"], data["reduced_embeddings"]
+    clusters = []
+    for cluster_id in set(cluster_labels):
+        indices = [i for i, label in enumerate(cluster_labels) if label == cluster_id]
+        items = [{"index": idx, "text": texts[idx], "metadata": metadata[idx]} for idx in indices]
+        centroid = np.mean(np.array([reduced[i] for i in indices]), axis=0).tolist()
+        clusters.append(ClusterInfo(
+            cluster_id=cluster_id, size=len(indices), items=items, centroid=centroid,
+            representative_content=data["cluster_content"].get(cluster_id, [])[:top_n], keywords=[], summary=None,
+        ))
+    response = BaseClusteringResponse(
+        clusters=sorted(clusters, key=lambda x: x.size, reverse=True),
+        clustering_stats=ClusteringStats(**data["clustering_stats"]),
+        optimization_result=OptimizationResult(used=False),
+        config_used=data["config_used"],
+        reduced_embeddings=reduced,
+        model_info=data["items_info"],
+    )
+    # FastAPI对response_model的处理：导出为字典后重新校验，再以JSON模式导出并由json.dumps渲染
+    adapter = TypeAdapter(BaseClusteringResponse)
+    validated = adapter.validate_python(response.model_dump())
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def fast_response(data: dict, top_n: int) -> bytes:
+    """快速路径：ContentAnalysisStage（model_construct）+ FastJSONResponse"""
+    stage = ContentAnalysisStage(ContentAnalysisConfig(top_n_per_cluster=top_n))
+    result = asyncio.run(stage.process(data, {}))
+    return FastJSONResponse(BaseClusteringResponse.model_construct(**result)).body
+
+
+def compact_response(data: dict, top_n: int) -> bytes:
+    """response_mode=compact：ID/标签/归属强度并列数组 + 簇摘要"""
+    stage = ContentAnalysisStage(ContentAnalysisConfig(top_n_per_cluster=top_n), response_mode="compact")
+    result = asyncio.run(stage.process(data, {}))
+    return FastJSONResponse(CompactClusteringResponse.model_construct(**result)).body
+
+
+def measure(fn, repeat: int):
+    """返回结果与最快一轮的耗时（秒）"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def normalized(body: bytes) -> dict:
+    """解析响应并按簇ID排序，便于比较"""
+    content = json.loads(body)
+    content["clusters"].sort(key=lambda cluster: cluster["cluster_id"])
+    return content
+
+
+def close(a, b) -> bool:
+    """递归比较（浮点数按float32精度）"""
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(close(a[key], b[key]) for key in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(close(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) or isinstance(b, float):
+        return a is not None and b is not None and abs(a - b) <= 1e-6 * max(1.0, abs(a))
+    return a == b
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="聚类响应构建基准")
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--clusters", type=int, default=40)
+    parser.add_argument("--reduced-dim", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = make_pipeline_data(args.items, args.clusters, args.reduced_dim)
+    top_n = ContentAnalysisConfig().top_n_per_cluster
+    legacy_body, legacy_seconds = measure(lambda: legacy_response(data, top_n), args.repeat)
+    fast_body, fast_seconds = measure(lambda: fast_response(data, top_n), args.repeat)
+    compact_body, compact_seconds = measure(lambda: compact_response(data, top_n), args.repeat)
+    same = close(normalized(legacy_body), normalized(fast_body))
+
+    print(f"=== 聚类响应构建 ({args.items} 项, {args.clusters} 簇, 降维 {args.reduced_dim} 维) ===")
+    print(f"原路径:   {legacy_seconds * 1000:.1f} ms, {len(legacy_body) / 1024:.0f} KB")
+    print(f"快速路径: {fast_seconds * 1000:.1f} ms, {len(fast_body) / 1024:.0f} KB "
+          f"({legacy_seconds / fast_seconds:.1f}x, {'orjson' if ORJSON_AVAILABLE else '标准库json'})")
+    print(f"compact:  {compact_seconds * 1000:.1f} ms, {len(compact_body) / 1024:.0f} KB "
+          f"(相对原路径 {legacy_seconds / compact_seconds:.0f}x / {len(legacy_body) / len(compact_body):.0f}x 更小, "
+          f"相对快速路径 {fast_seconds / compact_seconds:.0f}x / {len(fast_body) / len(compact_body):.0f}x 更小)")
+    print(f"内容一致: {same}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
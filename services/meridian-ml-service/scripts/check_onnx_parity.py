@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+ONNX后端一致性与吞吐检查
+对比 torch 路径与 ONNX 路径（默认 onnx-int8）的嵌入向量余弦一致性和推理吞吐
+
+用法:
+    python scripts/check_onnx_parity.py [--backend onnx-int8] [--repeat 3]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.embeddings import compute_embeddings, load_embedding_model  # noqa: E402
+
+
+def load_sample_texts() -> list[str]:
+    """使用测试用的模拟文章（标题和正文）作为样本"""
+    with (ROOT / "test" / "mock_articles.json").open(encoding="utf-8") as f:
+        articles = json.load(f)["articles"]
+    return [a["title"] for a in articles] + [a["content"] for a in articles]
+
+
+def measure(texts: list[str], model_components, repeat: int) -> tuple[np.ndarray, float]:
+    """返回嵌入向量与最快一轮的吞吐（文本/秒），绕过嵌入缓存"""
+    best = float("inf")
+    embeddings = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        embeddings = compute_embeddings(texts, model_components, use_cache=False)
+        best = min(best, time.perf_counter() - start)
+    return embeddings, len(texts) / best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ONNX后端一致性与吞吐检查")
+    parser.add_argument("--backend", default="onnx-int8", choices=["onnx", "onnx-int8"])
+    parser.add_argument("--repeat", type=int, default=3, help="每个后端的重复轮数")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="最小余弦一致性阈值")
+    args = parser.parse_args()
+
+    texts = load_sample_texts()
+    print(f"样本: {len(texts)} 个文本")
+
+    torch_embeddings, torch_tps = measure(texts, load_embedding_model("torch"), args.repeat)
+    onnx_embeddings, onnx_tps = measure(texts, load_embedding_model(args.backend), args.repeat)
+
+    # 两条路径输出均已L2归一化，逐行点积即余弦相似度
+    cosine = np.sum(torch_embeddings * onnx_embeddings, axis=1)
+
+    print("\n=== 一致性 ===")
+    print(f"余弦相似度: min={cosine.min():.5f} mean={cosine.mean():.5f}")
+    print("\n=== 吞吐 ===")
+    print(f"torch:        {torch_tps:.1f} 文本/秒")
+    print(f"{args.backend}: {onnx_tps:.1f} 文本/秒 (x{onnx_tps / torch_tps:.2f})")
+
+    if cosine.min() < args.min_cosine:
+        print(f"❌ 最小余弦相似度低于阈值 {args.min_cosine}")
+        return 1
+    print("✅ 一致性检查通过")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
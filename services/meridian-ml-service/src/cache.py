@@ -0,0 +1,309 @@
+"""
+嵌入向量内容寻址缓存
+键为 hash(模型名, 前缀, 原始文本, max_length, 是否归一化)，
+两级存储：进程内LRU + 磁盘内存映射环形缓冲区（重启后仍可命中）
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+from .config import settings
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows
+    FCNTL_AVAILABLE = False
+
+KEY_BYTES = 32  # sha256
+
+
+class DiskEmbeddingStore:
+    """磁盘层：固定容量的内存映射环形缓冲区，写满后覆盖最早的条目
+
+    目录结构:
+      meta.json    维度、容量、写入游标、已用条目数
+      vectors.f32  (capacity, dim) float32 向量
+      keys.bin     (capacity, 32) 每行对应的键摘要
+      .lock        写入时持有的文件锁（多个工作进程共享同一目录）
+
+    写入在排他文件锁内进行，并先从 meta.json 重新读取游标，多个进程不会覆盖彼此刚写入的行；
+    其他进程写入的条目不在本进程的索引中（仅表现为未命中）。读取在共享锁内进行，
+    复制向量后再核对行内的键摘要，行被其他进程覆盖后视为未命中。
+    """
+
+    def __init__(self, directory: Union[str, Path], capacity: int):
+        self.directory = Path(directory)
+        self.capacity = capacity
+        self.dim: Optional[int] = None
+        self._vectors: Optional[np.memmap] = None
+        self._keys: Optional[np.memmap] = None
+        self._index: Dict[bytes, int] = {}
+        self._cursor = 0
+        self._size = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._locked(exclusive=False):
+            self._open_existing()
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.directory / "meta.json"
+
+    @contextmanager
+    def _locked(self, exclusive: bool = True) -> Iterator[None]:
+        """跨进程文件锁（无 fcntl 的平台上退化为无锁）"""
+        if not FCNTL_AVAILABLE:
+            yield
+            return
+        with open(self.directory / ".lock", "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_meta(self) -> Optional[Dict[str, int]]:
+        """读取元数据；不存在、损坏或容量不一致时返回None"""
+        if not self._meta_path.exists():
+            return None
+        try:
+            meta = json.loads(self._meta_path.read_text())
+            if meta["capacity"] != self.capacity:
+                print(f"[EmbeddingCache] 磁盘缓存容量变化 ({meta['capacity']} -> {self.capacity})，重建缓存")
+                return None
+            return {key: int(meta[key]) for key in ("dim", "cursor", "size")}
+        except Exception as e:
+            print(f"[EmbeddingCache] 磁盘缓存元数据损坏，将重建: {e}")
+            return None
+
+    def _write_meta(self) -> None:
+        """原子替换 meta.json，读取方不会看到写了一半的文件"""
+        tmp_path = self._meta_path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps({
+            "dim": self.dim,
+            "capacity": self.capacity,
+            "cursor": self._cursor,
+            "size": self._size,
+        }))
+        os.replace(tmp_path, self._meta_path)
+
+    def _open_existing(self) -> None:
+        """打开已有缓存文件并重建内存索引；参数不一致时丢弃旧文件"""
+        meta = self._read_meta()
+        if meta is None:
+            return
+        try:
+            self._map_files(meta["dim"], mode="r+")
+            self._cursor = meta["cursor"]
+            self._size = meta["size"]
+            for row in range(self._size):
+                digest = bytes(self._keys[row])
+                if any(digest):
+                    self._index[digest] = row
+            print(f"[EmbeddingCache] 已加载磁盘缓存: {len(self._index)} 条 ({self.directory})")
+        except Exception as e:
+            print(f"[EmbeddingCache] 磁盘缓存损坏，将重建: {e}")
+            self._vectors = self._keys = None
+            self.dim = None
+            self._index.clear()
+            self._cursor = self._size = 0
+
+    def _map_files(self, dim: int, mode: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self._vectors = np.memmap(
+            self.directory / "vectors.f32", dtype=np.float32, mode=mode, shape=(self.capacity, dim)
+        )
+        self._keys = np.memmap(
+            self.directory / "keys.bin", dtype=np.uint8, mode=mode, shape=(self.capacity, KEY_BYTES)
+        )
+
+    def _sync_for_write(self, dim: int) -> None:
+        """持锁后与磁盘状态同步：沿用其他进程已创建的文件与游标，只在没有可用文件或维度变化时重建
+
+        mode="w+" 会截断文件，因此只在确认磁盘上没有同维度的缓存时使用。
+        """
+        meta = self._read_meta()
+        if meta is not None and meta["dim"] == dim:
+            if self._vectors is None or self.dim != dim:
+                self._index.clear()
+                self._map_files(dim, mode="r+")
+            self._cursor = meta["cursor"]
+            self._size = meta["size"]
+            return
+
+        if meta is not None:
+            print(f"[EmbeddingCache] 嵌入维度变化 ({meta['dim']} -> {dim})，重建磁盘缓存")
+        self._index.clear()
+        self._cursor = self._size = 0
+        self._map_files(dim, mode="w+")
+
+    def get_many(self, digests: List[bytes]) -> List[Optional[np.ndarray]]:
+        """批量查找；整批持有共享锁，其他进程的写入不会穿插在读取向量与核对键之间"""
+        if not any(digest in self._index for digest in digests):
+            return [None] * len(digests)
+        with self._locked(exclusive=False):
+            return [self._get(digest) for digest in digests]
+
+    def _get(self, digest: bytes) -> Optional[np.ndarray]:
+        row = self._index.get(digest)
+        if row is None:
+            return None
+        vector = np.array(self._vectors[row])
+        # 先复制向量再核对键：该行可能已被其他进程的写入覆盖（无 fcntl 的平台上也能发现）
+        if bytes(self._keys[row]) != digest:
+            del self._index[digest]
+            return None
+        return vector
+
+    def put_many(self, digests: List[bytes], vectors: np.ndarray) -> int:
+        """写入一批向量，返回被覆盖（淘汰）的条目数"""
+        with self._locked():
+            self._sync_for_write(vectors.shape[1])
+
+            evicted = 0
+            for digest, vector in zip(digests, vectors):
+                row = self._index.get(digest)
+                if row is not None and bytes(self._keys[row]) == digest:
+                    continue
+                row = self._cursor
+                old_digest = bytes(self._keys[row])
+                if self._size == self.capacity and any(old_digest):
+                    if self._index.get(old_digest) == row:
+                        del self._index[old_digest]
+                    evicted += 1
+                self._vectors[row] = vector
+                self._keys[row] = np.frombuffer(digest, dtype=np.uint8)
+                self._index[digest] = row
+                self._cursor = (row + 1) % self.capacity
+                self._size = min(self._size + 1, self.capacity)
+
+            # 先落盘向量与键，再更新元数据
+            self._vectors.flush()
+            self._keys.flush()
+            self._write_meta()
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+class EmbeddingCache:
+    """两级嵌入缓存：内存LRU在前，磁盘层在后；磁盘命中会回填内存"""
+
+    def __init__(
+        self,
+        model_name: str,
+        memory_entries: int,
+        disk_dir: Optional[Union[str, Path]] = None,
+        disk_entries: int = 0,
+    ):
+        self.model_name = model_name
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._disk = DiskEmbeddingStore(disk_dir, disk_entries) if disk_dir and disk_entries > 0 else None
+        self._lock = threading.Lock()
+
+        self._hits_memory = 0
+        self._hits_disk = 0
+        self._misses = 0
+        self._evictions_memory = 0
+        self._evictions_disk = 0
+
+    def make_key(self, text: str, prefix: Optional[str], max_length: int, normalize: bool) -> bytes:
+        """按送入分词器的原始文本计算键（不做任何规范化，缓存值与未缓存路径的结果一致）"""
+        payload = "\x00".join([
+            self.model_name,
+            prefix or "",
+            str(max_length),
+            "1" if normalize else "0",
+            text,
+        ])
+        return hashlib.sha256(payload.encode("utf-8")).digest()
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        results: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self._hits_memory += 1
+                results.append(vector)
+
+            missing = [i for i, vector in enumerate(results) if vector is None]
+            if missing and self._disk is not None:
+                for i, vector in zip(missing, self._disk.get_many([keys[i] for i in missing])):
+                    if vector is not None:
+                        self._hits_disk += 1
+                        self._remember(keys[i], vector)
+                        results[i] = vector
+            self._misses += sum(vector is None for vector in results)
+        return results
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, np.array(vector, dtype=np.float32))
+            if self._disk is not None:
+                try:
+                    self._evictions_disk += self._disk.put_many(keys, vectors.astype(np.float32, copy=False))
+                except OSError as e:
+                    print(f"[EmbeddingCache] 磁盘缓存写入失败: {e}")
+
+    def _remember(self, key: bytes, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._evictions_memory += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits_memory + self._hits_disk + self._misses
+        return {
+            "memory_entries": len(self._memory),
+            "memory_capacity": self.memory_entries,
+            "disk_entries": len(self._disk) if self._disk is not None else None,
+            "disk_capacity": self._disk.capacity if self._disk is not None else None,
+            "hits_memory": self._hits_memory,
+            "hits_disk": self._hits_disk,
+            "misses": self._misses,
+            "hit_ratio": (self._hits_memory + self._hits_disk) / lookups if lookups else 0.0,
+            "evictions_memory": self._evictions_memory,
+            "evictions_disk": self._evictions_disk,
+        }
+
+
+_cache_instance: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """获取全局嵌入缓存（未启用时返回None）"""
+    global _cache_instance
+    if not settings.embedding_cache_enabled:
+        return None
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                _cache_instance = EmbeddingCache(
+                    # 不同后端（如int8量化）的数值不同，按后端区分缓存键
+                    model_name=f"{settings.embedding_model_name}@{settings.embedding_backend}",
+                    memory_entries=settings.embedding_cache_memory_entries,
+                    disk_dir=settings.embedding_cache_dir or None,
+                    disk_entries=settings.embedding_cache_disk_entries,
+                )
+    return _cache_instance
+
+
+def peek_embedding_cache() -> Optional[EmbeddingCache]:
+    """返回已创建的缓存实例，不触发创建"""
+    return _cache_instance
@@ -3,10 +3,16 @@
 基于reportV5.md的实现，包含参数网格搜索优化
 """
 import numpy as np
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Callable, Dict, List, Any, Optional, Tuple
 import logging
+import multiprocessing
+import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+from .model_store import ClusterModel, get_model_store, new_model_id
 
 # 抑制sklearn弃用警告
 warnings.filterwarnings("ignore", category=FutureWarning, module="sklearn")
@@ -16,12 +22,25 @@ try:
     import umap
     import hdbscan
     from sklearn.preprocessing import StandardScaler
+    from sklearn.decomposition import PCA
+    from sklearn.random_projection import SparseRandomProjection
     from hdbscan.validity import validity_index
+    from sklearn.metrics import pairwise_distances
+    from pynndescent import NNDescent
+    from umap.distances import named_distances
+    from umap.utils import fast_knn_indices
     CLUSTERING_AVAILABLE = True
 except ImportError:
     CLUSTERING_AVAILABLE = False
     logging.warning("聚类依赖未安装: umap-learn, hdbscan, scikit-learn")
 
+# 参数扫描复用单链接树时使用的hdbscan内部函数（非公开API，缺失时每个组合完整拟合）
+try:
+    from hdbscan.hdbscan_ import _tree_to_labels
+    TREE_RELABEL_AVAILABLE = True
+except ImportError:
+    TREE_RELABEL_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
@@ -75,6 +94,10 @@ class ClusteringConfig:
     umap_n_neighbors: int = 15  # 邻居数量
     umap_min_dist: float = 0.0  # 参考reportV5.md，使用0.0
     umap_metric: str = 'cosine'  # 距离度量
+    umap_n_epochs: Optional[int] = None  # 布局优化轮数（None为UMAP默认）
+    knn_method: str = 'auto'  # kNN图计算方法: auto / exact / nndescent
+    nndescent_n_trees: Optional[int] = None  # NN-descent随机投影树数量（None为UMAP默认）
+    nndescent_n_iters: Optional[int] = None  # NN-descent迭代次数（None为UMAP默认）
     
     # HDBSCAN参数
     hdbscan_min_cluster_size: int = 5  # 最小簇大小
@@ -83,9 +106,15 @@ class ClusteringConfig:
     hdbscan_cluster_selection_method: str = 'eom'  # 簇选择方法
     hdbscan_cluster_selection_epsilon: float = 0.0  # epsilon参数
     
+    # UMAP前的线性预降维，见 PRE_REDUCTION_METHODS
+    pre_reduction: str = 'none'
+    pre_reduction_dim: int = 50
+    
     # 其他配置
     normalize_embeddings: bool = True
     remove_outliers: bool = False
+    execution_mode: str = 'reproducible'  # 执行模式，见 EXECUTION_MODES
+    preset: Optional[str] = None  # 生成以上部分参数的速度/质量预设，见 CLUSTERING_PRESETS
 
 
 @dataclass
@@ -97,6 +126,14 @@ class GridSearchConfig:
     umap_n_components: int = 10  # 固定使用10维
     umap_min_dist: float = 0.0  # 固定使用0.0
     umap_metric: str = 'cosine'  # 固定使用cosine
+    umap_n_epochs: Optional[int] = None  # 布局优化轮数（None为UMAP默认）
+    knn_method: str = 'auto'  # kNN图计算方法: auto / exact / nndescent
+    nndescent_n_trees: Optional[int] = None  # NN-descent随机投影树数量（None为UMAP默认）
+    nndescent_n_iters: Optional[int] = None  # NN-descent迭代次数（None为UMAP默认）
+    
+    # UMAP前的线性预降维（每次搜索只拟合一次，所有候选共享），见 PRE_REDUCTION_METHODS
+    pre_reduction: str = 'none'
+    pre_reduction_dim: int = 50
     
     # HDBSCAN参数网格
     hdbscan_min_cluster_size: List[int] = None
@@ -104,6 +141,25 @@ class GridSearchConfig:
     hdbscan_epsilon: List[float] = None
     hdbscan_metric: str = 'euclidean'  # 固定使用euclidean
     
+    # 并行搜索进程数（1为串行）
+    n_jobs: int = 1
+    
+    # 搜索策略与预算（见 SEARCH_STRATEGIES）
+    search_strategy: str = 'exhaustive'
+    max_combinations: Optional[int] = None  # 非exhaustive策略最多评估的组合数
+    early_stopping_patience: int = 5  # early_stopping: 连续无提升的组合数
+    halving_factor: int = 3  # successive_halving: 每轮淘汰比例与子样本增长倍数
+    halving_min_samples: int = 50  # successive_halving: 最小子样本量
+    random_state: int = 42  # 候选抽样与子样本抽样的随机种子
+
+    # 评分：用 scorer 给所有候选排序；scorer 不是精确DBCV时，对前 rerank_top_k 名用精确DBCV重排
+    scorer: str = 'dbcv'
+    rerank_top_k: int = 3
+
+    # 执行模式，见 EXECUTION_MODES
+    execution_mode: str = 'reproducible'
+    preset: Optional[str] = None  # 生成以上部分参数的速度/质量预设，见 CLUSTERING_PRESETS
+    
     def __post_init__(self):
         """设置默认值"""
         if self.umap_n_neighbors is None:
@@ -116,6 +172,76 @@ class GridSearchConfig:
             self.hdbscan_epsilon = [0.1, 0.2, 0.3]
 
 
+SEARCH_STRATEGIES = ('exhaustive', 'random', 'successive_halving', 'early_stopping')
+
+
+# 速度/质量预设：UMAP布局轮数、NN-descent精度、预降维、候选评分器与搜索策略
+# - fast: 交互式调用，粗略布局 + 低精度近邻搜索 + 连续减半
+# - balanced: 常规调用
+# - best: 离线批处理，完整布局 + 高精度近邻搜索 + 完整网格和精确DBCV
+CLUSTERING_PRESETS: Dict[str, Dict[str, Any]] = {
+    'fast': {
+        'umap_n_epochs': 100,
+        'nndescent_n_trees': 4,
+        'nndescent_n_iters': 3,
+        'pre_reduction': 'pca',
+        'pre_reduction_dim': 32,
+        'scorer': 'relative_validity',
+        'search_strategy': 'successive_halving',
+    },
+    'balanced': {
+        'umap_n_epochs': 200,
+        'nndescent_n_trees': 8,
+        'nndescent_n_iters': 6,
+        'pre_reduction': 'pca',
+        'pre_reduction_dim': 50,
+        'scorer': 'relative_validity',
+        'search_strategy': 'random',
+    },
+    'best': {
+        'umap_n_epochs': 500,
+        'nndescent_n_trees': 32,
+        'nndescent_n_iters': 20,
+        'pre_reduction': 'none',
+        'pre_reduction_dim': 50,
+        'scorer': 'dbcv',
+        'search_strategy': 'exhaustive',
+    },
+}
+# 预设中属于网格搜索（而非单次聚类配置）的参数
+PRESET_SEARCH_KEYS = ('scorer', 'search_strategy')
+
+
+def get_preset_settings(preset: Optional[str]) -> Dict[str, Any]:
+    """返回预设对应的参数（副本），preset 为None时返回空字典"""
+    if preset is None:
+        return {}
+    if preset not in CLUSTERING_PRESETS:
+        raise ValueError(f"不支持的预设: {preset}")
+    return dict(CLUSTERING_PRESETS[preset])
+
+
+@dataclass
+class GridSearchResult:
+    """网格搜索结果与搜索统计"""
+    
+    best_params: Dict[str, Any]
+    best_score: float
+    search_strategy: str
+    search_space_size: int  # 调整后网格的组合总数
+    evaluated_combinations: int  # 实际评估次数（连续减半累计各轮）
+    stopped_early: bool = False
+    scorer: str = 'dbcv'  # 候选排序使用的评分器
+    final_scorer: str = 'dbcv'  # best_score 对应的评分器（重排成功时为精确DBCV）
+    reranked_candidates: int = 0  # 用精确DBCV重排的候选数
+    scoring_seconds: float = 0.0  # 评分累计耗时（含重排）
+    pre_reduction: Optional[Dict[str, Any]] = None  # 预降维信息，见 pre_reduce_embeddings
+    # 最佳候选的降维结果与标签（完整数据上评估得到；无有效候选时为None）
+    reduced_embeddings: Optional[np.ndarray] = None
+    cluster_labels: Optional[np.ndarray] = None
+    membership_strengths: Optional[np.ndarray] = None  # 最佳候选的HDBSCAN簇归属强度
+
+
 def validate_clustering_availability():
     """验证聚类依赖是否可用"""
     if not CLUSTERING_AVAILABLE:
@@ -124,6 +250,21 @@ def validate_clustering_availability():
         )
 
 
+# 执行模式：
+# - reproducible: UMAP固定 random_state（因此使用单线程布局），HDBSCAN核心距离单线程计算，结果逐位可复现
+# - parallel: UMAP不固定随机种子并使用全部CPU核，HDBSCAN核心距离并行计算，结果不保证逐位一致
+EXECUTION_MODES = ('reproducible', 'parallel')
+
+
+def _execution_params(execution_mode: str) -> Dict[str, Any]:
+    """执行模式对应的 UMAP / NN-descent / HDBSCAN 并行参数"""
+    if execution_mode == 'reproducible':
+        return {"random_state": 42, "n_jobs": 1, "core_dist_n_jobs": 1}
+    if execution_mode == 'parallel':
+        return {"random_state": None, "n_jobs": -1, "core_dist_n_jobs": -1}
+    raise ValueError(f"不支持的执行模式: {execution_mode}")
+
+
 def preprocess_embeddings(
     embeddings: np.ndarray, 
     normalize: bool = True
@@ -137,6 +278,54 @@ def preprocess_embeddings(
     return embeddings
 
 
+# UMAP前的线性预降维：
+# - none: 不预降维
+# - pca: 随机化PCA，报告保留的方差比例
+# - random_projection: 稀疏随机投影（近似保持距离，无方差比例可报告）
+PRE_REDUCTION_METHODS = ('none', 'pca', 'random_projection')
+
+
+def pre_reduce_embeddings(
+    embeddings: np.ndarray,
+    method: str = 'none',
+    n_components: int = 50,
+    random_state: int = 42
+) -> Tuple[np.ndarray, Dict[str, Any], Optional[Any]]:
+    """UMAP前的线性预降维，降低kNN搜索和布局优化的维度开销
+
+    返回 (降维后的嵌入, 预降维信息, 拟合的降维器)；信息包含实际方法、输入/输出维度和
+    保留的方差比例（仅PCA）。目标维度不低于输入维度或样本过少时不做预降维（降维器为None）。
+    """
+    if method not in PRE_REDUCTION_METHODS:
+        raise ValueError(f"不支持的预降维方法: {method}")
+
+    n_samples, n_features = embeddings.shape
+    target_dim = min(n_components, n_samples - 1)
+    info = {
+        "method": 'none',
+        "input_dim": int(n_features),
+        "output_dim": int(n_features),
+        "explained_variance": None,
+        "seconds": 0.0,
+    }
+    if method == 'none' or target_dim >= n_features or target_dim < 2:
+        return embeddings, info, None
+
+    start = time.perf_counter()
+    if method == 'pca':
+        reducer = PCA(n_components=target_dim, svd_solver='randomized', random_state=random_state)
+        reduced = reducer.fit_transform(embeddings)
+        info["explained_variance"] = float(np.sum(reducer.explained_variance_ratio_))
+    else:
+        reducer = SparseRandomProjection(n_components=target_dim, dense_output=True, random_state=random_state)
+        reduced = reducer.fit_transform(embeddings)
+
+    info.update(method=method, output_dim=int(target_dim), seconds=time.perf_counter() - start)
+    explained = f", 保留方差 {info['explained_variance']:.3f}" if info["explained_variance"] is not None else ""
+    logger.info(f"预降维({method}): {n_features} -> {target_dim}维{explained}")
+    return reduced.astype(np.float32, copy=False), info, reducer
+
+
 def perform_umap_reduction(
     embeddings: np.ndarray,
     config: ClusteringConfig
@@ -161,13 +350,24 @@ def perform_umap_reduction(
         else:
             return embeddings, None
     
+    execution = _execution_params(config.execution_mode)
     try:
+        # kNN图由kNN引擎计算（精确分块矩阵乘法或NN-descent），UMAP只做图构建与布局
+        knn = compute_knn_graph(
+            embeddings, safe_n_neighbors, config.umap_metric, method=config.knn_method,
+            random_state=execution["random_state"], n_jobs=execution["n_jobs"],
+            n_trees=config.nndescent_n_trees, n_iters=config.nndescent_n_iters
+        )
         reducer = umap.UMAP(
             n_components=safe_n_components,
             n_neighbors=safe_n_neighbors,
             min_dist=config.umap_min_dist,
             metric=config.umap_metric,
-            random_state=42,  # 确保可重现
+            n_epochs=config.umap_n_epochs,
+            random_state=execution["random_state"],  # reproducible模式下确保可重现
+            n_jobs=execution["n_jobs"],
+            # 附带精确查询索引，拟合后的降维器可以 transform 新数据
+            precomputed_knn=(*knn, ExactKnnIndex(embeddings, config.umap_metric)),
             verbose=False  # 减少输出
         )
         
@@ -213,7 +413,7 @@ def perform_hdbscan_clustering(
             cluster_selection_method=config.hdbscan_cluster_selection_method,
             cluster_selection_epsilon=config.hdbscan_cluster_selection_epsilon,
             prediction_data=True,  # 启用预测数据
-            core_dist_n_jobs=1  # 避免并行问题
+            core_dist_n_jobs=_execution_params(config.execution_mode)["core_dist_n_jobs"]
         )
         
         cluster_labels = clusterer.fit_predict(reduced_embeddings)
@@ -234,208 +434,1147 @@ def perform_hdbscan_clustering(
         return np.zeros(n_samples, dtype=int), None
 
 
+def _default_best_params(n_samples: int) -> Dict[str, Any]:
+    """小数据集或搜索无结果时使用的安全默认参数"""
+    default_config = ClusteringConfig()
+    safe_n_neighbors = get_safe_n_neighbors(n_samples, default_config.umap_n_neighbors)
+    safe_min_cluster_size = get_safe_min_cluster_size(n_samples, default_config.hdbscan_min_cluster_size)
+
+    return {
+        "umap": {
+            "n_neighbors": safe_n_neighbors,
+            "n_components": min(default_config.umap_n_components, n_samples - 1),
+            "min_dist": default_config.umap_min_dist,
+            "metric": default_config.umap_metric
+        },
+        "hdbscan": {
+            "min_cluster_size": safe_min_cluster_size,
+            "min_samples": min(default_config.hdbscan_min_samples, safe_min_cluster_size - 1),
+            "epsilon": default_config.hdbscan_cluster_selection_epsilon,
+            "metric": default_config.hdbscan_metric
+        }
+    }
+
+
+# kNN引擎选择：精确分块矩阵乘法的开销约为 n²·d，NN-descent 约为 n·log(n)·d；
+# 精确计算的样本数上限随维度增加（实测交叉点 d=10 约1.5万、d=384 约2.5万）
+KNN_METHODS = ('auto', 'exact', 'nndescent')
+_EXACT_KNN_BASE_SAMPLES = 15000
+_EXACT_KNN_SAMPLES_PER_DIM = 25
+_EXACT_KNN_MAX_SAMPLES = 50000
+_EXACT_KNN_BLOCK_BYTES = 64 * 1024 * 1024  # 每个分块相似度矩阵的内存上限
+_BLAS_KNN_METRICS = ('cosine', 'euclidean')
+
+
+def choose_knn_method(n_samples: int, n_features: int, metric: str = 'cosine') -> str:
+    """根据样本数、维度和距离度量选择kNN方法（exact 或 nndescent）"""
+    if metric not in _BLAS_KNN_METRICS:
+        # 无法用矩阵乘法计算的度量只在小数据集上精确计算
+        return 'exact' if n_samples < 4096 else 'nndescent'
+    max_exact = min(_EXACT_KNN_MAX_SAMPLES, _EXACT_KNN_BASE_SAMPLES + _EXACT_KNN_SAMPLES_PER_DIM * n_features)
+    return 'exact' if n_samples <= max_exact else 'nndescent'
+
+
+def _prepare_blas_data(data: np.ndarray, metric: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """分块矩阵乘法的输入：cosine 预先归一化，euclidean 预先计算平方范数"""
+    data = np.ascontiguousarray(data, dtype=np.float32)
+    if metric == 'cosine':
+        norms = np.linalg.norm(data, axis=1, keepdims=True)
+        return data / np.where(norms > 0, norms, 1.0), None
+    return data, np.einsum('ij,ij->i', data, data)
+
+
+def _exact_knn_blas(
+    embeddings: np.ndarray,
+    n_neighbors: int,
+    metric: str,
+    queries: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """精确kNN：按行分块做矩阵乘法 + argpartition，内存占用为 O(block × n)
+
+    queries 为None时计算 embeddings 自身的kNN图（自身是第一个邻居），
+    否则为每个查询点在 embeddings 中查找最近邻。
+    """
+    data, sq_norms = _prepare_blas_data(embeddings, metric)
+    if queries is None:
+        query_data, query_sq_norms = data, sq_norms
+    else:
+        query_data, query_sq_norms = _prepare_blas_data(queries, metric)
+    n_samples = data.shape[0]
+    n_queries = query_data.shape[0]
+
+    block = max(1, min(n_queries, _EXACT_KNN_BLOCK_BYTES // (4 * n_samples)))
+    knn_indices = np.empty((n_queries, n_neighbors), dtype=np.int64)
+    knn_dists = np.empty((n_queries, n_neighbors), dtype=np.float32)
+
+    for start in range(0, n_queries, block):
+        stop = min(start + block, n_queries)
+        rows = np.arange(stop - start)
+        distances = query_data[start:stop] @ data.T
+        if metric == 'cosine':
+            np.subtract(1.0, distances, out=distances)
+        else:
+            distances *= -2.0
+            distances += query_sq_norms[start:stop, None]
+            distances += sq_norms[None, :]
+            np.sqrt(np.maximum(distances, 0.0, out=distances), out=distances)
+        np.maximum(distances, 0.0, out=distances)
+        if queries is None:
+            # 保证自身是第一个邻居（与UMAP的约定一致）
+            distances[rows, start + rows] = -1.0
+
+        candidates = np.argpartition(distances, n_neighbors - 1, axis=1)[:, :n_neighbors]
+        candidate_dists = np.take_along_axis(distances, candidates, axis=1)
+        order = np.argsort(candidate_dists, axis=1, kind='stable')
+        knn_indices[start:stop] = np.take_along_axis(candidates, order, axis=1)
+        knn_dists[start:stop] = np.take_along_axis(candidate_dists, order, axis=1)
+
+    if queries is None:
+        knn_dists[:, 0] = 0.0
+    return knn_indices, knn_dists
+
+
+class ExactKnnIndex:
+    """训练数据上的精确kNN查询索引，供 UMAP.transform 把新数据映射到已有布局
+
+    UMAP使用预计算kNN图拟合时没有NN-descent搜索索引，transform 不可用；
+    本类实现 transform 用到的 NNDescent 接口（query 与 _angular_trees）。
+    """
+
+    _angular_trees = False
+
+    def __init__(self, data: np.ndarray, metric: str):
+        self.data = data
+        self.metric = metric
+
+    def query(self, queries: np.ndarray, k: int = 10, epsilon: float = 0.1) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, self.data.shape[0])
+        if self.metric in _BLAS_KNN_METRICS:
+            indices, dists = _exact_knn_blas(self.data, k, self.metric, queries=queries)
+        else:
+            distances = pairwise_distances(queries, self.data, metric=named_distances[self.metric])
+            indices = np.argsort(distances, axis=1, kind='stable')[:, :k]
+            dists = np.take_along_axis(distances, indices, axis=1)
+        return indices.astype(np.int32), dists.astype(np.float32)
+
+
+def compute_knn_graph(
+    embeddings: np.ndarray,
+    n_neighbors: int,
+    metric: str = 'cosine',
+    random_state: Optional[int] = 42,
+    method: str = 'auto',
+    n_jobs: int = 1,
+    n_trees: Optional[int] = None,
+    n_iters: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """计算kNN图（每个点的第一个邻居是自身），返回 (indices, distances)
+
+    method:
+    - exact: cosine/euclidean 使用分块矩阵乘法精确计算（确定性，内存有界）；
+      其他度量用UMAP的距离函数计算全部距离
+    - nndescent: UMAP同款的近似最近邻搜索（random_state 为None时可用 n_jobs 个线程）；
+      n_trees / n_iters 控制精度，为None时与UMAP的默认值相同
+    - auto: 由 choose_knn_method 按样本数和维度选择
+    
+    结果可直接作为UMAP的 precomputed_knn，也供其他需要近邻图的模块复用。
+    """
+    validate_clustering_availability()
+    if method not in KNN_METHODS:
+        raise ValueError(f"不支持的kNN方法: {method}")
+    n_samples, n_features = embeddings.shape
+    n_neighbors = min(n_neighbors, n_samples)
+    if method == 'auto':
+        method = choose_knn_method(n_samples, n_features, metric)
+
+    if method == 'exact':
+        if metric in _BLAS_KNN_METRICS:
+            return _exact_knn_blas(embeddings, n_neighbors, metric)
+        distances = pairwise_distances(embeddings, metric=named_distances[metric])
+        knn_indices = fast_knn_indices(distances, n_neighbors)
+        knn_dists = distances[np.arange(n_samples)[:, None], knn_indices]
+    else:
+        if n_trees is None:
+            n_trees = min(64, 5 + int(round(n_samples ** 0.5 / 20.0)))
+        if n_iters is None:
+            n_iters = max(5, int(round(np.log2(n_samples))))
+        knn_indices, knn_dists = NNDescent(
+            embeddings,
+            n_neighbors=n_neighbors,
+            metric=metric,
+            random_state=np.random.RandomState(random_state) if random_state is not None else None,
+            n_trees=n_trees,
+            n_iters=n_iters,
+            max_candidates=60,
+            low_memory=True,
+            n_jobs=n_jobs,
+            compressed=False,
+        ).neighbor_graph
+    return knn_indices, knn_dists.astype(np.float32, copy=False)
+
+
+_DEDUP_NEIGHBORS = 16  # 近重复折叠时每个点先检查的近邻数
+
+
+def _cosine_radius_neighbors(data: np.ndarray, rows: List[int], max_distance: float) -> Dict[int, np.ndarray]:
+    """已归一化的 data 中与 rows 各点余弦距离不超过 max_distance 的全部点（一次矩阵乘法）"""
+    distances = 1.0 - data[rows] @ data.T
+    return {int(row): np.flatnonzero(row_distances <= max_distance) for row, row_distances in zip(rows, distances)}
+
+
+def collapse_near_duplicates(
+    embeddings: np.ndarray,
+    threshold: float = 0.97,
+    n_neighbors: int = _DEDUP_NEIGHBORS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """近重复折叠：余弦相似度不低于 threshold 的向量归为一组，只保留每组的代表
+
+    近邻由 compute_knn_graph 计算（中小规模为分块矩阵乘法精确kNN，大规模为NN-descent）。
+    按输入顺序贪心分组：尚未分组的点成为代表，并吸收其近邻中尚未分组且相似度达到阈值的点，
+    因此组内每个点与代表的相似度都不低于阈值（不会沿近邻链传递）。
+    第 n_neighbors 个近邻仍达到阈值的代表（组可能更大）改为精确查询整个阈值邻域，
+    组的大小不受 n_neighbors 限制；这类代表按块批量查询，每块一次矩阵乘法。
+
+    Returns:
+        (代表点下标（升序）, 每个点的代表在代表数组中的位置)
+    """
+    n_samples = len(embeddings)
+    if n_samples < 2:
+        return np.arange(n_samples), np.arange(n_samples)
+
+    knn_indices, knn_dists = compute_knn_graph(embeddings, n_neighbors, metric='cosine')
+    max_distance = 1.0 - threshold
+    if knn_indices.shape[1] < n_samples:
+        saturated = (knn_dists[:, -1] <= max_distance) & (knn_indices[:, -1] >= 0)
+    else:
+        saturated = np.zeros(n_samples, dtype=bool)
+    radius_neighbors: Dict[int, np.ndarray] = {}
+    data: Optional[np.ndarray] = None
+    block = max(1, _EXACT_KNN_BLOCK_BYTES // (4 * n_samples))
+    requeried = 0
+
+    owner = np.full(n_samples, -1, dtype=np.int64)
+    for index in range(n_samples):
+        if owner[index] >= 0:
+            continue
+        owner[index] = index
+        if saturated[index]:
+            if index not in radius_neighbors:
+                if data is None:
+                    data, _ = _prepare_blas_data(embeddings, 'cosine')
+                # 连同之后尚未分组的饱和点一起查询（它们大多也会成为代表）
+                upcoming = index + 1 + np.flatnonzero(saturated[index + 1:] & (owner[index + 1:] < 0))
+                upcoming = [index] + [int(row) for row in upcoming[:block - 1] if row not in radius_neighbors]
+                radius_neighbors.update(_cosine_radius_neighbors(data, upcoming, max_distance))
+            neighbors = radius_neighbors.pop(index)
+            requeried += 1
+        else:
+            neighbors = knn_indices[index][(knn_dists[index] <= max_distance) & (knn_indices[index] >= 0)]
+        owner[neighbors[owner[neighbors] < 0]] = index
+
+    representatives = np.flatnonzero(owner == np.arange(n_samples))
+    position = np.empty(n_samples, dtype=np.int64)
+    position[representatives] = np.arange(len(representatives))
+    logger.info(
+        f"近重复折叠: {n_samples} -> {len(representatives)} (阈值 {threshold}, {requeried} 个代表精确查询阈值邻域)"
+    )
+    return representatives, position[owner]
+
+
+def expand_collapsed_result(
+    result: Dict[str, Any],
+    inverse: np.ndarray,
+    remove_outliers: bool = False
+) -> Dict[str, Any]:
+    """把只在代表点上得到的聚类结果展开到全部点：每个点沿用其代表的标签与降维坐标
+
+    统计信息按全部点重新计算（DBCV仍为代表点上的分数），并记录 duplicates_collapsed。
+    折叠时聚类应关闭 remove_outliers，展开后再按 remove_outliers 移除异常点。
+    """
+    cluster_labels = np.asarray(result['cluster_labels'], dtype=np.int64)[inverse]
+    reduced_embeddings = np.asarray(result['reduced_embeddings'], dtype=np.float32)[inverse]
+    membership_strengths = np.asarray(result['membership_strengths'], dtype=np.float32)[inverse]
+
+    stats = result['clustering_stats']
+    n_outliers = int(np.sum(cluster_labels == -1))
+    clustered = cluster_labels[cluster_labels >= 0]
+    labels, sizes = np.unique(clustered, return_counts=True)
+    stats.update({
+        'n_samples': len(inverse),
+        'n_outliers': n_outliers,
+        'outlier_ratio': float(n_outliers / len(inverse)) if len(inverse) else 0.0,
+        'cluster_sizes': {int(label): int(size) for label, size in zip(labels, sizes)},
+        'duplicates_collapsed': int(len(inverse) - len(result['cluster_labels'])),
+    })
+
+    result['item_indices'] = None
+    if remove_outliers:
+        keep = cluster_labels != -1
+        cluster_labels = cluster_labels[keep]
+        reduced_embeddings = reduced_embeddings[keep]
+        membership_strengths = membership_strengths[keep]
+        result['item_indices'] = np.flatnonzero(keep)
+        logger.info(f"移除{n_outliers}个异常点")
+    result['cluster_labels'] = cluster_labels
+    result['reduced_embeddings'] = reduced_embeddings
+    result['membership_strengths'] = membership_strengths
+    return result
+
+
+def _slice_knn(knn: Tuple[np.ndarray, np.ndarray], n_neighbors: int) -> Tuple[np.ndarray, np.ndarray]:
+    """取kNN图的前 n_neighbors 列（复制为连续数组：UMAP会原地修改传入的kNN）"""
+    knn_indices, knn_dists = knn
+    return (
+        np.ascontiguousarray(knn_indices[:, :n_neighbors]),
+        np.ascontiguousarray(knn_dists[:, :n_neighbors]),
+    )
+
+
+def _shared_knn_graph(
+    embeddings: np.ndarray,
+    n_neighbors_values: List[int],
+    metric: str,
+    method: str = 'auto',
+    execution_mode: str = 'reproducible',
+    n_trees: Optional[int] = None,
+    n_iters: Optional[int] = None
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """为一组n_neighbors候选按最大的k计算一次kNN图，失败时返回None（各候选自行计算）"""
+    execution = _execution_params(execution_mode)
+    try:
+        return compute_knn_graph(
+            embeddings, max(n_neighbors_values), metric, method=method,
+            random_state=execution["random_state"], n_jobs=execution["n_jobs"],
+            n_trees=n_trees, n_iters=n_iters
+        )
+    except Exception as e:
+        logger.warning(f"共享kNN图计算失败，各候选将单独计算: {e}")
+        return None
+
+
+def _fit_umap_candidate(
+    embeddings: np.ndarray,
+    n_neighbors: int,
+    n_components: int,
+    min_dist: float,
+    metric: str,
+    knn: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    execution_mode: str = 'reproducible',
+    n_epochs: Optional[int] = None
+) -> Optional[np.ndarray]:
+    """网格搜索中为单个n_neighbors拟合UMAP，失败时返回None
+
+    传入 knn（列数不少于 n_neighbors）时直接使用其前 n_neighbors 列，只做图构建与布局
+    """
+    execution = _execution_params(execution_mode)
+    try:
+        reducer = umap.UMAP(
+            n_neighbors=n_neighbors,
+            n_components=n_components,
+            min_dist=min_dist,
+            metric=metric,
+            n_epochs=n_epochs,
+            random_state=execution["random_state"],
+            n_jobs=execution["n_jobs"],
+            precomputed_knn=_slice_knn(knn, n_neighbors) if knn is not None else (None, None, None),
+            verbose=False
+        )
+        return reducer.fit_transform(embeddings)
+    except Exception as e:
+        logger.warning(f"UMAP降维失败 (n_neighbors={n_neighbors}): {e}")
+        return None
+
+
+# ----------------------------------------------------------------------------
+# 聚类质量评分器：精确DBCV、HDBSCAN基于最小生成树的 relative_validity、固定种子子采样DBCV
+# ----------------------------------------------------------------------------
+
+_DBCV_SUBSAMPLE_SIZE = 1000  # dbcv_subsample 最多使用的非噪声点数
+_DBCV_SUBSAMPLE_MIN_PER_CLUSTER = 3
+
+
+def _dbcv_score(reduced_data: np.ndarray, cluster_labels: np.ndarray, mst: Optional[np.ndarray] = None) -> float:
+    """精确DBCV（hdbscan.validity.validity_index），只在非噪声点上计算"""
+    valid_points = cluster_labels != -1
+    # 转换为float64以避免精度问题
+    reduced_data_64 = reduced_data[valid_points].astype(np.float64)
+    return float(validity_index(reduced_data_64, cluster_labels[valid_points]))
+
+
+def _subsampled_dbcv_score(
+    reduced_data: np.ndarray,
+    cluster_labels: np.ndarray,
+    mst: Optional[np.ndarray] = None
+) -> float:
+    """在固定种子的分层子样本上计算DBCV（每个簇按比例抽样，至少保留3个点）"""
+    valid_indices = np.flatnonzero(cluster_labels != -1)
+    if len(valid_indices) <= _DBCV_SUBSAMPLE_SIZE:
+        return _dbcv_score(reduced_data, cluster_labels)
+
+    rng = np.random.default_rng(42)
+    fraction = _DBCV_SUBSAMPLE_SIZE / len(valid_indices)
+    sampled = []
+    for label in np.unique(cluster_labels[valid_indices]):
+        members = valid_indices[cluster_labels[valid_indices] == label]
+        n_take = min(len(members), max(_DBCV_SUBSAMPLE_MIN_PER_CLUSTER, int(round(len(members) * fraction))))
+        sampled.append(rng.choice(members, size=n_take, replace=False))
+    sampled = np.sort(np.concatenate(sampled))
+    return _dbcv_score(reduced_data[sampled], cluster_labels[sampled])
+
+
+def _relative_validity_score(
+    reduced_data: np.ndarray,
+    cluster_labels: np.ndarray,
+    mst: Optional[np.ndarray] = None
+) -> float:
+    """基于互达距离最小生成树的快速DBCV近似，与 HDBSCAN.relative_validity_ 的计算相同
+
+    mst 为 (n-1, 3) 的边数组 [from, to, distance]，由HDBSCAN拟合时生成（gen_min_span_tree=True）
+    """
+    if mst is None:
+        raise ValueError("relative_validity 需要最小生成树")
+
+    sizes = np.bincount(cluster_labels + 1)
+    noise_size = sizes[0]
+    cluster_size = sizes[1:]
+    total = noise_size + np.sum(cluster_size)
+    num_clusters = len(cluster_size)
+    dsc = np.zeros(num_clusters)
+    dspc_wrt = np.ones(num_clusters) * np.inf
+    min_outlier_sep = np.inf
+    correction_const = 2
+
+    edge_from = mst[:, 0].astype(np.intp)
+    edge_to = mst[:, 1].astype(np.intp)
+    edge_dist = mst[:, 2]
+    label1 = cluster_labels[edge_from]
+    label2 = cluster_labels[edge_to]
+    max_distance = edge_dist.max() if edge_dist.shape[0] > 0 else 0.0
+
+    both_noise = (label1 == -1) & (label2 == -1)
+    one_noise = (label1 == -1) ^ (label2 == -1)
+    neither_noise = ~both_noise & ~one_noise
+    if one_noise.any():
+        min_outlier_sep = edge_dist[one_noise].min()
+
+    same_cluster = neither_noise & (label1 == label2)
+    diff_cluster = neither_noise & (label1 != label2)
+    if same_cluster.any():
+        np.maximum.at(dsc, label1[same_cluster], edge_dist[same_cluster])
+    if diff_cluster.any():
+        np.minimum.at(dspc_wrt, label1[diff_cluster], edge_dist[diff_cluster])
+        np.minimum.at(dspc_wrt, label2[diff_cluster], edge_dist[diff_cluster])
+
+    min_outlier_sep = max_distance if min_outlier_sep == np.inf else min_outlier_sep
+    correction = correction_const * (max_distance if num_clusters > 1 else min_outlier_sep)
+    dspc_wrt[np.where(dspc_wrt == np.inf)] = correction
+
+    v_index = (dspc_wrt - dsc) / np.maximum(dspc_wrt, dsc)
+    return float(np.sum(cluster_size * v_index / total))
+
+
+# 评分器注册表：新增评分器只需注册一个 (reduced_data, labels, mst) -> float 函数
+CLUSTER_SCORERS: Dict[str, Callable[..., float]] = {
+    'dbcv': _dbcv_score,
+    'relative_validity': _relative_validity_score,
+    'dbcv_subsample': _subsampled_dbcv_score,
+}
+_MST_SCORERS = ('relative_validity',)
+
+
+def _score_candidate_labels(
+    reduced_data: np.ndarray,
+    cluster_labels: np.ndarray,
+    scorer: str = 'dbcv',
+    mst: Optional[np.ndarray] = None
+) -> Optional[Dict[str, Any]]:
+    """用指定评分器给单个候选聚类结果打分，无有效分数时返回None
+
+    返回值中的 labels 供调用方保留最佳候选，不需要时应及时丢弃
+    """
+    # 跳过全是噪声的结果
+    if np.all(cluster_labels == -1):
+        logger.debug("跳过：所有点都是噪声")
+        return None
+
+    valid_points = cluster_labels != -1
+    if valid_points.sum() <= 1 or len(set(cluster_labels[valid_points])) <= 1:
+        return None
+    start = time.perf_counter()
+    try:
+        score = CLUSTER_SCORERS[scorer](reduced_data, cluster_labels, mst)
+    except Exception as e:
+        # DBCV有时会在奇怪的簇形状上失败
+        logger.debug(f"{scorer} 评分失败: {e}")
+        return None
+    if not np.isfinite(score):
+        return None
+
+    return {
+        "score": float(score),
+        "n_clusters": len(set(cluster_labels[valid_points])),
+        "n_outliers": int(np.sum(cluster_labels == -1)),
+        "score_seconds": time.perf_counter() - start,
+        "labels": cluster_labels,
+    }
+
+
+class _HdbscanSweep:
+    """固定降维矩阵上的HDBSCAN参数扫描
+
+    互达距离最小生成树与单链接树只取决于数据和 min_samples，与 min_cluster_size、
+    cluster_selection_epsilon 无关：每个 min_samples 只完整拟合一次并保留单链接树，
+    其余组合只重新压缩树并选簇（与 HDBSCAN.fit 内部使用同一个 _tree_to_labels，结果一致）。
+    评分器需要最小生成树时一并保留。当前hdbscan版本没有 _tree_to_labels（或签名不兼容）时，
+    每个组合都完整拟合。
+    """
+
+    def __init__(
+        self, reduced_data: np.ndarray, metric: str, scorer: str = 'dbcv', execution_mode: str = 'reproducible'
+    ):
+        self.reduced_data = reduced_data
+        self.metric = metric
+        self.scorer = scorer
+        self.core_dist_n_jobs = _execution_params(execution_mode)["core_dist_n_jobs"]
+        self._trees: Dict[int, np.ndarray] = {}
+        self._msts: Dict[int, np.ndarray] = {}
+        self._relabel = TREE_RELABEL_AVAILABLE
+
+    def labels(self, min_cluster_size: int, min_samples: int, epsilon: float) -> Tuple[np.ndarray, np.ndarray]:
+        """返回 (簇标签, 簇归属强度)"""
+        tree = self._trees.get(min_samples) if self._relabel else None
+        if tree is not None:
+            try:
+                cluster_labels, probabilities, *_ = _tree_to_labels(
+                    self.reduced_data,
+                    tree,
+                    min_cluster_size=min_cluster_size,
+                    cluster_selection_method='eom',
+                    cluster_selection_epsilon=epsilon,
+                )
+                return cluster_labels, probabilities
+            except TypeError as e:
+                # 内部函数签名与当前hdbscan版本不符，回退到完整拟合
+                logger.warning(f"_tree_to_labels 调用失败，回退到完整HDBSCAN拟合: {e}")
+                self._relabel = False
+                self._trees.clear()
+
+        need_mst = self.scorer in _MST_SCORERS
+        clusterer = hdbscan.HDBSCAN(
+            min_cluster_size=min_cluster_size,
+            min_samples=min_samples,
+            cluster_selection_epsilon=epsilon,
+            metric=self.metric,
+            gen_min_span_tree=need_mst,
+            core_dist_n_jobs=self.core_dist_n_jobs
+        ).fit(self.reduced_data)
+        if self._relabel:
+            self._trees[min_samples] = clusterer.single_linkage_tree_.to_numpy()
+        if need_mst:
+            self._msts[min_samples] = clusterer.minimum_spanning_tree_.to_numpy()
+        return clusterer.labels_, clusterer.probabilities_
+
+    def evaluate(self, min_cluster_size: int, min_samples: int, epsilon: float) -> Optional[Dict[str, Any]]:
+        """对单个HDBSCAN参数组合聚类并评分，无有效分数时返回None"""
+        try:
+            cluster_labels, probabilities = self.labels(min_cluster_size, min_samples, epsilon)
+        except Exception as e:
+            logger.debug(f"聚类失败: {e}")
+            return None
+        evaluation = _score_candidate_labels(
+            self.reduced_data, cluster_labels, self.scorer, self._msts.get(min_samples)
+        )
+        if evaluation is not None:
+            evaluation["probabilities"] = probabilities
+        return evaluation
+
+
+class _CandidateTracker:
+    """只保留得分最高的 capacity 个候选的降维结果与标签（用于复用最佳结果和精确重排）
+
+    按 (分数降序, 网格顺序) 排序，分数需高于-1；同分时网格顺序靠前者优先，
+    与最终按网格顺序选取的规则一致，因此保留的结果与评估顺序无关。
+    """
+
+    def __init__(self, capacity: int = 1):
+        self.capacity = max(1, capacity)
+        # (score, key, reduced_data, labels, probabilities)
+        self.entries: List[Tuple[
+            float, Tuple[int, int], Optional[np.ndarray], Optional[np.ndarray], Optional[np.ndarray]
+        ]] = []
+
+    def offer(
+        self,
+        key: Tuple[int, int],
+        evaluation: Optional[Dict[str, Any]],
+        reduced_data: Optional[np.ndarray]
+    ) -> None:
+        """提交一个候选；评估结果中的 labels/probabilities 会被取出，不再留在结果字典里"""
+        if evaluation is None:
+            return
+        labels = evaluation.pop("labels", None)
+        probabilities = evaluation.pop("probabilities", None)
+        if evaluation["score"] <= -1:
+            return
+        self.entries.append((evaluation["score"], key, reduced_data, labels, probabilities))
+        self.entries.sort(key=lambda entry: (-entry[0], entry[1]))
+        del self.entries[self.capacity:]
+
+    def get(
+        self, key: Optional[Tuple[int, int]]
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray], Optional[np.ndarray]]:
+        """返回指定候选保留的 (reduced_data, labels, probabilities)，未保留时均为None"""
+        for _, entry_key, reduced_data, labels, probabilities in self.entries:
+            if entry_key == key:
+                return reduced_data, labels, probabilities
+        return None, None, None
+
+
+# ----------------------------------------------------------------------------
+# 并行网格搜索：UMAP候选与HDBSCAN评估分发到进程池，矩阵通过共享内存传递
+# ----------------------------------------------------------------------------
+
+_search_pool: Optional[ProcessPoolExecutor] = None
+_search_pool_workers = 0
+
+
+def _get_search_pool(n_jobs: int) -> ProcessPoolExecutor:
+    """进程池在多次搜索间复用，避免重复启动进程和numba编译"""
+    global _search_pool, _search_pool_workers
+    if _search_pool is None or _search_pool_workers != n_jobs:
+        if _search_pool is not None:
+            _search_pool.shutdown(wait=False)
+        _search_pool = ProcessPoolExecutor(
+            max_workers=n_jobs, mp_context=multiprocessing.get_context("spawn")
+        )
+        _search_pool_workers = n_jobs
+    return _search_pool
+
+
+def _share_array(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, Tuple[str, Tuple[int, ...], str]]:
+    """复制数组到共享内存，返回共享内存对象和供子进程挂载的描述"""
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _attach_array(spec: Tuple[str, Tuple[int, ...], str]) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """在子进程中挂载共享内存数组（零拷贝视图）"""
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _umap_task(
+    spec, knn_specs, n_neighbors: int, n_components: int, min_dist: float, metric: str,
+    execution_mode: str, n_epochs: Optional[int]
+) -> Optional[np.ndarray]:
+    shm, embeddings = _attach_array(spec)
+    knn_shms, knn = [], None
+    if knn_specs is not None:
+        attached = [_attach_array(knn_spec) for knn_spec in knn_specs]
+        knn_shms = [knn_shm for knn_shm, _ in attached]
+        knn = tuple(array for _, array in attached)
+        del attached
+    try:
+        return _fit_umap_candidate(
+            embeddings, n_neighbors, n_components, min_dist, metric, knn, execution_mode, n_epochs
+        )
+    finally:
+        del embeddings, knn
+        for segment in [shm, *knn_shms]:
+            segment.close()
+
+
+def _hdbscan_task(
+    spec, combos: List[Tuple[int, int, float]], metric: str, scorer: str, keep: int, execution_mode: str
+) -> List[Optional[Dict[str, Any]]]:
+    shm, reduced_data = _attach_array(spec)
+    try:
+        sweep = _HdbscanSweep(reduced_data, metric, scorer, execution_mode)
+        evaluations = [
+            sweep.evaluate(min_cluster_size, min_samples, epsilon)
+            for min_cluster_size, min_samples, epsilon in combos
+        ]
+        del sweep
+        # 只回传块内前 keep 名候选的标签，减少进程间传输
+        tracker = _CandidateTracker(keep)
+        for position, evaluation in enumerate(evaluations):
+            tracker.offer((0, position), evaluation, None)
+        for _, (_, position), _, labels, probabilities in tracker.entries:
+            evaluations[position]["labels"] = labels
+            evaluations[position]["probabilities"] = probabilities
+        return evaluations
+    finally:
+        del reduced_data
+        shm.close()
+
+
+def _search_parallel(
+    processed_embeddings: np.ndarray,
+    n_neighbors_list: List[int],
+    hdbscan_combos: List[Tuple[int, int, float]],
+    candidates_by_nn: Dict[int, List[int]],
+    n_components: int,
+    grid_config: GridSearchConfig,
+    n_jobs: int,
+    tracker: Optional[_CandidateTracker] = None,
+    knn: Optional[Tuple[np.ndarray, np.ndarray]] = None
+) -> Dict[Tuple[int, int], Optional[Dict[str, Any]]]:
+    """并行评估候选组合，结果按 (n_neighbors序号, 组合序号) 索引"""
+    pool = _get_search_pool(n_jobs)
+    shared: List[shared_memory.SharedMemory] = []
+    results: Dict[Tuple[int, int], Optional[Dict[str, Any]]] = {}
+
+    try:
+        input_shm, input_spec = _share_array(processed_embeddings)
+        shared.append(input_shm)
+        knn_specs = None
+        if knn is not None:
+            knn_specs = []
+            for array in knn:
+                knn_shm, knn_spec = _share_array(array)
+                shared.append(knn_shm)
+                knn_specs.append(knn_spec)
+
+        umap_futures = {
+            pool.submit(
+                _umap_task, input_spec, knn_specs, n_neighbors_list[nn_idx], n_components,
+                grid_config.umap_min_dist, grid_config.umap_metric, grid_config.execution_mode,
+                grid_config.umap_n_epochs
+            ): nn_idx
+            for nn_idx in candidates_by_nn
+        }
+
+        hdbscan_futures = {}
+        reduced_by_nn: Dict[int, np.ndarray] = {}
+        for future in as_completed(umap_futures):
+            nn_idx = umap_futures[future]
+            reduced_data = future.result()
+            combo_indices = candidates_by_nn[nn_idx]
+            if reduced_data is None:
+                for combo_idx in combo_indices:
+                    results[(nn_idx, combo_idx)] = None
+                continue
+            reduced_by_nn[nn_idx] = reduced_data
+            reduced_shm, reduced_spec = _share_array(reduced_data)
+            shared.append(reduced_shm)
+            # 按 min_samples 分块：同一块内共享单链接树，每块分发给空闲进程
+            chunks: Dict[int, List[int]] = {}
+            for combo_idx in combo_indices:
+                chunks.setdefault(hdbscan_combos[combo_idx][1], []).append(combo_idx)
+            for chunk in chunks.values():
+                hdbscan_futures[pool.submit(
+                    _hdbscan_task, reduced_spec, [hdbscan_combos[i] for i in chunk],
+                    grid_config.hdbscan_metric, grid_config.scorer,
+                    tracker.capacity if tracker is not None else 1, grid_config.execution_mode
+                )] = (nn_idx, chunk)
+
+        for future in as_completed(hdbscan_futures):
+            nn_idx, chunk = hdbscan_futures[future]
+            for combo_idx, evaluation in zip(chunk, future.result()):
+                if tracker is not None:
+                    tracker.offer((nn_idx, combo_idx), evaluation, reduced_by_nn[nn_idx])
+                elif evaluation is not None:
+                    evaluation.pop("labels", None)
+                    evaluation.pop("probabilities", None)
+                results[(nn_idx, combo_idx)] = evaluation
+    finally:
+        for shm in shared:
+            shm.close()
+            shm.unlink()
+
+    return results
+
+
+def _evaluate_candidates(
+    processed_embeddings: np.ndarray,
+    n_neighbors_list: List[int],
+    hdbscan_combos: List[Tuple[int, int, float]],
+    candidates: List[Tuple[int, int]],
+    n_components: int,
+    grid_config: GridSearchConfig,
+    n_jobs: int,
+    tracker: Optional[_CandidateTracker] = None
+) -> Dict[Tuple[int, int], Optional[Dict[str, Any]]]:
+    """评估给定的候选组合；同一n_neighbors只拟合一次UMAP
+
+    传入 tracker 时保留最佳候选的降维结果与标签（仅用于完整数据上的评估）
+    """
+    candidates_by_nn: Dict[int, List[int]] = {}
+    for nn_idx, combo_idx in candidates:
+        candidates_by_nn.setdefault(nn_idx, []).append(combo_idx)
+
+    # 所有n_neighbors候选共享一张kNN图（按最大的k计算一次），每次UMAP只做图构建与布局
+    knn = _shared_knn_graph(
+        processed_embeddings, [n_neighbors_list[nn_idx] for nn_idx in candidates_by_nn],
+        grid_config.umap_metric, grid_config.knn_method, grid_config.execution_mode,
+        grid_config.nndescent_n_trees, grid_config.nndescent_n_iters
+    )
+
+    n_jobs = max(1, min(n_jobs, len(candidates)))
+    if n_jobs > 1:
+        return _search_parallel(
+            processed_embeddings, n_neighbors_list, hdbscan_combos, candidates_by_nn,
+            n_components, grid_config, n_jobs, tracker, knn
+        )
+
+    results: Dict[Tuple[int, int], Optional[Dict[str, Any]]] = {}
+    for nn_idx, combo_indices in candidates_by_nn.items():
+        n_neighbors = n_neighbors_list[nn_idx]
+        # 对每个n_neighbors配置拟合UMAP一次
+        logger.info(f"测试UMAP n_neighbors={n_neighbors}")
+        reduced_data = _fit_umap_candidate(
+            processed_embeddings, n_neighbors, n_components,
+            grid_config.umap_min_dist, grid_config.umap_metric, knn,
+            grid_config.execution_mode, grid_config.umap_n_epochs
+        )
+        sweep = None if reduced_data is None else _HdbscanSweep(
+            reduced_data, grid_config.hdbscan_metric, grid_config.scorer, grid_config.execution_mode
+        )
+        for combo_idx in combo_indices:
+            min_cluster_size, min_samples, epsilon = hdbscan_combos[combo_idx]
+            logger.debug(f"测试组合: n_neighbors={n_neighbors}, min_cluster_size={min_cluster_size}, "
+                         f"min_samples={min_samples}, epsilon={epsilon}")
+            evaluation = None if sweep is None else sweep.evaluate(min_cluster_size, min_samples, epsilon)
+            if tracker is not None:
+                tracker.offer((nn_idx, combo_idx), evaluation, reduced_data)
+            elif evaluation is not None:
+                evaluation.pop("labels", None)
+                evaluation.pop("probabilities", None)
+            results[(nn_idx, combo_idx)] = evaluation
+    return results
+
+
+def _search_early_stopping(
+    processed_embeddings: np.ndarray,
+    n_neighbors_list: List[int],
+    hdbscan_combos: List[Tuple[int, int, float]],
+    candidates: List[Tuple[int, int]],
+    n_components: int,
+    grid_config: GridSearchConfig,
+    tracker: _CandidateTracker
+) -> Tuple[Dict[Tuple[int, int], Optional[Dict[str, Any]]], bool]:
+    """按给定顺序逐个评估，连续 patience 个候选没有提升DBCV时停止
+
+    逐个评估天然是串行的；UMAP结果（及其单链接树）按n_neighbors缓存，只在首次遇到时拟合。
+    返回评估结果和是否提前停止。
+    """
+    patience = max(1, grid_config.early_stopping_patience)
+    knn = _shared_knn_graph(
+        processed_embeddings, [n_neighbors_list[nn_idx] for nn_idx, _ in candidates],
+        grid_config.umap_metric, grid_config.knn_method, grid_config.execution_mode,
+        grid_config.nndescent_n_trees, grid_config.nndescent_n_iters
+    )
+    sweeps: Dict[int, Optional[_HdbscanSweep]] = {}
+    results: Dict[Tuple[int, int], Optional[Dict[str, Any]]] = {}
+    best_score = -np.inf
+    since_improvement = 0
+
+    for nn_idx, combo_idx in candidates:
+        if nn_idx not in sweeps:
+            logger.info(f"测试UMAP n_neighbors={n_neighbors_list[nn_idx]}")
+            reduced_data = _fit_umap_candidate(
+                processed_embeddings, n_neighbors_list[nn_idx], n_components,
+                grid_config.umap_min_dist, grid_config.umap_metric, knn,
+                grid_config.execution_mode, grid_config.umap_n_epochs
+            )
+            sweeps[nn_idx] = None if reduced_data is None else _HdbscanSweep(
+                reduced_data, grid_config.hdbscan_metric, grid_config.scorer, grid_config.execution_mode
+            )
+        sweep = sweeps[nn_idx]
+        min_cluster_size, min_samples, epsilon = hdbscan_combos[combo_idx]
+        evaluation = None if sweep is None else sweep.evaluate(min_cluster_size, min_samples, epsilon)
+        tracker.offer((nn_idx, combo_idx), evaluation, None if sweep is None else sweep.reduced_data)
+        results[(nn_idx, combo_idx)] = evaluation
+
+        if evaluation is not None and evaluation["score"] > best_score:
+            best_score = evaluation["score"]
+            since_improvement = 0
+        else:
+            since_improvement += 1
+        if since_improvement >= patience:
+            stopped_early = len(results) < len(candidates)
+            if stopped_early:
+                logger.info(f"连续 {patience} 个候选DBCV无提升，提前停止 (已评估 {len(results)}/{len(candidates)})")
+            return results, stopped_early
+
+    return results, False
+
+
+def _search_successive_halving(
+    processed_embeddings: np.ndarray,
+    n_neighbors_grid: List[int],
+    hdbscan_combos: List[Tuple[int, int, float]],
+    candidates: List[Tuple[int, int]],
+    n_components: int,
+    grid_config: GridSearchConfig,
+    n_jobs: int,
+    rng: np.random.Generator,
+    tracker: _CandidateTracker
+) -> Tuple[Dict[Tuple[int, int], Optional[Dict[str, Any]]], int]:
+    """连续减半：先在小子样本上评估全部候选，每轮保留DBCV最高的 1/factor，
+    子样本按 factor 倍增大，最后一轮在完整数据上评估幸存者
+
+    子样本互相嵌套（同一随机排列的前缀），返回最后一轮的评估结果和累计评估次数。
+    """
+    n_samples = processed_embeddings.shape[0]
+    factor = max(2, grid_config.halving_factor)
+    min_subsample = max(grid_config.halving_min_samples, 2)
+
+    # 轮数：候选数减到1所需的轮数，且最小子样本不低于 halving_min_samples
+    n_rungs = 1
+    while factor ** n_rungs < len(candidates) and n_samples // factor ** n_rungs >= min_subsample:
+        n_rungs += 1
+
+    order = rng.permutation(n_samples)
+    survivors = list(candidates)
+    evaluated = 0
+
+    for rung in range(n_rungs):
+        is_last = rung == n_rungs - 1
+        subsample_size = n_samples if is_last else n_samples // factor ** (n_rungs - 1 - rung)
+        subsample = processed_embeddings if is_last else processed_embeddings[np.sort(order[:subsample_size])]
+
+        # n_neighbors 与降维维数按子样本大小重新取安全值
+        n_neighbors_list = [get_safe_n_neighbors(subsample_size, n) for n in n_neighbors_grid]
+        rung_components = min(n_components, subsample_size - 1)
+        logger.info(f"连续减半第 {rung + 1}/{n_rungs} 轮: 子样本 {subsample_size}, 候选 {len(survivors)}")
+
+        results = _evaluate_candidates(
+            subsample, n_neighbors_list, hdbscan_combos, survivors,
+            rung_components, grid_config, n_jobs, tracker if is_last else None
+        )
+        evaluated += len(survivors)
+        if is_last:
+            return results, evaluated
+
+        # 稳定排序：同分时保持网格顺序
+        ranked = sorted(
+            survivors,
+            key=lambda c: -results[c]["score"] if results.get(c) is not None else np.inf
+        )
+        n_keep = max(1, -(-len(survivors) // factor))
+        survivors = sorted(ranked[:n_keep])
+
+    return {}, evaluated
+
+
 def optimize_clusters(
     embeddings: np.ndarray,
     grid_config: Optional[GridSearchConfig] = None
-) -> Tuple[Dict[str, Any], float]:
+) -> GridSearchResult:
     """
     网格搜索优化聚类参数 - 基于reportV5.md实现
     
+    搜索策略由 grid_config.search_strategy 决定：
+    - exhaustive: 评估完整网格
+    - random: 随机抽取至多 max_combinations 个组合
+    - successive_halving: 在逐步增大的子样本上淘汰候选，只有幸存者在完整数据上评估
+    - early_stopping: 随机顺序逐个评估（至多 max_combinations 个），
+      连续 early_stopping_patience 个组合DBCV无提升即停止
+    
+    抽样使用 grid_config.random_state；execution_mode 为 reproducible 时搜索结果可复现。
+    grid_config.n_jobs > 1 时在进程池中并行搜索（early_stopping 除外）；最佳结果按固定的
+    网格顺序选取（分数严格更高才替换），因此与串行搜索完全一致。
+    
     Args:
         embeddings: 输入的嵌入向量
         grid_config: 网格搜索配置
         
     Returns:
-        最佳参数配置和对应的DBCV分数
+        最佳参数配置、对应的DBCV分数和搜索统计
     """
     validate_clustering_availability()
     
+    if grid_config is None:
+        grid_config = GridSearchConfig()
+    if grid_config.search_strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"不支持的搜索策略: {grid_config.search_strategy}")
+    if grid_config.scorer not in CLUSTER_SCORERS:
+        raise ValueError(f"不支持的评分器: {grid_config.scorer}")
+    _execution_params(grid_config.execution_mode)
+    
     n_samples = embeddings.shape[0]
     
     # 检查数据集大小，小数据集直接返回默认配置
     if n_samples <= 5:
         logger.warning(f"数据集过小 (n_samples={n_samples})，跳过参数优化，使用默认配置")
-        default_config = ClusteringConfig()
-        
-        # 为小数据集调整默认参数
-        safe_n_neighbors = get_safe_n_neighbors(n_samples, default_config.umap_n_neighbors)
-        safe_min_cluster_size = get_safe_min_cluster_size(n_samples, default_config.hdbscan_min_cluster_size)
-        
-        best_params = {
-            "umap": {
-                "n_neighbors": safe_n_neighbors,
-                "n_components": min(default_config.umap_n_components, n_samples - 1),
-                "min_dist": default_config.umap_min_dist,
-                "metric": default_config.umap_metric
-            },
-            "hdbscan": {
-                "min_cluster_size": safe_min_cluster_size,
-                "min_samples": min(default_config.hdbscan_min_samples, safe_min_cluster_size - 1),
-                "epsilon": default_config.hdbscan_cluster_selection_epsilon,
-                "metric": default_config.hdbscan_metric
-            }
-        }
-        return best_params, -1.0
+        return GridSearchResult(
+            best_params=_default_best_params(n_samples),
+            best_score=-1.0,
+            search_strategy=grid_config.search_strategy,
+            search_space_size=0,
+            evaluated_combinations=0,
+            scorer=grid_config.scorer,
+            final_scorer=grid_config.scorer,
+        )
     
-    if grid_config is None:
-        grid_config = GridSearchConfig()
+    # 为当前数据集大小调整搜索网格（排序保证遍历顺序固定）
+    n_neighbors_grid = sorted(set(grid_config.umap_n_neighbors))
+    safe_n_neighbors_list = [get_safe_n_neighbors(n_samples, n) for n in n_neighbors_grid]
+    safe_min_cluster_sizes = sorted(set(
+        get_safe_min_cluster_size(n_samples, size) for size in grid_config.hdbscan_min_cluster_size
+    ))
     
-    # 为当前数据集大小调整搜索网格
-    safe_n_neighbors_list = [
-        get_safe_n_neighbors(n_samples, n) for n in grid_config.umap_n_neighbors
-    ]
-    safe_n_neighbors_list = list(set(safe_n_neighbors_list))  # 去重
+    # HDBSCAN参数组合（与n_neighbors无关），确保 min_samples 不会太大
+    hdbscan_combos = []
+    for min_cluster_size in safe_min_cluster_sizes:
+        for min_samples in grid_config.hdbscan_min_samples:
+            safe_min_samples = max(1, min(min_samples, min_cluster_size - 1, n_samples - 1))
+            for epsilon in grid_config.hdbscan_epsilon:
+                combo = (min_cluster_size, safe_min_samples, epsilon)
+                if combo not in hdbscan_combos:
+                    hdbscan_combos.append(combo)
     
-    safe_min_cluster_sizes = [
-        get_safe_min_cluster_size(n_samples, size) for size in grid_config.hdbscan_min_cluster_size
-    ]
-    safe_min_cluster_sizes = list(set(safe_min_cluster_sizes))  # 去重
+    # 小数据集上多个n_neighbors可能被截断为同一值，只保留第一个
+    nn_indices = [i for i, n in enumerate(safe_n_neighbors_list) if n not in safe_n_neighbors_list[:i]]
+    all_candidates = [(nn_idx, combo_idx) for nn_idx in nn_indices for combo_idx in range(len(hdbscan_combos))]
+    total_combinations = len(all_candidates)
+    safe_n_components = min(grid_config.umap_n_components, n_samples - 1, embeddings.shape[1])
     
-    best_score = -1
-    best_params = None
+    strategy = grid_config.search_strategy
+    budget = total_combinations
+    if strategy != "exhaustive" and grid_config.max_combinations:
+        budget = min(budget, grid_config.max_combinations)
+    rng = np.random.default_rng(grid_config.random_state)
     
-    logger.info(f"开始网格搜索参数优化 (数据集大小: {n_samples})...")
-    logger.info(f"调整后的搜索空间: n_neighbors={safe_n_neighbors_list}, min_cluster_sizes={safe_min_cluster_sizes}")
+    logger.info(f"开始网格搜索参数优化 (数据集大小: {n_samples}, 策略: {strategy}, "
+                f"搜索空间: {total_combinations}, 预算: {budget}, 并行进程: {grid_config.n_jobs})...")
+    logger.info(f"调整后的搜索空间: n_neighbors={sorted(set(safe_n_neighbors_list))}, "
+                f"min_cluster_sizes={safe_min_cluster_sizes}")
     
-    # 预处理嵌入
+    # 预处理嵌入；预降维只拟合一次，所有候选（包括连续减半的子样本）共享
     processed_embeddings = preprocess_embeddings(embeddings, normalize=True)
-    
-    total_combinations = (
-        len(safe_n_neighbors_list) * 
-        len(safe_min_cluster_sizes) * 
-        len(grid_config.hdbscan_min_samples) * 
-        len(grid_config.hdbscan_epsilon)
+    processed_embeddings, pre_reduction, _ = pre_reduce_embeddings(
+        processed_embeddings, grid_config.pre_reduction, grid_config.pre_reduction_dim
     )
+    safe_n_components = min(safe_n_components, processed_embeddings.shape[1])
     
-    current_combination = 0
-    
-    # 网格搜索UMAP和HDBSCAN参数
-    for n_neighbors in safe_n_neighbors_list:
-        # 对每个n_neighbors配置拟合UMAP一次
-        logger.info(f"测试UMAP n_neighbors={n_neighbors}")
-        
-        safe_n_components = min(grid_config.umap_n_components, n_samples - 1, embeddings.shape[1])
-        
-        try:
-            reducer = umap.UMAP(
-                n_neighbors=n_neighbors,
-                n_components=safe_n_components,
-                min_dist=grid_config.umap_min_dist,
-                metric=grid_config.umap_metric,
-                random_state=42,
-                verbose=False
-            )
-            reduced_data = reducer.fit_transform(processed_embeddings)
-        except Exception as e:
-            logger.warning(f"UMAP降维失败 (n_neighbors={n_neighbors}): {e}")
-            continue
-        
-        for min_cluster_size in safe_min_cluster_sizes:
-            for min_samples in grid_config.hdbscan_min_samples:
-                # 确保 min_samples 不会太大
-                safe_min_samples = min(min_samples, min_cluster_size - 1, n_samples - 1)
-                safe_min_samples = max(1, safe_min_samples)
-                
-                for epsilon in grid_config.hdbscan_epsilon:
-                    current_combination += 1
-                    
-                    logger.debug(f"测试组合 {current_combination}/{total_combinations}: "
-                               f"n_neighbors={n_neighbors}, min_cluster_size={min_cluster_size}, "
-                               f"min_samples={safe_min_samples}, epsilon={epsilon}")
-                    
-                    try:
-                        # 使用HDBSCAN进行聚类
-                        clusterer = hdbscan.HDBSCAN(
-                            min_cluster_size=min_cluster_size,
-                            min_samples=safe_min_samples,
-                            cluster_selection_epsilon=epsilon,
-                            metric=grid_config.hdbscan_metric,
-                            prediction_data=True,
-                            core_dist_n_jobs=1  # 避免并行问题
-                        )
-                        
-                        cluster_labels = clusterer.fit_predict(reduced_data)
-                        
-                        # 跳过全是噪声的结果
-                        if np.all(cluster_labels == -1):
-                            logger.debug("跳过：所有点都是噪声")
-                            continue
-                        
-                        # 使用DBCV评估聚类质量
-                        valid_points = cluster_labels != -1
-                        if (valid_points.sum() > 1 and 
-                            len(set(cluster_labels[valid_points])) > 1):
-                            try:
-                                # 转换为float64以避免精度问题
-                                reduced_data_64 = reduced_data[valid_points].astype(np.float64)
-                                score = validity_index(
-                                    reduced_data_64, 
-                                    cluster_labels[valid_points]
-                                )
-                                
-                                if score > best_score:
-                                    best_score = score
-                                    best_params = {
-                                        "umap": {
-                                            "n_neighbors": n_neighbors,
-                                            "n_components": safe_n_components,
-                                            "min_dist": grid_config.umap_min_dist,
-                                            "metric": grid_config.umap_metric
-                                        },
-                                        "hdbscan": {
-                                            "min_cluster_size": min_cluster_size,
-                                            "min_samples": safe_min_samples,
-                                            "epsilon": epsilon,
-                                            "metric": grid_config.hdbscan_metric
-                                        },
-                                        "clustering_stats": {
-                                            "n_clusters": len(set(cluster_labels[valid_points])),
-                                            "n_outliers": int(np.sum(cluster_labels == -1)),
-                                            "dbcv_score": float(score)
-                                        }
-                                    }
-                                    logger.info(f"新的最佳配置: DBCV={score:.4f}")
-                                    
-                            except Exception as e:
-                                # DBCV有时会在奇怪的簇形状上失败
-                                logger.debug(f"DBCV计算失败: {e}")
-                                continue
-                                
-                    except Exception as e:
-                        logger.debug(f"聚类失败: {e}")
-                        continue
+    # 非精确评分器需要保留前 rerank_top_k 名候选，用精确DBCV重排
+    rerank = grid_config.scorer != 'dbcv' and grid_config.rerank_top_k > 0
+    tracker = _CandidateTracker(grid_config.rerank_top_k if rerank else 1)
+    stopped_early = False
+    if strategy == "early_stopping":
+        order = [all_candidates[i] for i in rng.permutation(total_combinations)[:budget]]
+        results, stopped_early = _search_early_stopping(
+            processed_embeddings, safe_n_neighbors_list, hdbscan_combos, order,
+            safe_n_components, grid_config, tracker
+        )
+        evaluated = len(results)
+    elif strategy == "successive_halving":
+        # 初始候选同样受预算约束
+        sampled = sorted(rng.choice(total_combinations, size=budget, replace=False))
+        results, evaluated = _search_successive_halving(
+            processed_embeddings, n_neighbors_grid, hdbscan_combos,
+            [all_candidates[i] for i in sampled], safe_n_components,
+            grid_config, grid_config.n_jobs, rng, tracker
+        )
+    else:
+        if budget < total_combinations:
+            sampled = sorted(rng.choice(total_combinations, size=budget, replace=False))
+            candidates = [all_candidates[i] for i in sampled]
+        else:
+            candidates = all_candidates
+        results = _evaluate_candidates(
+            processed_embeddings, safe_n_neighbors_list, hdbscan_combos, candidates,
+            safe_n_components, grid_config, grid_config.n_jobs, tracker
+        )
+        evaluated = len(candidates)
     
-    if best_params is None:
-        logger.warning("未找到有效的聚类参数组合，使用默认配置")
-        # 返回安全的默认配置
-        default_config = ClusteringConfig()
-        safe_n_neighbors = get_safe_n_neighbors(n_samples, default_config.umap_n_neighbors)
-        safe_min_cluster_size = get_safe_min_cluster_size(n_samples, default_config.hdbscan_min_cluster_size)
-        
+    scoring_seconds = sum(
+        evaluation.get("score_seconds", 0.0) for evaluation in results.values() if evaluation is not None
+    )
+
+    # 按固定网格顺序选取最佳结果（分数严格更高才替换）
+    best_score = -1
+    best_key = None
+    for key in all_candidates:
+        evaluation = results.get(key)
+        if evaluation is not None and evaluation["score"] > best_score:
+            best_score = evaluation["score"]
+            best_key = key
+
+    final_scorer = grid_config.scorer
+    reranked = 0
+    if rerank and tracker.entries:
+        # 只对排名靠前的候选计算精确DBCV，按精确分数重新选取（同分取网格顺序靠前者）
+        finalists = []
+        for _, key, reduced_data, labels, _ in tracker.entries:
+            if labels is None:
+                continue
+            evaluation = _score_candidate_labels(reduced_data, labels, 'dbcv')
+            reranked += 1
+            if evaluation is None:
+                continue
+            scoring_seconds += evaluation["score_seconds"]
+            finalists.append((evaluation["score"], key))
+        if finalists:
+            best_score, best_key = min(finalists, key=lambda item: (-item[0], item[1]))
+            final_scorer = 'dbcv'
+            logger.info(f"精确DBCV重排 {reranked} 个候选: 最佳DBCV={best_score:.4f}")
+
+    best_params = None
+    if best_key is not None:
+        nn_idx, combo_idx = best_key
+        min_cluster_size, min_samples, epsilon = hdbscan_combos[combo_idx]
+        evaluation = results[best_key]
         best_params = {
             "umap": {
-                "n_neighbors": safe_n_neighbors,
-                "n_components": min(default_config.umap_n_components, n_samples - 1),
-                "min_dist": default_config.umap_min_dist,
-                "metric": default_config.umap_metric
+                "n_neighbors": safe_n_neighbors_list[nn_idx],
+                "n_components": safe_n_components,
+                "min_dist": grid_config.umap_min_dist,
+                "metric": grid_config.umap_metric
             },
             "hdbscan": {
-                "min_cluster_size": safe_min_cluster_size,
-                "min_samples": min(default_config.hdbscan_min_samples, safe_min_cluster_size - 1),
-                "epsilon": default_config.hdbscan_cluster_selection_epsilon,
-                "metric": default_config.hdbscan_metric
+                "min_cluster_size": min_cluster_size,
+                "min_samples": min_samples,
+                "epsilon": epsilon,
+                "metric": grid_config.hdbscan_metric
+            },
+            "clustering_stats": {
+                "n_clusters": evaluation["n_clusters"],
+                "n_outliers": evaluation["n_outliers"],
+                "dbcv_score": best_score if final_scorer == 'dbcv' else None,
+                "score": best_score,
+                "scorer": final_scorer
             }
         }
+        logger.info(f"最佳配置: {final_scorer}={best_score:.4f}")
+
+    if best_params is None:
+        logger.warning("未找到有效的聚类参数组合，使用默认配置")
+        # 返回安全的默认配置
+        best_params = _default_best_params(n_samples)
         best_score = -1.0
-    
-    logger.info(f"参数优化完成: 最佳DBCV分数={best_score:.4f}")
-    return best_params, float(best_score)
+
+    logger.info(f"参数优化完成: 最佳{final_scorer}分数={best_score:.4f} "
+                f"(评估 {evaluated}/{total_combinations} 个组合, 评分耗时 {scoring_seconds:.2f}s)")
+    reduced_embeddings, cluster_labels, membership_strengths = tracker.get(best_key)
+    return GridSearchResult(
+        best_params=best_params,
+        best_score=float(best_score),
+        search_strategy=strategy,
+        search_space_size=total_combinations,
+        evaluated_combinations=evaluated,
+        stopped_early=stopped_early,
+        scorer=grid_config.scorer,
+        final_scorer=final_scorer,
+        reranked_candidates=reranked,
+        scoring_seconds=scoring_seconds,
+        pre_reduction=pre_reduction,
+        reduced_embeddings=reduced_embeddings,
+        cluster_labels=cluster_labels,
+        membership_strengths=membership_strengths,
+    )
 
 
 def cluster_embeddings_with_optimization(
     embeddings: np.ndarray,
     use_optimization: bool = False,
-    grid_config: Optional[GridSearchConfig] = None
+    grid_config: Optional[GridSearchConfig] = None,
+    persist_model: bool = False
 ) -> Dict[str, Any]:
     """
     带参数优化的聚类流程
@@ -444,6 +1583,8 @@ def cluster_embeddings_with_optimization(
         embeddings: 输入的嵌入向量
         use_optimization: 是否使用参数优化
         grid_config: 网格搜索配置
+        persist_model: 是否保存拟合的模型（见 cluster_embeddings）；搜索不保留拟合对象，
+            因此需要用最佳参数重新拟合一次
         
     Returns:
         包含聚类结果的字典
@@ -452,9 +1593,10 @@ def cluster_embeddings_with_optimization(
     
     if use_optimization:
         # 使用网格搜索找到最佳参数
-        best_params, best_score = optimize_clusters(embeddings, grid_config)
+        search_result = optimize_clusters(embeddings, grid_config)
+        best_params, best_score = search_result.best_params, search_result.best_score
         
-        # 使用最佳参数进行最终聚类
+        # 最佳参数对应的聚类配置
         config = ClusteringConfig()
         config.umap_n_neighbors = best_params["umap"]["n_neighbors"]
         config.umap_n_components = best_params["umap"]["n_components"]
@@ -464,26 +1606,60 @@ def cluster_embeddings_with_optimization(
         config.hdbscan_min_samples = best_params["hdbscan"]["min_samples"]
         config.hdbscan_cluster_selection_epsilon = best_params["hdbscan"]["epsilon"]
         config.hdbscan_metric = best_params["hdbscan"]["metric"]
+        if grid_config is not None:
+            config.execution_mode = grid_config.execution_mode
+            config.pre_reduction = grid_config.pre_reduction
+            config.pre_reduction_dim = grid_config.pre_reduction_dim
+            config.umap_n_epochs = grid_config.umap_n_epochs
+            config.knn_method = grid_config.knn_method
+            config.nndescent_n_trees = grid_config.nndescent_n_trees
+            config.nndescent_n_iters = grid_config.nndescent_n_iters
+            config.preset = grid_config.preset
         
-        result = cluster_embeddings(embeddings, config)
+        if search_result.cluster_labels is not None and not persist_model:
+            # 直接复用搜索中最佳候选的降维结果与标签，无需再跑一遍UMAP+HDBSCAN
+            result = _build_clustering_result(
+                len(embeddings),
+                search_result.reduced_embeddings,
+                search_result.cluster_labels,
+                config,
+                float(best_score) if search_result.final_scorer == 'dbcv' else None,
+                search_result.pre_reduction,
+                search_result.membership_strengths
+            )
+        else:
+            # 未找到有效组合（使用默认参数）或需要保存模型时才重新聚类
+            result = cluster_embeddings(embeddings, config, persist_model)
         result['optimization'] = {
             'used': True,
             'best_params': convert_numpy_types(best_params),
-            'best_dbcv_score': float(best_score) if best_score is not None else None
+            'best_dbcv_score': float(best_score) if best_score is not None else None,
+            'search_strategy': search_result.search_strategy,
+            'search_space_size': search_result.search_space_size,
+            'evaluated_combinations': search_result.evaluated_combinations,
+            'stopped_early': search_result.stopped_early,
+            'scorer': search_result.scorer,
+            'final_scorer': search_result.final_scorer,
+            'reranked_candidates': search_result.reranked_candidates,
+            'scoring_seconds': search_result.scoring_seconds
         }
+        result['config_used'].update(
+            search_strategy=search_result.search_strategy,
+            scorer=search_result.scorer,
+        )
         
     else:
         # 使用默认参数
-        result = cluster_embeddings(embeddings, None)
+        result = cluster_embeddings(embeddings, None, persist_model)
         result['optimization'] = {'used': False}
     
-    # 确保整个结果都经过类型转换
-    return convert_numpy_types(result)
+    return result
 
 
 def cluster_embeddings(
     embeddings: np.ndarray,
-    config: Optional[ClusteringConfig] = None
+    config: Optional[ClusteringConfig] = None,
+    persist_model: bool = False
 ) -> Dict[str, Any]:
     """
     完整的聚类流程：预处理 -> UMAP降维 -> HDBSCAN聚类
@@ -491,6 +1667,8 @@ def cluster_embeddings(
     Args:
         embeddings: 输入的嵌入向量 [n_samples, n_features]
         config: 聚类配置
+        persist_model: 是否把拟合的预降维器、UMAP与HDBSCAN保存到模型存储，
+            结果中的 model_id 可用于 assign_embeddings 增量分配新数据
         
     Returns:
         包含聚类结果的字典
@@ -500,11 +1678,14 @@ def cluster_embeddings(
     
     logger.info(f"开始聚类流程: {embeddings.shape}")
     
-    # 1. 预处理
+    # 1. 预处理（可选线性预降维）
     processed_embeddings = preprocess_embeddings(
         embeddings, 
         normalize=config.normalize_embeddings
     )
+    processed_embeddings, pre_reduction, pre_reducer = pre_reduce_embeddings(
+        processed_embeddings, config.pre_reduction, config.pre_reduction_dim
+    )
     
     # 2. UMAP降维
     reduced_embeddings, reducer = perform_umap_reduction(
@@ -518,10 +1699,111 @@ def cluster_embeddings(
         config
     )
     
-    # 4. 分析结果
+    # 4. 计算DBCV分数（如果可能）
+    evaluation = _score_candidate_labels(reduced_embeddings, cluster_labels, 'dbcv')
+    dbcv_score = evaluation["score"] if evaluation is not None else None
+    
+    # 5. 分析结果
+    result = _build_clustering_result(
+        len(embeddings), reduced_embeddings, cluster_labels, config, dbcv_score, pre_reduction,
+        clusterer.probabilities_ if clusterer is not None else None
+    )
+    
+    # 6. 保存模型（可选）
+    if persist_model:
+        if clusterer is None:
+            logger.warning("HDBSCAN未得到可用模型（数据集过小或聚类失败），不保存模型")
+            result['model_id'] = None
+        else:
+            model = ClusterModel(
+                model_id=new_model_id(),
+                clusterer=clusterer,
+                reducer=reducer,
+                pre_reducer=pre_reducer,
+                normalize_embeddings=config.normalize_embeddings,
+                input_dim=int(embeddings.shape[1]),
+                reduced_dim=int(reduced_embeddings.shape[1]),
+                n_samples=int(len(embeddings)),
+                config_used=result['config_used'],
+            )
+            get_model_store().save(model)
+            logger.info(f"已保存聚类模型: {model.model_id}")
+            result['model_id'] = model.model_id
+    
+    return result
+
+
+def transform_embeddings(
+    model: ClusterModel,
+    embeddings: np.ndarray,
+    batch_size: int = 1024
+) -> np.ndarray:
+    """把新嵌入映射到已保存模型的降维空间（预处理 -> 预降维器 -> UMAP.transform），按批次执行
+
+    输入维度不一致时抛出 ValueError。
+    """
+    if embeddings.ndim != 2 or embeddings.shape[1] != model.input_dim:
+        raise ValueError(f"嵌入维度不匹配: 期望 {model.input_dim}, 实际 {embeddings.shape[-1]}")
+
+    reduced = np.empty((embeddings.shape[0], model.reduced_dim), dtype=np.float32)
+    batch_size = max(1, batch_size)
+    for start in range(0, embeddings.shape[0], batch_size):
+        stop = min(start + batch_size, embeddings.shape[0])
+        batch = preprocess_embeddings(embeddings[start:stop], normalize=model.normalize_embeddings)
+        if model.pre_reducer is not None:
+            batch = model.pre_reducer.transform(batch)
+        if model.reducer is not None:
+            batch = model.reducer.transform(batch)
+        else:
+            # 拟合时UMAP失败，与 perform_umap_reduction 的回退策略一致
+            batch = batch[:, :model.reduced_dim]
+        reduced[start:stop] = batch
+    return reduced
+
+
+def assign_embeddings(
+    model_id: str,
+    embeddings: np.ndarray,
+    batch_size: int = 1024
+) -> Dict[str, Any]:
+    """用已保存的模型为新嵌入分配簇标签，不重新聚类
+
+    按批次映射到降维空间（见 transform_embeddings），再用 hdbscan.approximate_predict 分配。
+    模型不存在时抛出 ModelNotFoundError，输入维度不一致时抛出 ValueError。
+    """
+    validate_clustering_availability()
+    model = get_model_store().load(model_id)
+    reduced = transform_embeddings(model, embeddings, batch_size)
+    labels, strengths = hdbscan.approximate_predict(model.clusterer, reduced)
+
+    return {
+        'model_id': model_id,
+        'cluster_labels': [int(label) for label in labels],
+        'membership_strengths': [float(strength) for strength in strengths],
+        'reduced_embeddings': reduced.tolist(),
+        'n_outliers': int(np.sum(labels == -1)),
+    }
+
+
+def _build_clustering_result(
+    n_samples: int,
+    reduced_embeddings: np.ndarray,
+    cluster_labels: np.ndarray,
+    config: ClusteringConfig,
+    dbcv_score: Optional[float],
+    pre_reduction: Optional[Dict[str, Any]] = None,
+    membership_strengths: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
+    """由降维结果和聚类标签构建聚类结果字典（统计信息与实际使用的配置）
+
+    membership_strengths 为HDBSCAN的簇归属强度（probabilities_）；没有拟合的聚类器时
+    （极小数据集回退）簇内点记为1.0、异常点记为0.0。移除异常点时 item_indices 记录保留点的原始下标。
+    """
+    if pre_reduction is None:
+        pre_reduction = {"method": 'none', "output_dim": None, "explained_variance": None}
     unique_labels = np.unique(cluster_labels)
     n_clusters = len(unique_labels) - (1 if -1 in unique_labels else 0)
-    n_outliers = np.sum(cluster_labels == -1)
+    n_outliers = int(np.sum(cluster_labels == -1))
     
     # 计算每个簇的大小
     cluster_sizes = {}
@@ -529,39 +1811,38 @@ def cluster_embeddings(
         if label != -1:  # 排除异常点
             cluster_sizes[int(label)] = int(np.sum(cluster_labels == label))
     
-    # 计算DBCV分数（如果可能）
-    dbcv_score = None
-    valid_points = cluster_labels != -1
-    if (valid_points.sum() > 1 and len(set(cluster_labels[valid_points])) > 1):
-        try:
-            reduced_data_64 = reduced_embeddings[valid_points].astype(np.float64)
-            dbcv_score = float(validity_index(reduced_data_64, cluster_labels[valid_points]))
-        except Exception as e:
-            logger.warning(f"DBCV计算失败: {e}")
-    
     # 计算聚类质量指标 - 确保所有值都是Python原生类型
-    total_samples = int(len(embeddings))
+    total_samples = int(n_samples)
     outlier_ratio = float(n_outliers / total_samples)
     clustering_stats = {
         "n_samples": total_samples,
         "n_clusters": n_clusters,
         "n_outliers": n_outliers,
         "outlier_ratio": outlier_ratio,
-        "cluster_sizes": convert_numpy_types(cluster_sizes),
+        "cluster_sizes": cluster_sizes,
         "dbcv_score": dbcv_score,
+        "pre_reduction_explained_variance": pre_reduction["explained_variance"],
     }
     
+    if membership_strengths is None:
+        membership_strengths = (np.asarray(cluster_labels) != -1).astype(np.float32)
+    item_indices = None
+    
     if config.remove_outliers:
         # 移除异常点
         non_outlier_mask = cluster_labels != -1
         cluster_labels = cluster_labels[non_outlier_mask]
         reduced_embeddings = reduced_embeddings[non_outlier_mask]
+        membership_strengths = membership_strengths[non_outlier_mask]
+        item_indices = np.flatnonzero(non_outlier_mask)
         logger.info(f"移除{n_outliers}个异常点")
     
-    # 确保返回的所有数据都是Python原生类型
+    # 标签与降维坐标保持为NumPy数组（由响应层直接序列化），其余字段均为Python原生类型
     result = {
-        'cluster_labels': [int(label) for label in cluster_labels],
-        'reduced_embeddings': reduced_embeddings.tolist(),
+        'cluster_labels': np.asarray(cluster_labels, dtype=np.int64),
+        'reduced_embeddings': np.ascontiguousarray(reduced_embeddings, dtype=np.float32),
+        'membership_strengths': np.asarray(membership_strengths, dtype=np.float32),
+        'item_indices': item_indices,
         'clustering_stats': clustering_stats,
         'config_used': {
             'umap_n_components': int(config.umap_n_components),
@@ -572,11 +1853,18 @@ def cluster_embeddings(
             'hdbscan_min_samples': int(config.hdbscan_min_samples),
             'hdbscan_epsilon': float(config.hdbscan_cluster_selection_epsilon),
             'hdbscan_metric': config.hdbscan_metric,
+            'execution_mode': config.execution_mode,
+            'pre_reduction': pre_reduction["method"],
+            'pre_reduction_dim': pre_reduction["output_dim"],
+            'umap_n_epochs': config.umap_n_epochs,
+            'knn_method': config.knn_method,
+            'nndescent_n_trees': config.nndescent_n_trees,
+            'nndescent_n_iters': config.nndescent_n_iters,
+            'preset': config.preset,
         }
     }
     
-    # 使用convert_numpy_types确保没有遗漏的numpy类型
-    return convert_numpy_types(result)
+    return result
 
 
 def analyze_cluster_content(
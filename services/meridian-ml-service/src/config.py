@@ -12,6 +12,8 @@ class Settings:
         # 模型配置
         self.embedding_model_name = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/multilingual-e5-small")
         self.expected_embedding_dimensions = int(os.getenv("EXPECTED_EMBEDDING_DIMENSIONS", "384"))
+        # 推理后端: "torch" (fp32), "onnx" (ONNX Runtime fp32), "onnx-int8" (动态int8量化)
+        self.embedding_backend = os.getenv("EMBEDDING_BACKEND", "torch")
         
         # API配置
         self.api_token = os.getenv("API_TOKEN", "")
@@ -23,6 +25,50 @@ class Settings:
         # 性能配置
         self.batch_size = int(os.getenv("BATCH_SIZE", "32"))
         self.max_text_length = int(os.getenv("MAX_TEXT_LENGTH", "512"))
+        # 批处理策略: "token_budget" 按分词长度排序并按token预算打包, "fixed" 按输入顺序固定条数切分
+        self.embedding_batching = os.getenv("EMBEDDING_BATCHING", "token_budget")
+        self.embedding_max_batch_tokens = int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "8192"))
+        # 流水线模式：后台线程预先分词/填充后续批次，与当前批次的推理重叠
+        self.embedding_pipeline_enabled = os.getenv("EMBEDDING_PIPELINE_ENABLED", "true").lower() == "true"
+        self.embedding_pipeline_depth = int(os.getenv("EMBEDDING_PIPELINE_DEPTH", "2"))
+        self.embedding_pipeline_chunk_size = int(os.getenv("EMBEDDING_PIPELINE_CHUNK_SIZE", "1024"))
+
+        # 跨请求微批处理配置
+        self.embedding_scheduler_enabled = os.getenv("EMBEDDING_SCHEDULER_ENABLED", "true").lower() == "true"
+        self.embedding_scheduler_max_batch_size = int(os.getenv("EMBEDDING_SCHEDULER_MAX_BATCH_SIZE", "256"))
+        self.embedding_scheduler_max_wait_ms = float(os.getenv("EMBEDDING_SCHEDULER_MAX_WAIT_MS", "10"))
+
+        # 执行池配置：推理与聚类分别在独立的有界执行池中运行，不阻塞事件循环
+        self.inference_workers = int(os.getenv("INFERENCE_WORKERS", "1"))
+        self.clustering_executor = os.getenv("CLUSTERING_EXECUTOR", "process")  # "process" | "thread"
+        self.clustering_workers = int(os.getenv("CLUSTERING_WORKERS", "1"))
+        # 参数网格搜索的并行进程数（1为串行）
+        self.clustering_search_workers = int(os.getenv("CLUSTERING_SEARCH_WORKERS", "1"))
+        # partitioning=auto 时超过该样本数使用分区聚类
+        self.clustering_partition_threshold = int(os.getenv("CLUSTERING_PARTITION_THRESHOLD", "100000"))
+        # UMAP/HDBSCAN执行模式（请求可覆盖）: "reproducible" 固定种子单线程 | "parallel" 使用全部CPU核
+        self.clustering_execution_mode = os.getenv("CLUSTERING_EXECUTION_MODE", "reproducible")
+
+        # 嵌入缓存配置（内存LRU + 磁盘内存映射层；EMBEDDING_CACHE_DIR 设为空可关闭磁盘层）
+        hf_home = os.getenv("HF_HOME", os.path.expanduser("~/.cache/huggingface"))
+        self.embedding_cache_enabled = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+        self.embedding_cache_memory_entries = int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "20000"))
+        self.embedding_cache_dir = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(hf_home, "meridian-embedding-cache"))
+        self.embedding_cache_disk_entries = int(os.getenv("EMBEDDING_CACHE_DISK_ENTRIES", "100000"))
+
+        # 聚类模型存储（persist_model=true 时保存，供 /clustering/assign 增量分配）
+        self.cluster_model_dir = os.getenv("CLUSTER_MODEL_DIR", os.path.join(hf_home, "meridian-cluster-models"))
+        self.cluster_model_memory_entries = int(os.getenv("CLUSTER_MODEL_MEMORY_ENTRIES", "4"))
+        self.cluster_model_max_models = int(os.getenv("CLUSTER_MODEL_MAX_MODELS", "20"))
+        self.cluster_assign_batch_size = int(os.getenv("CLUSTER_ASSIGN_BATCH_SIZE", "1024"))
+
+        # 流式聚类会话（保存在API进程内存中）
+        self.stream_workers = int(os.getenv("STREAM_WORKERS", "2"))
+        self.stream_max_sessions = int(os.getenv("STREAM_MAX_SESSIONS", "16"))
+        self.stream_session_ttl_seconds = float(os.getenv("STREAM_SESSION_TTL_SECONDS", "3600"))
+
+        # ONNX导出产物缓存目录（放在HF缓存目录旁）
+        self.onnx_cache_dir = os.getenv("ONNX_CACHE_DIR", os.path.join(hf_home, "meridian-onnx"))
 
 
 # 全局设置实例
@@ -8,10 +8,12 @@ from starlette.status import HTTP_403_FORBIDDEN
 
 from .config import settings
 from .embeddings import ModelComponents, load_embedding_model
+from .scheduler import EmbeddingBatchScheduler
 
 # Global lock for model loading
 _model_lock = asyncio.Lock()
 _model_instance: Union[ModelComponents, None] = None
+_scheduler_instance: Union[EmbeddingBatchScheduler, None] = None
 
 
 async def get_embedding_model() -> ModelComponents:
@@ -38,6 +40,28 @@ async def get_embedding_model() -> ModelComponents:
 
 ModelDep = Annotated[ModelComponents, Depends(get_embedding_model)]
 
+
+async def get_embedding_scheduler() -> EmbeddingBatchScheduler:
+    """FastAPI dependency to get the shared cross-request embedding batch scheduler."""
+    global _scheduler_instance
+
+    if _scheduler_instance is None:
+        model_components = await get_embedding_model()
+        # re-check after awaiting the model so concurrent callers share one scheduler
+        if _scheduler_instance is None:
+            _scheduler_instance = EmbeddingBatchScheduler(
+                model_components,
+                max_batch_size=settings.embedding_scheduler_max_batch_size,
+                max_wait_ms=settings.embedding_scheduler_max_wait_ms,
+            )
+    return _scheduler_instance
+
+
+def peek_embedding_scheduler() -> Union[EmbeddingBatchScheduler, None]:
+    """Return the scheduler if it has been created, without loading the model."""
+    return _scheduler_instance
+
+
 api_key_header = APIKeyHeader(name="X-API-Token", auto_error=False)
 
 
@@ -3,23 +3,30 @@
 合并了原embeddings.py和embedding_utils.py的核心功能
 """
 
+import queue
+import threading
+import time
 from functools import lru_cache
-from typing import Any, List, Tuple
+from pathlib import Path
+from typing import Any, Iterator, List, Tuple, Union
 import numpy as np
 import torch
 import torch.nn.functional as F
 from tqdm import tqdm
 from transformers import AutoModel, AutoTokenizer
 
+from .cache import get_embedding_cache
 from .config import settings
+from .onnx_backend import ONNX_BACKENDS, OnnxEmbeddingModel, export_onnx_model, onnx_model_path
 
 # 类型别名
 ModelComponents = tuple[Any, Any, torch.device]
 
-@lru_cache(maxsize=1)
-def load_embedding_model() -> ModelComponents:
-    """加载嵌入模型组件（带缓存）"""
+@lru_cache(maxsize=2)
+def load_embedding_model(backend: str | None = None) -> ModelComponents:
+    """加载嵌入模型组件（带缓存），backend 默认取 EMBEDDING_BACKEND"""
     model_name = settings.embedding_model_name
+    backend = backend or settings.embedding_backend
     print(f"正在加载嵌入模型: {model_name}")
     
     try:
@@ -29,6 +36,22 @@ def load_embedding_model() -> ModelComponents:
             model_name, 
             trust_remote_code=True
         )
+
+        if backend in ONNX_BACKENDS:
+            # ONNX Runtime 仅使用CPU；导出产物按模型名缓存，已导出时无需加载PyTorch权重
+            quantize = backend == "onnx-int8"
+            onnx_dir = Path(settings.onnx_cache_dir) / model_name.replace("/", "--")
+            onnx_path = onnx_model_path(onnx_dir, quantize)
+            if not onnx_path.exists():
+                model = AutoModel.from_pretrained(model_name, trust_remote_code=True)
+                model.eval()
+                export_onnx_model(tokenizer, model, onnx_dir, quantize)
+                del model
+            print(f"嵌入模型 '{model_name}' 加载成功，后端: {backend} ({onnx_path})")
+            return tokenizer, OnnxEmbeddingModel(onnx_path), torch.device("cpu")
+        if backend != "torch":
+            raise ValueError(f"不支持的嵌入后端: {backend}")
+
         model = AutoModel.from_pretrained(
             model_name, 
             trust_remote_code=True
@@ -56,16 +79,126 @@ def _average_pool(last_hidden_states: torch.Tensor, attention_mask: torch.Tensor
     last_hidden = last_hidden_states.masked_fill(~attention_mask[..., None].bool(), 0.0)
     return last_hidden.sum(dim=1) / attention_mask.sum(dim=1)[..., None]
 
+def _plan_batches(
+    lengths: list[int],
+    batch_size: int,
+    batching: str,
+    max_batch_tokens: int,
+) -> list[list[int]]:
+    """规划批次，返回每个批次包含的原始文本索引
+
+    - fixed: 按输入顺序每 batch_size 条切分（原有行为）
+    - token_budget: 按分词长度排序，每批的 (条数 × 批内最大长度) 不超过 max_batch_tokens，
+      避免一条长文章把整批短标题都填充到512
+    """
+    n_texts = len(lengths)
+    if batching == "fixed":
+        return [list(range(i, min(i + batch_size, n_texts))) for i in range(0, n_texts, batch_size)]
+    if batching != "token_budget":
+        raise ValueError(f"不支持的批处理策略: {batching}")
+
+    batches: list[list[int]] = []
+    current: list[int] = []
+    # 升序遍历，当前文本长度即为加入后批内的最大长度
+    for idx in sorted(range(n_texts), key=lambda i: lengths[i]):
+        if current and lengths[idx] * (len(current) + 1) > max_batch_tokens:
+            batches.append(current)
+            current = []
+        current.append(idx)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _collate(encoded: Any, indices: list[int], pad_token_id: int) -> dict[str, torch.Tensor]:
+    """将预分词结果中的指定文本右填充到批内最大长度"""
+    max_len = max(len(encoded["input_ids"][i]) for i in indices)
+    batch: dict[str, torch.Tensor] = {}
+    for key, values in encoded.items():
+        pad_value = pad_token_id if key == "input_ids" else 0
+        tensor = torch.full((len(indices), max_len), pad_value, dtype=torch.long)
+        for row, idx in enumerate(indices):
+            seq = values[idx]
+            tensor[row, : len(seq)] = torch.tensor(seq, dtype=torch.long)
+        batch[key] = tensor
+    return batch
+
+
 def compute_embeddings(
     texts: list[str],
     model_components: ModelComponents,
-    batch_size: int = 32,
+    batch_size: int | None = None,
     normalize: bool = True,
     e5_prefix: str | None = None,
+    batching: str | None = None,
+    max_batch_tokens: int | None = None,
+    use_cache: bool = True,
+    pipelined: bool | None = None,
 ) -> np.ndarray:
-    """计算文本嵌入向量"""
+    """计算文本嵌入向量
+
+    启用缓存时先按内容键查询缓存，只有未命中（且去重后）的文本才进入分词和推理；
+    其余文本分块分词得到各文本长度，再按 batching 策略规划批次，
+    推理结果按原始输入顺序写回。
+    """
+    batch_size = batch_size or settings.batch_size
+    batching = batching or settings.embedding_batching
+    max_batch_tokens = max_batch_tokens or settings.embedding_max_batch_tokens
+    if pipelined is None:
+        pipelined = settings.embedding_pipeline_enabled
+
+    if not texts:
+        print("警告: 没有生成嵌入向量")
+        return np.empty((0, 0), dtype=np.float32)
+
+    cache = get_embedding_cache() if use_cache else None
+    if cache is None:
+        return _compute_uncached(
+            texts, model_components, batch_size, normalize, e5_prefix, batching, max_batch_tokens,
+            pipelined,
+        )
+
+    keys = [cache.make_key(text, e5_prefix, settings.max_text_length, normalize) for text in texts]
+    cached = cache.get_many(keys)
+
+    # 未命中的文本按键去重后再计算
+    miss_positions: dict[bytes, list[int]] = {}
+    for i, vector in enumerate(cached):
+        if vector is None:
+            miss_positions.setdefault(keys[i], []).append(i)
+
+    print(f"嵌入缓存: 命中 {len(texts) - sum(len(p) for p in miss_positions.values())}/{len(texts)}")
+
+    if miss_positions:
+        miss_keys = list(miss_positions)
+        miss_texts = [texts[miss_positions[key][0]] for key in miss_keys]
+        miss_embeddings = _compute_uncached(
+            miss_texts, model_components, batch_size, normalize, e5_prefix, batching, max_batch_tokens,
+            pipelined,
+        )
+        cache.put_many(miss_keys, miss_embeddings)
+        for key, vector in zip(miss_keys, miss_embeddings):
+            for i in miss_positions[key]:
+                cached[i] = vector
+
+    return np.stack(cached).astype(np.float32, copy=False)
+
+
+def _compute_uncached(
+    texts: list[str],
+    model_components: ModelComponents,
+    batch_size: int,
+    normalize: bool,
+    e5_prefix: str | None,
+    batching: str,
+    max_batch_tokens: int,
+    pipelined: bool,
+) -> np.ndarray:
+    """分词并推理一组文本（不经过缓存）
+
+    pipelined=True 时分词/填充在后台线程中提前进行，与当前批次的前向推理重叠。
+    """
     tokenizer, model, device = model_components
-    all_embeddings: list[np.ndarray] = []
 
     if e5_prefix:
         texts_to_embed = [f"{e5_prefix}{text}" for text in texts]
@@ -74,57 +207,196 @@ def compute_embeddings(
         texts_to_embed = texts
 
     print(f"正在计算 {len(texts_to_embed)} 个文本的嵌入向量...")
-    
-    for i in tqdm(
-        range(0, len(texts_to_embed), batch_size),
-        desc="计算嵌入向量",
-        leave=False,
-    ):
-        batch_texts = texts_to_embed[i : i + batch_size]
-        
+
+    timings = {stage: 0.0 for stage in _STAGES}
+    batches = _iter_batches(
+        texts_to_embed, tokenizer, batch_size, batching, max_batch_tokens,
+        settings.embedding_pipeline_chunk_size, timings,
+    )
+    if pipelined:
+        batches = _prefetch(batches, settings.embedding_pipeline_depth)
+
+    final_embeddings: np.ndarray | None = None
+    n_batches = real_tokens = padded_tokens = 0
+    wall_start = time.perf_counter()
+
+    try:
+        with tqdm(total=len(texts_to_embed), desc="计算嵌入向量", leave=False) as progress:
+            while True:
+                start = time.perf_counter()
+                next_batch = next(batches, None)
+                timings["batch_wait"] += time.perf_counter() - start
+                if next_batch is None:
+                    break
+
+                indices, batch_tensors = next_batch
+                attention_mask = batch_tensors["attention_mask"]
+                real_tokens += int(attention_mask.sum())
+                padded_tokens += attention_mask.numel()
+                batch_dict = {key: tensor.to(device) for key, tensor in batch_tensors.items()}
+
+                start = time.perf_counter()
+                with torch.no_grad():
+                    try:
+                        outputs = model(**batch_dict)
+                    except Exception as e:
+                        print(f"错误: 批次 {n_batches} 模型推理失败: {e}")
+                        raise
+                timings["forward"] += time.perf_counter() - start
+
+                start = time.perf_counter()
+                with torch.no_grad():
+                    embeddings = _average_pool(
+                        outputs.last_hidden_state, batch_dict["attention_mask"]
+                    )
+                    if normalize:
+                        embeddings = F.normalize(embeddings, p=2, dim=1)
+                    batch_np = embeddings.cpu().numpy()
+                timings["pooling"] += time.perf_counter() - start
+
+                if final_embeddings is None:
+                    final_embeddings = np.empty(
+                        (len(texts_to_embed), batch_np.shape[1]), dtype=batch_np.dtype
+                    )
+                # 按原始顺序写回
+                final_embeddings[indices] = batch_np
+                n_batches += 1
+                progress.update(len(indices))
+    finally:
+        # 异常退出时也要停止后台分词线程
+        batches.close()
+
+    wall_time = time.perf_counter() - wall_start
+    _record_stage_timings(timings, wall_time, len(texts_to_embed))
+
+    print(
+        f"批处理策略: {batching}{' (流水线)' if pipelined else ''}, {n_batches} 个批次, "
+        f"有效token {real_tokens} / 填充后token {padded_tokens}"
+    )
+    print(
+        f"阶段耗时: 分词 {timings['tokenize']:.3f}s, 等待批次 {timings['batch_wait']:.3f}s, "
+        f"推理 {timings['forward']:.3f}s, 池化 {timings['pooling']:.3f}s, 总计 {wall_time:.3f}s"
+    )
+    print(f"嵌入向量计算完成。形状: {final_embeddings.shape}")
+    return final_embeddings
+
+
+def _iter_batches(
+    texts: list[str],
+    tokenizer: Any,
+    batch_size: int,
+    batching: str,
+    max_batch_tokens: int,
+    chunk_size: int,
+    timings: dict[str, float],
+) -> Iterator[tuple[list[int], dict[str, torch.Tensor]]]:
+    """按块分词并规划批次，逐批产出 (原始索引, 填充后的张量)
+
+    批次在每块（chunk_size 个文本）内部规划，使流水线模式下后续块的分词
+    可以与前面批次的推理重叠。分词、规划和填充耗时计入 timings["tokenize"]。
+    """
+    pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else 0
+
+    for chunk_start in range(0, len(texts), chunk_size):
+        start = time.perf_counter()
         try:
-            batch_dict = tokenizer(
-                batch_texts,
-                max_length=512,
-                padding=True,
+            encoded = tokenizer(
+                texts[chunk_start : chunk_start + chunk_size],
+                max_length=settings.max_text_length,
+                padding=False,
                 truncation=True,
-                return_tensors="pt",
-            ).to(device)
+            )
         except Exception as e:
-            print(f"错误: 批次 {i} 分词失败: {e}")
+            print(f"错误: 分词失败: {e}")
             raise
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+        batches = _plan_batches(lengths, batch_size, batching, max_batch_tokens)
+        timings["tokenize"] += time.perf_counter() - start
+
+        for indices in batches:
+            start = time.perf_counter()
+            batch = _collate(encoded, indices, pad_token_id)
+            timings["tokenize"] += time.perf_counter() - start
+            yield [chunk_start + i for i in indices], batch
 
-        with torch.no_grad():
+
+class _ProducerError:
+    """后台线程中抛出的异常，交由消费端重新抛出"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _prefetch(iterator: Iterator[Any], depth: int) -> Iterator[Any]:
+    """在后台线程中运行 iterator，通过容量为 depth 的有界队列交付结果"""
+    buffer: queue.Queue = queue.Queue(maxsize=max(1, depth))
+    done = object()
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
             try:
-                outputs = model(**batch_dict)
-                embeddings = _average_pool(
-                    outputs.last_hidden_state, batch_dict["attention_mask"]
-                )
-            except Exception as e:
-                print(f"错误: 批次 {i} 模型推理失败: {e}")
-                raise
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
 
-        if normalize:
-            embeddings = F.normalize(embeddings, p=2, dim=1)
+    def produce() -> None:
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_ProducerError(e))
+            return
+        put(done)
 
-        all_embeddings.append(embeddings.cpu().numpy())
+    producer = threading.Thread(target=produce, name="embedding-tokenizer", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                return
+            if isinstance(item, _ProducerError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        producer.join()
 
-    if not all_embeddings:
-        print("警告: 没有生成嵌入向量")
-        return np.empty((0, 0), dtype=np.float32)
 
-    final_embeddings = np.vstack(all_embeddings)
-    print(f"嵌入向量计算完成。形状: {final_embeddings.shape}")
-    return final_embeddings
+_STAGES = ("tokenize", "batch_wait", "forward", "pooling")
+_stage_totals: dict[str, float] = {stage: 0.0 for stage in _STAGES}
+_stage_totals.update(wall=0.0, calls=0, texts=0)
+_stage_lock = threading.Lock()
+
+
+def _record_stage_timings(timings: dict[str, float], wall_time: float, n_texts: int) -> None:
+    with _stage_lock:
+        for stage, seconds in timings.items():
+            _stage_totals[stage] += seconds
+        _stage_totals["wall"] += wall_time
+        _stage_totals["calls"] += 1
+        _stage_totals["texts"] += n_texts
+
+
+def get_embedding_stage_stats() -> dict[str, Any]:
+    """累计的分阶段耗时（秒）：分词、等待批次、推理、池化与总耗时"""
+    with _stage_lock:
+        stats: dict[str, Any] = dict(_stage_totals)
+    stats["pipeline_enabled"] = settings.embedding_pipeline_enabled
+    return stats
 
-def validate_embeddings(embeddings: List[List[float]]) -> np.ndarray:
-    """验证和转换嵌入向量"""
-    if not embeddings:
+def validate_embeddings(embeddings: Union[List[List[float]], np.ndarray]) -> np.ndarray:
+    """验证和转换嵌入向量（已是float32矩阵时不复制）"""
+    if len(embeddings) == 0:
         raise ValueError("嵌入向量列表不能为空")
     
     # 转换为numpy数组
     try:
-        embeddings_array = np.array(embeddings, dtype=np.float32)
+        embeddings_array = np.asarray(embeddings, dtype=np.float32)
     except (ValueError, TypeError) as e:
         raise ValueError(f"无法将嵌入转换为数值数组: {e}")
     
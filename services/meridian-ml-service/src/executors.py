@@ -0,0 +1,142 @@
+"""
+CPU密集型任务执行器
+嵌入推理与聚类分别运行在独立的有界执行池中，避免阻塞asyncio事件循环
+（/health 等轻量请求在长时间UMAP或网格搜索期间依然可响应）
+"""
+
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .config import settings
+
+
+class BoundedExecutor:
+    """带并发上限的执行池包装；超出上限的任务在事件循环中排队等待"""
+
+    def __init__(self, name: str, executor: Executor, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._executor = executor
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._active = 0
+        self._waiting = 0
+        self._completed = 0
+        self._failed = 0
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """在执行池中运行 fn(*args, **kwargs) 并等待结果"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self._waiting += 1
+        async with self._semaphore:
+            self._waiting -= 1
+            self._active += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(
+                    self._executor, functools.partial(fn, *args, **kwargs)
+                )
+            except Exception:
+                self._failed += 1
+                raise
+            finally:
+                self._active -= 1
+                self._completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": "process" if isinstance(self._executor, ProcessPoolExecutor) else "thread",
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "waiting": self._waiting,
+            "completed": self._completed,
+            "failed": self._failed,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_inference_executor: Optional[BoundedExecutor] = None
+_clustering_executor: Optional[BoundedExecutor] = None
+_streaming_executor: Optional[BoundedExecutor] = None
+
+
+def get_inference_executor() -> BoundedExecutor:
+    """嵌入推理执行池（线程池：模型只在主进程中加载一次）"""
+    global _inference_executor
+    if _inference_executor is None:
+        workers = settings.inference_workers
+        _inference_executor = BoundedExecutor(
+            "inference",
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference"),
+            workers,
+        )
+    return _inference_executor
+
+
+def get_clustering_executor() -> BoundedExecutor:
+    """聚类执行池：默认使用独立进程，彻底避免UMAP/HDBSCAN持有GIL时拖慢事件循环"""
+    global _clustering_executor
+    if _clustering_executor is None:
+        workers = settings.clustering_workers
+        if settings.clustering_executor == "process":
+            # spawn 避免在已启动推理线程的进程中fork
+            executor: Executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        elif settings.clustering_executor == "thread":
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="clustering")
+        else:
+            raise ValueError(f"不支持的聚类执行器类型: {settings.clustering_executor}")
+        _clustering_executor = BoundedExecutor("clustering", executor, workers)
+    return _clustering_executor
+
+
+def get_streaming_executor() -> BoundedExecutor:
+    """流式聚类执行池（线程池：会话状态保存在API进程内存中）"""
+    global _streaming_executor
+    if _streaming_executor is None:
+        workers = settings.stream_workers
+        _streaming_executor = BoundedExecutor(
+            "streaming",
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="streaming"),
+            workers,
+        )
+    return _streaming_executor
+
+
+async def run_inference(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """在推理执行池中运行"""
+    return await get_inference_executor().run(fn, *args, **kwargs)
+
+
+async def run_clustering(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """在聚类执行池中运行（进程模式下 fn 与参数需可pickle）"""
+    return await get_clustering_executor().run(fn, *args, **kwargs)
+
+
+async def run_streaming(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """在流式聚类执行池中运行"""
+    return await get_streaming_executor().run(fn, *args, **kwargs)
+
+
+def get_executor_stats() -> Dict[str, Any]:
+    """已创建执行池的状态"""
+    return {
+        executor.name: executor.stats()
+        for executor in (_inference_executor, _clustering_executor, _streaming_executor)
+        if executor is not None
+    }
+
+
+def shutdown_executors() -> None:
+    """关闭所有执行池"""
+    global _inference_executor, _clustering_executor, _streaming_executor
+    for executor in (_inference_executor, _clustering_executor, _streaming_executor):
+        if executor is not None:
+            executor.shutdown()
+    _inference_executor = _clustering_executor = _streaming_executor = None
@@ -4,35 +4,51 @@ Meridian ML Service - 精简核心版本
 """
 
 import time
-from typing import List, Dict, Any
-from fastapi import Depends, FastAPI, HTTPException, Query
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Literal, Optional, Union
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 
 from .config import settings
 from .dependencies import ModelDep, verify_token
 from .schemas import (
     # 核心请求/响应模型
-    EmbeddingRequest, EmbeddingResponse,
+    EmbeddingRequest, EmbeddingResponse, EmbeddingBinaryResponse, EmbeddingBuffer,
     AIWorkerEmbeddingClusteringRequest, 
     FlexibleClusteringRequest,
-    BaseClusteringResponse,
+    ColumnarClusteringRequest,
+    BaseClusteringResponse, CompactClusteringResponse,
+    ClusterAssignRequest, ClusterAssignResponse,
+    StreamSessionCreateRequest, StreamUpdateRequest, StreamUpdateResponse, StreamSessionState,
     
     # 配置模型
     BaseClusteringConfig, OptimizationConfig, ContentAnalysisConfig
 )
-from .pipeline import process_clustering_request
+from .pipeline import UnsupportedConfigurationError, process_clustering_request, resolve_clustering_config
 from .embeddings import compute_embeddings
+from .executors import get_executor_stats, run_clustering, run_inference, run_streaming, shutdown_executors
+from .model_store import ModelNotFoundError
+from .responses import FastJSONResponse
 
 # ============================================================================
 # FastAPI应用配置
 # ============================================================================
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：退出时关闭推理/聚类执行池"""
+    yield
+    shutdown_executors()
+
+
 app = FastAPI(
     title="Meridian ML Service",
     description="AI驱动的智能聚类分析服务",
     version="3.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS中间件
@@ -63,7 +79,10 @@ async def read_root():
         "endpoints": {
             "embeddings": "/embeddings",
             "ai_worker_clustering": "/ai-worker/clustering",
-            "auto_detect_clustering": "/clustering/auto"
+            "auto_detect_clustering": "/clustering/auto",
+            "columnar_clustering": "/clustering/columnar",
+            "cluster_assign": "/clustering/assign",
+            "stream_sessions": "/clustering/stream/sessions"
         },
         "models": {
             "embedding": settings.embedding_model_name,
@@ -100,23 +119,48 @@ async def health_check():
 # 核心端点 1: 嵌入生成
 # ============================================================================
 
-@app.post("/embeddings", response_model=EmbeddingResponse)
+@app.post(
+    "/embeddings",
+    response_model=EmbeddingResponse,
+    responses={200: {"content": {"application/x-npy": {}}, "description": "encoding=npy 时返回 .npy 二进制"}},
+)
 async def generate_embeddings(
     request: EmbeddingRequest,
     model_components: ModelDep,
+    accept: Optional[str] = Header(default=None),
     _: None = Depends(verify_token),
 ):
-    """生成文本嵌入向量"""
+    """
+    生成文本嵌入向量
+    
+    输出编码（encoding 字段，或 Accept: application/x-npy）：
+    - json: 浮点数组（默认，与原有响应一致）
+    - base64: 精简JSON封装，嵌入为单个base64缓冲区（float32/float16/int8）
+    - npy: 原始 .npy 二进制，模型名与处理时间放在响应头中
+    base64/npy 直接从NumPy缓冲区编码，不经过Python列表。
+    """
     print(f"[Embeddings] 收到请求：{len(request.texts)} 个文本")
     
+    encoding = request.encoding
+    if encoding == 'json' and accept and 'application/x-npy' in accept:
+        encoding = 'npy'
+    if encoding == 'json' and request.dtype != 'float32':
+        raise HTTPException(status_code=400, detail="dtype 仅适用于 base64/npy 编码")
+    
     try:
         start_time = time.time()
         
-        # 生成嵌入向量
-        embeddings_np = compute_embeddings(
-            texts=request.texts,
-            model_components=model_components,
-        )
+        # 生成嵌入向量（启用调度器时与并发请求合批推理）
+        if settings.embedding_scheduler_enabled:
+            from .dependencies import get_embedding_scheduler
+            scheduler = await get_embedding_scheduler()
+            embeddings_np = await scheduler.submit(request.texts)
+        else:
+            embeddings_np = await run_inference(
+                compute_embeddings,
+                texts=request.texts,
+                model_components=model_components,
+            )
         
         # 可选归一化
         if request.normalize:
@@ -127,13 +171,40 @@ async def generate_embeddings(
         processing_time = time.time() - start_time
         
         print(f"[Embeddings] 处理完成，耗时: {processing_time:.2f}秒")
+        model_name = request.model_name or settings.embedding_model_name
+        
+        if encoding == 'json':
+            return EmbeddingResponse(
+                embeddings=embeddings_np.tolist(),
+                model_name=model_name,
+                dimensions=embeddings_np.shape[1],
+                processing_time=processing_time
+            )
+        
+        from .transport import encode_base64, encode_npy, quantize_embeddings
+        vectors, scale = quantize_embeddings(embeddings_np, request.dtype)
         
-        return EmbeddingResponse(
-            embeddings=embeddings_np.tolist(),
-            model_name=request.model_name or settings.embedding_model_name,
-            dimensions=embeddings_np.shape[1],
+        if encoding == 'npy':
+            headers = {
+                "X-Model-Name": model_name,
+                "X-Processing-Time": f"{processing_time:.6f}",
+            }
+            if scale is not None:
+                headers["X-Embedding-Scale"] = repr(scale)
+            return Response(content=encode_npy(vectors), media_type="application/x-npy", headers=headers)
+        
+        response = EmbeddingBinaryResponse(
+            embeddings=EmbeddingBuffer(
+                data=encode_base64(vectors),
+                shape=list(vectors.shape),
+                dtype=request.dtype,
+                scale=scale
+            ),
+            model_name=model_name,
+            dimensions=vectors.shape[1],
             processing_time=processing_time
         )
+        return JSONResponse(response.model_dump())
         
     except Exception as e:
         print(f"[Embeddings] 处理错误: {e}")
@@ -146,7 +217,7 @@ async def generate_embeddings(
 # 核心端点 2: AI Worker集成聚类
 # ============================================================================
 
-@app.post("/ai-worker/clustering", response_model=BaseClusteringResponse)
+@app.post("/ai-worker/clustering", response_model=Union[BaseClusteringResponse, CompactClusteringResponse])
 async def ai_worker_clustering(
     items: List[Dict[str, Any]],
     config: BaseClusteringConfig = None,
@@ -154,6 +225,7 @@ async def ai_worker_clustering(
     content_analysis: ContentAnalysisConfig = None,
     return_embeddings: bool = Query(False, description="是否返回原始嵌入向量"),
     return_reduced_embeddings: bool = Query(True, description="是否返回降维后向量"),
+    response_mode: Literal['full', 'compact'] = Query('full', description="响应模式：compact 只返回ID/标签/归属强度数组与簇摘要"),
     _: None = Depends(verify_token),
 ):
     """
@@ -163,6 +235,9 @@ async def ai_worker_clustering(
     - 简化格式: [{"id": 1, "embedding": [...]}]
     - 扩展格式: [{"id": 1, "embedding": [...], "title": "...", "url": "..."}]
     - 完整格式: [{"id": 1, "title": "...", "content": "...", "embedding": [...], ...}]
+    
+    response_mode=compact 时返回 CompactClusteringResponse：ids、cluster_labels、
+    membership_strengths 三个并列数组与簇摘要，不含逐项文本、元数据与向量。
     """
     print(f"[AIWorkerClustering] 收到请求：{len(items)} 个AI Worker数据项")
     
@@ -183,11 +258,13 @@ async def ai_worker_clustering(
             optimization=optimization,
             content_analysis=content_analysis,
             model_components=None,
-            data_type=detected_format if detected_format.startswith('ai_worker') else 'vectors'
+            data_type=detected_format if detected_format.startswith('ai_worker') else 'vectors',
+            response_mode=response_mode
         )
         
-        # 构建AI Worker兼容响应
-        response = BaseClusteringResponse(**result)
+        # 构建AI Worker兼容响应（管道结果已是响应模型所需类型，不重复校验，由orjson直接序列化）
+        response_class = CompactClusteringResponse if response_mode == 'compact' else BaseClusteringResponse
+        response = response_class.model_construct(**result)
         
         # 添加AI Worker特定的元数据
         response.model_info = {
@@ -197,16 +274,19 @@ async def ai_worker_clustering(
             "backend_integration": "完全兼容"
         }
         
-        # 处理可选数据
-        if return_embeddings:
-            response.embeddings = [item['embedding'] for item in items]
-        
-        if not return_reduced_embeddings:
-            response.reduced_embeddings = None
+        # 处理可选数据（compact 模式不含逐项向量）
+        if response_mode == 'full':
+            if return_embeddings:
+                response.embeddings = [item['embedding'] for item in items]
+            
+            if not return_reduced_embeddings:
+                response.reduced_embeddings = None
         
         print(f"[AIWorkerClustering] 处理完成，发现 {len(response.clusters)} 个聚类")
-        return response
+        return FastJSONResponse(response)
         
+    except UnsupportedConfigurationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[AIWorkerClustering] 处理错误: {e}")
         raise HTTPException(
@@ -218,7 +298,7 @@ async def ai_worker_clustering(
 # 核心端点 3: 智能自动检测聚类
 # ============================================================================
 
-@app.post("/clustering/auto", response_model=BaseClusteringResponse)
+@app.post("/clustering/auto", response_model=Union[BaseClusteringResponse, CompactClusteringResponse])
 async def auto_detect_clustering(
     request: FlexibleClusteringRequest,
     _: None = Depends(verify_token),
@@ -254,11 +334,13 @@ async def auto_detect_clustering(
             optimization=request.optimization,
             content_analysis=request.content_analysis,
             model_components=model_components,
-            data_type=detected_format
+            data_type=detected_format,
+            response_mode=request.response_mode
         )
         
-        # 构建响应
-        response = BaseClusteringResponse(**result)
+        # 构建响应（不重复校验）
+        response_class = CompactClusteringResponse if request.response_mode == 'compact' else BaseClusteringResponse
+        response = response_class.model_construct(**result)
         
         # 添加自动检测的元数据
         if request.include_ai_worker_metadata:
@@ -269,16 +351,19 @@ async def auto_detect_clustering(
                 "original_format_preserved": request.preserve_original_format
             }
         
-        # 处理可选数据
-        if not request.return_embeddings:
-            response.embeddings = None
-        
-        if not request.return_reduced_embeddings:
-            response.reduced_embeddings = None
+        # 处理可选数据（compact 模式不含逐项向量）
+        if request.response_mode == 'full':
+            if not request.return_embeddings:
+                response.embeddings = None
+            
+            if not request.return_reduced_embeddings:
+                response.reduced_embeddings = None
         
         print(f"[AutoClustering] 智能处理完成，发现 {len(response.clusters)} 个聚类")
-        return response
+        return FastJSONResponse(response)
         
+    except UnsupportedConfigurationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[AutoClustering] 处理错误: {e}")
         raise HTTPException(
@@ -286,6 +371,259 @@ async def auto_detect_clustering(
             detail=f"智能聚类失败: {str(e)}"
         )
 
+@app.post("/clustering/columnar", response_model=Union[BaseClusteringResponse, CompactClusteringResponse])
+async def columnar_clustering(
+    request: ColumnarClusteringRequest,
+    _: None = Depends(verify_token),
+):
+    """
+    列式聚类端点 - 嵌入以单个二进制缓冲区传输
+    
+    请求体由ID数组、可选的文本/元数据列和一个base64编码的嵌入缓冲区组成
+    （float32、float16或int8量化，声明shape与dtype）。缓冲区直接解码为NumPy矩阵
+    送入聚类，体积约为JSON浮点数组的1/4（float32）到1/16（int8），且无需逐个解析浮点数。
+    """
+    print(f"[ColumnarClustering] 收到请求：{len(request.ids)} 个数据项 ({request.embeddings.dtype})")
+    
+    try:
+        from .pipeline import ColumnarBatch
+        from .transport import decode_embedding_buffer
+        
+        buffer = request.embeddings
+        embeddings = decode_embedding_buffer(buffer.data, buffer.shape, buffer.dtype, buffer.scale)
+        batch = ColumnarBatch(
+            ids=request.ids,
+            embeddings=embeddings,
+            texts=request.texts,
+            columns=request.metadata
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        # 使用统一管道处理
+        result = await process_clustering_request(
+            items=batch,
+            config=request.config,
+            optimization=request.optimization,
+            content_analysis=request.content_analysis,
+            model_components=None,
+            data_type='columnar',
+            response_mode=request.response_mode
+        )
+        
+        response_class = CompactClusteringResponse if request.response_mode == 'compact' else BaseClusteringResponse
+        response = response_class.model_construct(**result)
+        response.model_info = {
+            **(response.model_info or {}),
+            "transport_dtype": buffer.dtype
+        }
+        
+        if request.response_mode == 'full' and not request.return_reduced_embeddings:
+            response.reduced_embeddings = None
+        
+        print(f"[ColumnarClustering] 处理完成，发现 {len(response.clusters)} 个聚类")
+        return FastJSONResponse(response)
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[ColumnarClustering] 处理错误: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"列式聚类失败: {str(e)}"
+        )
+
+# ============================================================================
+# 核心端点 4: 增量簇分配
+# ============================================================================
+
+@app.post("/clustering/assign", response_model=ClusterAssignResponse)
+async def assign_clusters(
+    request: ClusterAssignRequest,
+    _: None = Depends(verify_token),
+):
+    """
+    用已保存的聚类模型为新嵌入分配簇标签
+    
+    模型来自 config.persist_model=true 的聚类请求；新向量经 UMAP.transform 映射到
+    已有布局，再由 hdbscan.approximate_predict 给出标签与归属强度，无需重新聚类。
+    """
+    print(f"[ClusterAssign] 收到请求：{len(request.embeddings)} 个嵌入 (模型 {request.model_id})")
+    
+    try:
+        import numpy as np
+        from .clustering import assign_embeddings
+        
+        start_time = time.time()
+        embeddings = np.asarray(request.embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or len(embeddings) == 0:
+            raise ValueError("embeddings 必须是非空的二维数组")
+        
+        result = await run_clustering(
+            assign_embeddings, request.model_id, embeddings, settings.cluster_assign_batch_size
+        )
+        processing_time = time.time() - start_time
+        
+        print(f"[ClusterAssign] 处理完成，耗时: {processing_time * 1000:.1f}毫秒")
+        
+        return ClusterAssignResponse(
+            model_id=result['model_id'],
+            cluster_labels=result['cluster_labels'],
+            membership_strengths=result['membership_strengths'],
+            n_outliers=result['n_outliers'],
+            reduced_embeddings=result['reduced_embeddings'] if request.return_reduced_embeddings else None,
+            processing_time=processing_time
+        )
+        
+    except ModelNotFoundError:
+        raise HTTPException(status_code=404, detail=f"聚类模型不存在: {request.model_id}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[ClusterAssign] 处理错误: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"增量簇分配失败: {str(e)}"
+        )
+
+# ============================================================================
+# 核心端点 5: 流式聚类会话
+# ============================================================================
+
+def _stream_session_state(session, include_clusters: bool = True) -> StreamSessionState:
+    stats = session.stats()
+    return StreamSessionState(
+        session_id=stats['session_id'],
+        ready=stats['ready'],
+        model_id=stats['model_id'],
+        n_items=stats['n_items'],
+        n_pending=stats['n_pending'],
+        n_micro_clusters=stats['n_micro_clusters'],
+        n_clusters=stats['n_clusters'],
+        n_updates=stats['n_updates'],
+        n_consolidations=stats['n_consolidations'],
+        update_seconds=stats['update_seconds'],
+        consolidation_seconds=stats['consolidation_seconds'],
+        clusters=session.membership() if include_clusters else None
+    )
+
+def _get_stream_session(session_id: str):
+    from .streaming import SessionNotFoundError, get_session_manager
+    try:
+        return get_session_manager().get(session_id)
+    except SessionNotFoundError:
+        raise HTTPException(status_code=404, detail=f"流式会话不存在: {session_id}")
+
+@app.post("/clustering/stream/sessions", response_model=StreamSessionState)
+async def create_stream_session(
+    request: StreamSessionCreateRequest,
+    _: None = Depends(verify_token),
+):
+    """
+    创建流式聚类会话
+    
+    指定 model_id 时直接使用已保存的模型；否则累计 bootstrap_size 篇文章后拟合并保存新模型。
+    之后每批文章映射到降维空间并增量更新微簇，每 consolidate_every 篇文章只在微簇中心上
+    重新运行HDBSCAN整合宏观簇，单次更新的开销与窗口总大小无关。
+    """
+    try:
+        from .clustering import ClusteringConfig as InternalClusteringConfig
+        from .streaming import StreamingConfig, get_session_manager
+        
+        internal_config, execution_mode, _ = resolve_clustering_config(request.config)
+        clustering_config = InternalClusteringConfig(**internal_config, execution_mode=execution_mode)
+        stream_config = StreamingConfig(
+            bootstrap_size=request.bootstrap_size,
+            consolidate_every=request.consolidate_every,
+            max_micro_clusters=request.max_micro_clusters,
+            radius_factor=request.radius_factor,
+            min_micro_cluster_size=request.min_micro_cluster_size,
+            min_cluster_size=request.min_cluster_size,
+            transform_batch_size=settings.cluster_assign_batch_size
+        )
+        session = await run_streaming(
+            get_session_manager().create, stream_config, clustering_config, request.model_id
+        )
+        print(f"[StreamClustering] 创建会话 {session.session_id} (模型 {request.model_id or '待拟合'})")
+        return _stream_session_state(session, include_clusters=False)
+        
+    except ModelNotFoundError:
+        raise HTTPException(status_code=404, detail=f"聚类模型不存在: {request.model_id}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[StreamClustering] 创建会话失败: {e}")
+        raise HTTPException(status_code=500, detail=f"创建流式会话失败: {str(e)}")
+
+@app.post("/clustering/stream/sessions/{session_id}/items", response_model=StreamUpdateResponse)
+async def add_stream_items(
+    session_id: str,
+    request: StreamUpdateRequest,
+    _: None = Depends(verify_token),
+):
+    """向流式会话追加一批文章，返回它们当前的簇标签"""
+    session = _get_stream_session(session_id)
+    
+    try:
+        import numpy as np
+        
+        start_time = time.time()
+        embeddings = np.asarray([item.embedding for item in request.items], dtype=np.float32)
+        if embeddings.ndim != 2 or len(embeddings) == 0:
+            raise ValueError("items 必须是非空的、维度一致的嵌入列表")
+        
+        result = await run_streaming(session.add, [item.id for item in request.items], embeddings)
+        processing_time = time.time() - start_time
+        
+        return StreamUpdateResponse(
+            session_id=session_id,
+            ready=session.ready,
+            cluster_labels=result['labels'],
+            consolidated=result['consolidated'],
+            processing_time=processing_time
+        )
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[StreamClustering] 追加文章失败: {e}")
+        raise HTTPException(status_code=500, detail=f"流式聚类更新失败: {str(e)}")
+
+@app.get("/clustering/stream/sessions/{session_id}", response_model=StreamSessionState)
+async def get_stream_session(
+    session_id: str,
+    include_clusters: bool = Query(True, description="是否返回簇成员"),
+    _: None = Depends(verify_token),
+):
+    """查询流式会话状态与当前簇成员"""
+    session = _get_stream_session(session_id)
+    # 读取成员需要会话锁，放到执行池中避免在更新期间阻塞事件循环
+    return await run_streaming(_stream_session_state, session, include_clusters)
+
+@app.post("/clustering/stream/sessions/{session_id}/consolidate", response_model=StreamSessionState)
+async def consolidate_stream_session(
+    session_id: str,
+    _: None = Depends(verify_token),
+):
+    """立即整合流式会话的宏观簇"""
+    session = _get_stream_session(session_id)
+    await run_streaming(session.consolidate)
+    return await run_streaming(_stream_session_state, session)
+
+@app.delete("/clustering/stream/sessions/{session_id}")
+async def delete_stream_session(
+    session_id: str,
+    _: None = Depends(verify_token),
+):
+    """删除流式会话"""
+    from .streaming import SessionNotFoundError, get_session_manager
+    try:
+        get_session_manager().delete(session_id)
+    except SessionNotFoundError:
+        raise HTTPException(status_code=404, detail=f"流式会话不存在: {session_id}")
+    return {"session_id": session_id, "deleted": True}
+
 # ============================================================================
 # 监控和配置端点
 # ============================================================================
@@ -293,6 +631,17 @@ async def auto_detect_clustering(
 @app.get("/metrics")
 async def get_metrics():
     """获取系统指标"""
+    from .cache import peek_embedding_cache
+    from .dependencies import peek_embedding_scheduler
+    from .embeddings import get_embedding_stage_stats
+    from .model_store import peek_model_store
+    from .streaming import peek_session_manager
+    scheduler = peek_embedding_scheduler()
+    cache = peek_embedding_cache()
+    sessions = peek_session_manager()
+    # API进程内的模型存储（流式会话在此加载模型；进程池中的聚类任务各自计数）
+    model_store = peek_model_store()
+    
     return {
         "embedding_model": settings.embedding_model_name,
         "clustering_algorithm": "UMAP + HDBSCAN",
@@ -304,7 +653,13 @@ async def get_metrics():
             "text_item"
         ],
         "optimization_available": True,
-        "content_analysis_available": True
+        "content_analysis_available": True,
+        "embedding_scheduler": scheduler.stats() if scheduler else None,
+        "embedding_cache": cache.stats() if cache else None,
+        "embedding_stages": get_embedding_stage_stats(),
+        "executors": get_executor_stats(),
+        "stream_sessions": sessions.stats() if sessions else None,
+        "cluster_model_store": model_store.stats() if model_store else None
     }
 
 @app.get("/config")
@@ -312,6 +667,7 @@ async def get_config():
     """获取当前配置"""
     return {
         "embedding_model": settings.embedding_model_name,
+        "embedding_backend": settings.embedding_backend,
         "expected_embedding_dimensions": getattr(settings, 'expected_embedding_dimensions', 384),
         "default_clustering_config": {
             "umap_n_components": 10,
@@ -0,0 +1,174 @@
+"""
+聚类模型存储
+按模型ID持久化已拟合的预降维器、UMAP降维器与HDBSCAN聚类器，供新文章增量分配簇标签；
+两级存储：进程内LRU + 磁盘pickle文件（重启后、其他聚类工作进程中仍可加载）
+"""
+
+import os
+import pickle
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from .config import settings
+
+_MODEL_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+class ModelNotFoundError(KeyError):
+    """模型ID不存在（或格式不合法）"""
+
+
+@dataclass
+class ClusterModel:
+    """一次聚类拟合得到的可复用模型"""
+    model_id: str
+    clusterer: Any  # hdbscan.HDBSCAN（prediction_data=True）
+    reducer: Optional[Any]  # umap.UMAP；UMAP失败回退时为None
+    pre_reducer: Optional[Any]  # PCA / SparseRandomProjection；未预降维时为None
+    normalize_embeddings: bool
+    input_dim: int
+    reduced_dim: int
+    n_samples: int
+    config_used: Dict[str, Any] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+
+    def info(self) -> Dict[str, Any]:
+        """不含拟合对象的模型摘要"""
+        return {
+            "model_id": self.model_id,
+            "input_dim": self.input_dim,
+            "reduced_dim": self.reduced_dim,
+            "n_samples": self.n_samples,
+            "config_used": self.config_used,
+            "created_at": self.created_at,
+        }
+
+
+def new_model_id() -> str:
+    return uuid.uuid4().hex
+
+
+class ClusterModelStore:
+    """模型存储：内存LRU在前，磁盘目录在后；磁盘上超过 max_models 个模型时删除最早的"""
+
+    def __init__(self, directory: Union[str, Path], memory_entries: int, max_models: int):
+        self.directory = Path(directory)
+        self.memory_entries = memory_entries
+        self.max_models = max_models
+        self._memory: "OrderedDict[str, ClusterModel]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._saved = 0
+        self._hits_memory = 0
+        self._hits_disk = 0
+        self._misses = 0
+        self._deleted = 0
+
+    def _path(self, model_id: str) -> Path:
+        return self.directory / f"{model_id}.pkl"
+
+    def save(self, model: ClusterModel) -> None:
+        """写入磁盘（先写临时文件再原子替换）并放入内存LRU"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(model.model_id)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._saved += 1
+            self._remember(model)
+        self._prune()
+
+    def load(self, model_id: str) -> ClusterModel:
+        """按ID加载模型，不存在时抛出 ModelNotFoundError"""
+        if not _MODEL_ID_PATTERN.fullmatch(model_id):
+            raise ModelNotFoundError(model_id)
+        with self._lock:
+            model = self._memory.get(model_id)
+            if model is not None:
+                self._memory.move_to_end(model_id)
+                self._hits_memory += 1
+                return model
+
+        path = self._path(model_id)
+        try:
+            with open(path, "rb") as f:
+                model = pickle.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self._misses += 1
+            raise ModelNotFoundError(model_id) from None
+        with self._lock:
+            self._hits_disk += 1
+            self._remember(model)
+        return model
+
+    def list_models(self) -> List[str]:
+        """磁盘上的模型ID（按创建时间从早到晚）"""
+        if not self.directory.exists():
+            return []
+        paths = sorted(self.directory.glob("*.pkl"), key=lambda p: p.stat().st_mtime)
+        return [p.stem for p in paths]
+
+    def _remember(self, model: ClusterModel) -> None:
+        self._memory[model.model_id] = model
+        self._memory.move_to_end(model.model_id)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _prune(self) -> None:
+        """删除超出 max_models 的最早模型"""
+        if self.max_models <= 0:
+            return
+        stale = self.list_models()[:-self.max_models]
+        for model_id in stale:
+            try:
+                self._path(model_id).unlink()
+            except FileNotFoundError:
+                continue
+            with self._lock:
+                self._memory.pop(model_id, None)
+                self._deleted += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": str(self.directory),
+            "memory_entries": len(self._memory),
+            "memory_capacity": self.memory_entries,
+            "max_models": self.max_models,
+            "saved": self._saved,
+            "hits_memory": self._hits_memory,
+            "hits_disk": self._hits_disk,
+            "misses": self._misses,
+            "deleted": self._deleted,
+        }
+
+
+_store_instance: Optional[ClusterModelStore] = None
+_store_lock = threading.Lock()
+
+
+def get_model_store() -> ClusterModelStore:
+    """获取全局模型存储（每个进程一个实例，共享同一磁盘目录）"""
+    global _store_instance
+    if _store_instance is None:
+        with _store_lock:
+            if _store_instance is None:
+                _store_instance = ClusterModelStore(
+                    directory=settings.cluster_model_dir,
+                    memory_entries=settings.cluster_model_memory_entries,
+                    max_models=settings.cluster_model_max_models,
+                )
+    return _store_instance
+
+
+def peek_model_store() -> Optional[ClusterModelStore]:
+    """返回已创建的存储实例，不触发创建"""
+    return _store_instance
@@ -0,0 +1,122 @@
+"""
+ONNX Runtime 嵌入推理后端
+首次使用时把 transformers 模型导出为 ONNX（可选动态int8量化）并缓存，
+之后直接用 ONNX Runtime 推理；池化与归一化仍由 compute_embeddings 完成
+"""
+
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+import torch
+
+try:
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+ONNX_BACKENDS = ("onnx", "onnx-int8")
+
+
+def validate_onnx_availability() -> None:
+    """验证ONNX依赖是否可用"""
+    if not ONNX_AVAILABLE:
+        raise ImportError("ONNX后端需要安装: pip install 'meridian_ml_service[onnx]'")
+
+
+class _LastHiddenState(torch.nn.Module):
+    """导出包装：只输出 last_hidden_state"""
+
+    def __init__(self, model: Any):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids=None):
+        if token_type_ids is None:
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+        return self.model(
+            input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+        ).last_hidden_state
+
+
+def onnx_model_path(output_dir: Path, quantize: bool) -> Path:
+    """导出产物路径：fp32为 model.onnx，int8为 model.int8.onnx"""
+    return output_dir / ("model.int8.onnx" if quantize else "model.onnx")
+
+
+@contextmanager
+def _atomic_output(path: Path) -> Iterator[Path]:
+    """先写入同目录下本进程独有的临时文件，成功后原子替换为目标路径
+
+    导出中途崩溃只会留下临时文件，目标路径存在即表示产物完整；多个工作进程同时导出时后完成者覆盖先完成者。
+    """
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp{path.suffix}")
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def export_onnx_model(tokenizer: Any, model: Any, output_dir: Path, quantize: bool) -> Path:
+    """导出ONNX模型（已存在则直接复用），返回模型文件路径"""
+    validate_onnx_availability()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    fp32_path = onnx_model_path(output_dir, quantize=False)
+    int8_path = onnx_model_path(output_dir, quantize=True)
+    target = int8_path if quantize else fp32_path
+    if target.exists():
+        return target
+
+    if not fp32_path.exists():
+        print(f"正在导出ONNX模型: {fp32_path}")
+        sample = tokenizer(["meridian onnx export"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        with torch.no_grad(), _atomic_output(fp32_path) as tmp_path:
+            torch.onnx.export(
+                _LastHiddenState(model).eval(),
+                tuple(sample[name] for name in input_names),
+                str(tmp_path),
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+                dynamo=False,
+            )
+
+    if quantize:
+        print(f"正在进行动态int8量化: {int8_path}")
+        with _atomic_output(int8_path) as tmp_path:
+            quantize_dynamic(str(fp32_path), str(tmp_path), weight_type=QuantType.QInt8)
+
+    return target
+
+
+class OnnxEmbeddingModel:
+    """与 transformers 模型调用方式一致的 ONNX Runtime 包装"""
+
+    def __init__(self, model_path: Path):
+        validate_onnx_availability()
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.model_path = model_path
+        self.session = ort.InferenceSession(
+            str(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names: List[str] = [i.name for i in self.session.get_inputs()]
+
+    def __call__(self, **batch: torch.Tensor) -> SimpleNamespace:
+        feed: Dict[str, np.ndarray] = {
+            name: batch[name].cpu().numpy().astype(np.int64, copy=False)
+            for name in self.input_names
+            if name in batch
+        }
+        (last_hidden_state,) = self.session.run(["last_hidden_state"], feed)
+        return SimpleNamespace(last_hidden_state=torch.from_numpy(last_hidden_state))
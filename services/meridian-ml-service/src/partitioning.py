@@ -0,0 +1,368 @@
+"""
+两级分区聚类
+大规模语料（历史回填）无法对整个矩阵一次拟合UMAP与HDBSCAN：先用小批量k-means粗分区，
+各分区在独立工作进程中并行运行 UMAP + HDBSCAN，再按簇中心与分区边界点的相似度合并跨分区的簇。
+除输入矩阵与输出标签/坐标外，峰值内存只随分区大小增长
+"""
+
+import logging
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .clustering import (
+    ClusteringConfig,
+    _build_clustering_result,
+    _exact_knn_blas,
+    _get_search_pool,
+    perform_hdbscan_clustering,
+    perform_umap_reduction,
+    pre_reduce_embeddings,
+    preprocess_embeddings,
+    validate_clustering_availability,
+)
+
+try:
+    from sklearn.cluster import MiniBatchKMeans
+except ImportError:
+    pass
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 8192  # 分块归一化/分配时每块的行数
+_KMEANS_SAMPLE_PER_PARTITION = 2000  # 拟合k-means时每个分区最多抽样的点数
+_MAX_BOUNDARY_POINTS = 5000  # 每对相邻分区每侧最多使用的边界点数（取相似度之差最小者）
+
+
+@dataclass
+class PartitionConfig:
+    """分区聚类参数"""
+    partition_size: int = 20000  # 每个分区的目标文章数
+    min_partition_size: Optional[int] = None  # 更小的分区并入次近的分区（None为 partition_size 的四分之一）
+    n_jobs: int = 1  # 并行处理分区的工作进程数（1为串行）
+    context_fraction: float = 0.2  # 每个分区附带的分区外抽样点数（相对分区大小），仅作上下文
+    boundary_margin: float = 0.05  # 到最近与次近分区中心的余弦相似度之差不超过该值的点视为边界点
+    boundary_k: int = 5  # 每个边界点在相邻分区边界点中查找的近邻数
+    merge_min_links: int = 3  # 合并两个簇所需的边界近邻连接数
+    merge_similarity: float = 0.8  # 合并两个簇所需的簇中心余弦相似度
+    random_state: int = 42
+
+
+def _normalized_chunks(embeddings: np.ndarray):
+    """逐块返回 (起始行, L2归一化后的float32块)"""
+    for start in range(0, len(embeddings), _CHUNK_SIZE):
+        chunk = np.asarray(embeddings[start:start + _CHUNK_SIZE], dtype=np.float32)
+        norms = np.linalg.norm(chunk, axis=1, keepdims=True)
+        yield start, chunk / np.where(norms > 0, norms, 1.0)
+
+
+def partition_embeddings(
+    embeddings: np.ndarray,
+    partition_config: PartitionConfig
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """小批量k-means粗分区（余弦空间）
+
+    k-means只在固定种子的抽样上拟合，分配按块进行。
+    小于 min_partition_size 的分区并入其点的次近分区。
+
+    Returns:
+        (分区标签, 次近分区, 最近与次近分区中心的相似度之差)
+    """
+    n_samples = len(embeddings)
+    n_partitions = max(1, math.ceil(n_samples / partition_config.partition_size))
+    rng = np.random.default_rng(partition_config.random_state)
+    n_fit = min(n_samples, n_partitions * _KMEANS_SAMPLE_PER_PARTITION)
+    sample = np.sort(rng.choice(n_samples, size=n_fit, replace=False))
+    fit_data = np.vstack([chunk for _, chunk in _normalized_chunks(embeddings[sample])])
+    kmeans = MiniBatchKMeans(
+        n_clusters=n_partitions,
+        batch_size=max(1024, 4 * n_partitions),
+        n_init=3,
+        random_state=partition_config.random_state,
+    ).fit(fit_data)
+    centers = kmeans.cluster_centers_.astype(np.float32)
+    centers /= np.maximum(np.linalg.norm(centers, axis=1, keepdims=True), 1e-12)
+
+    min_partition_size = partition_config.min_partition_size
+    if min_partition_size is None:
+        min_partition_size = partition_config.partition_size // 4
+    active = np.ones(n_partitions, dtype=bool)
+    while True:
+        partitions, second, margins = _assign_partitions(embeddings, centers, active)
+        sizes = np.bincount(partitions, minlength=n_partitions)
+        small = active & (sizes < min_partition_size)
+        # 至少保留一个分区；每轮只移除最小的分区，避免连锁移除
+        if not small.any() or active.sum() <= 1:
+            return partitions, second, margins
+        active[np.flatnonzero(small)[np.argmin(sizes[small])]] = False
+
+
+def _assign_partitions(
+    embeddings: np.ndarray,
+    centers: np.ndarray,
+    active: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    n_samples = len(embeddings)
+    partitions = np.empty(n_samples, dtype=np.int64)
+    second = np.empty(n_samples, dtype=np.int64)
+    margins = np.empty(n_samples, dtype=np.float32)
+    for start, chunk in _normalized_chunks(embeddings):
+        similarities = chunk @ centers.T
+        similarities[:, ~active] = -np.inf
+        if similarities.shape[1] > 1:
+            top2 = np.argpartition(-similarities, 1, axis=1)[:, :2]
+        else:
+            top2 = np.zeros((len(chunk), 2), dtype=np.int64)
+        top2_sims = np.take_along_axis(similarities, top2, axis=1)
+        swap = top2_sims[:, 1] > top2_sims[:, 0]
+        top2[swap] = top2[swap][:, ::-1]
+        top2_sims[swap] = top2_sims[swap][:, ::-1]
+        stop = start + len(chunk)
+        partitions[start:stop] = top2[:, 0]
+        second[start:stop] = top2[:, 1]
+        margins[start:stop] = np.where(np.isfinite(top2_sims[:, 1]), top2_sims[:, 0] - top2_sims[:, 1], np.inf)
+    return partitions, second, margins
+
+
+def _cluster_partition(
+    embeddings: np.ndarray, config: ClusteringConfig
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """单个分区（含上下文点）的 预处理 -> 预降维 -> UMAP -> HDBSCAN（在工作进程中运行）
+
+    返回 (标签, 降维结果, 簇归属强度)
+    """
+    processed = preprocess_embeddings(embeddings, normalize=config.normalize_embeddings)
+    processed, _, _ = pre_reduce_embeddings(processed, config.pre_reduction, config.pre_reduction_dim)
+    reduced, _ = perform_umap_reduction(processed, config)
+    labels, clusterer = perform_hdbscan_clustering(reduced, config)
+    strengths = clusterer.probabilities_ if clusterer is not None else (labels != -1)
+    return (
+        np.asarray(labels, dtype=np.int64),
+        np.asarray(reduced, dtype=np.float32),
+        np.asarray(strengths, dtype=np.float32),
+    )
+
+
+def _with_context(
+    n_samples: int,
+    rows: np.ndarray,
+    context_fraction: float,
+    rng: np.random.Generator
+) -> np.ndarray:
+    """分区行 + 分区外的均匀抽样行
+
+    单个分区可能整体就是一个主题；HDBSCAN不选根节点为簇，只看分区内数据会把它切碎。
+    附带少量分区外的点让分区内的主题与"其余部分"分开，与全量聚类时的簇结构一致。
+    """
+    n_context = min(int(len(rows) * context_fraction), n_samples - len(rows))
+    if n_context <= 0:
+        return rows
+    outside = np.ones(n_samples, dtype=bool)
+    outside[rows] = False
+    context = rng.choice(np.flatnonzero(outside), size=n_context, replace=False)
+    return np.concatenate([rows, np.sort(context)])
+
+
+def _run_partitions(
+    embeddings: np.ndarray,
+    members: List[np.ndarray],
+    config: ClusteringConfig,
+    partition_config: PartitionConfig
+):
+    """逐个返回 (分区下标, 标签, 降维结果, 簇归属强度)，只含分区自身的行；
+    并行时最多 n_jobs 个分区同时在途，限制内存"""
+    rng = np.random.default_rng(partition_config.random_state)
+    tasks = [
+        _with_context(len(embeddings), rows, partition_config.context_fraction, rng)
+        for rows in members
+    ]
+    if partition_config.n_jobs <= 1 or len(members) <= 1:
+        for index, rows in enumerate(tasks):
+            labels, reduced, strengths = _cluster_partition(embeddings[rows], config)
+            n_own = len(members[index])
+            yield index, labels[:n_own], reduced[:n_own], strengths[:n_own]
+        return
+
+    pool = _get_search_pool(partition_config.n_jobs)
+    pending = {}
+    next_index = 0
+    while next_index < len(members) or pending:
+        while next_index < len(members) and len(pending) < partition_config.n_jobs:
+            future = pool.submit(_cluster_partition, embeddings[tasks[next_index]], config)
+            pending[future] = next_index
+            next_index += 1
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            index = pending.pop(future)
+            labels, reduced, strengths = future.result()
+            n_own = len(members[index])
+            yield index, labels[:n_own], reduced[:n_own], strengths[:n_own]
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = np.arange(size)
+
+    def find(self, item: int) -> int:
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return int(root)
+
+    def union(self, first: int, second: int) -> bool:
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return False
+        self.parent[max(first, second)] = min(first, second)
+        return True
+
+
+def _cluster_centroids(embeddings: np.ndarray, labels: np.ndarray, n_clusters: int) -> np.ndarray:
+    """各全局簇在归一化输入空间中的单位中心（分块累加）"""
+    sums = np.zeros((n_clusters, embeddings.shape[1]), dtype=np.float64)
+    for start, chunk in _normalized_chunks(embeddings):
+        chunk_labels = labels[start:start + len(chunk)]
+        clustered = chunk_labels >= 0
+        np.add.at(sums, chunk_labels[clustered], chunk[clustered])
+    norms = np.linalg.norm(sums, axis=1, keepdims=True)
+    return (sums / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+
+
+def _closest_to_boundary(rows: np.ndarray, margins: np.ndarray) -> np.ndarray:
+    if len(rows) <= _MAX_BOUNDARY_POINTS:
+        return rows
+    return np.sort(rows[np.argsort(margins[rows], kind='stable')[:_MAX_BOUNDARY_POINTS]])
+
+
+def _merge_across_partitions(
+    embeddings: np.ndarray,
+    labels: np.ndarray,
+    n_clusters: int,
+    partitions: np.ndarray,
+    second: np.ndarray,
+    margins: np.ndarray,
+    partition_config: PartitionConfig
+) -> Tuple[np.ndarray, int]:
+    """合并被分区边界切开的簇
+
+    分区 p 中次近分区为 q 的边界点，与分区 q 中次近分区为 p 的边界点互查近邻；
+    连接数达到 merge_min_links 且簇中心相似度达到 merge_similarity 的簇对合并。
+    只在边界点之间计算近邻，开销与边界点数有关，与语料规模无关。
+
+    Returns:
+        (合并后的全局标签, 合并次数)
+    """
+    if n_clusters <= 1:
+        return labels, 0
+    centroids = _cluster_centroids(embeddings, labels, n_clusters)
+    boundary = np.flatnonzero((labels >= 0) & (margins <= partition_config.boundary_margin))
+
+    links: Dict[Tuple[int, int], int] = {}
+    pairs = {}
+    for row in boundary:
+        pairs.setdefault((int(partitions[row]), int(second[row])), []).append(row)
+    for (p, q), rows in pairs.items():
+        if p > q or (q, p) not in pairs:
+            continue
+        side_p = _closest_to_boundary(np.asarray(rows), margins)
+        side_q = _closest_to_boundary(np.asarray(pairs[(q, p)]), margins)
+        k = min(partition_config.boundary_k, len(side_q))
+        neighbors, _ = _exact_knn_blas(
+            np.asarray(embeddings[side_q], dtype=np.float32), k, 'cosine',
+            queries=np.asarray(embeddings[side_p], dtype=np.float32)
+        )
+        source = np.repeat(labels[side_p], k)
+        target = labels[side_q][neighbors.ravel()]
+        for a, b in zip(source.tolist(), target.tolist()):
+            key = (min(a, b), max(a, b))
+            links[key] = links.get(key, 0) + 1
+
+    union_find = _UnionFind(n_clusters)
+    merges = 0
+    for (a, b), count in sorted(links.items()):
+        if count < partition_config.merge_min_links:
+            continue
+        if float(centroids[a] @ centroids[b]) < partition_config.merge_similarity:
+            continue
+        merges += union_find.union(a, b)
+
+    # 重新编号为连续标签（按首次出现顺序）
+    roots = np.array([union_find.find(label) for label in range(n_clusters)])
+    merged = np.where(labels >= 0, roots[np.maximum(labels, 0)], -1)
+    _, first_seen = np.unique(merged[merged >= 0], return_index=True)
+    order = np.unique(merged[merged >= 0])[np.argsort(first_seen)]
+    remap = np.full(n_clusters, -1, dtype=np.int64)
+    remap[order] = np.arange(len(order))
+    return np.where(merged >= 0, remap[np.maximum(merged, 0)], -1), merges
+
+
+def cluster_embeddings_partitioned(
+    embeddings: np.ndarray,
+    config: Optional[ClusteringConfig] = None,
+    partition_config: Optional[PartitionConfig] = None
+) -> Dict[str, Any]:
+    """
+    两级分区聚类：k-means粗分区 -> 分区内 UMAP + HDBSCAN（可并行）-> 跨分区合并
+
+    降维坐标在各分区的UMAP空间中，不同分区之间不可比较；因此不计算整体DBCV。
+    数据只够一个分区时与 cluster_embeddings 的流程相同。
+    """
+    validate_clustering_availability()
+    if config is None:
+        config = ClusteringConfig()
+    if partition_config is None:
+        partition_config = PartitionConfig()
+
+    start = time.perf_counter()
+    n_samples = len(embeddings)
+    logger.info(f"开始分区聚类: {embeddings.shape}, 目标分区大小 {partition_config.partition_size}")
+
+    partitions, second, margins = partition_embeddings(embeddings, partition_config)
+    partition_ids = np.unique(partitions)
+    members = [np.flatnonzero(partitions == partition_id) for partition_id in partition_ids]
+    logger.info(f"粗分区完成: {len(members)} 个分区, 大小 {min(map(len, members))}-{max(map(len, members))}")
+
+    labels = np.full(n_samples, -1, dtype=np.int64)
+    reduced = np.empty((n_samples, config.umap_n_components), dtype=np.float32)
+    strengths = np.zeros(n_samples, dtype=np.float32)
+    offsets = np.zeros(len(members), dtype=np.int64)
+    local_counts = np.zeros(len(members), dtype=np.int64)
+    for index, local_labels, local_reduced, local_strengths in _run_partitions(
+        embeddings, members, config, partition_config
+    ):
+        rows = members[index]
+        # 只由上下文点组成的簇不出现在分区自身的行中，重新编号为连续标签
+        local_ids, local_labels = np.unique(local_labels, return_inverse=True)
+        if local_ids[0] == -1:
+            local_labels = local_labels - 1
+        local_counts[index] = int(np.sum(local_ids >= 0))
+        labels[rows] = local_labels
+        strengths[rows] = local_strengths
+        reduced[rows, :local_reduced.shape[1]] = local_reduced
+        reduced[rows, local_reduced.shape[1]:] = 0.0
+        logger.info(f"分区 {index + 1}/{len(members)} 完成: {len(rows)} 个点, {local_counts[index]} 个簇")
+
+    # 局部标签 -> 全局标签
+    offsets[1:] = np.cumsum(local_counts)[:-1]
+    position = np.empty(partitions.max() + 1, dtype=np.int64)
+    position[partition_ids] = np.arange(len(partition_ids))
+    labels = np.where(labels >= 0, labels + offsets[position[partitions]], -1)
+
+    labels, merges = _merge_across_partitions(
+        embeddings, labels, int(local_counts.sum()), partitions, second, margins, partition_config
+    )
+    logger.info(f"跨分区合并 {merges} 次, 最终 {labels.max() + 1} 个簇, 耗时 {time.perf_counter() - start:.2f}s")
+
+    # 归属强度沿用各分区HDBSCAN的结果（跨分区合并只改变簇编号）
+    result = _build_clustering_result(n_samples, reduced, labels, config, None, None, strengths)
+    result['clustering_stats']['n_partitions'] = len(members)
+    result['clustering_stats']['partition_merges'] = merges
+    result['config_used']['partitioning'] = 'kmeans'
+    result['config_used']['partition_size'] = partition_config.partition_size
+    return result
@@ -3,8 +3,10 @@ Meridian ML Pipeline - 统一的ML处理管道
 将分散的业务逻辑集中管理，提高代码复用性和维护性
 """
 
+import itertools
 import time
 import numpy as np
+from collections.abc import Sequence
 from typing import List, Dict, Any, Optional, Union, Tuple
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
@@ -13,14 +15,20 @@ from .schemas import (
     TextItem, VectorItem, ArticleItem,
     AIWorkerEmbeddingItem, AIWorkerArticleDataItem, DataFormatConverter,
     BaseClusteringConfig, OptimizationConfig, ContentAnalysisConfig,
-    ClusteringStats, OptimizationResult, ClusterInfo,
+    ClusteringStats, OptimizationResult, ClusterInfo, CompactClusterSummary,
     convert_to_internal_config, build_optimization_grid
 )
+from .config import settings
 from .embeddings import compute_embeddings, validate_embeddings
+from .executors import run_clustering, run_inference
 from .clustering import (
     cluster_embeddings_with_optimization,
     cluster_embeddings,
+    collapse_near_duplicates,
+    expand_collapsed_result,
     analyze_cluster_content,
+    get_preset_settings,
+    PRESET_SEARCH_KEYS,
     ClusteringConfig as InternalClusteringConfig
 )
 
@@ -28,6 +36,10 @@ from .clustering import (
 # 处理管道抽象基类
 # ============================================================================
 
+class UnsupportedConfigurationError(ValueError):
+    """请求中的选项组合不受支持（端点返回400）"""
+
+
 class ProcessingStage(ABC):
     """处理阶段抽象基类"""
     
@@ -93,8 +105,196 @@ class DataExtractionResult:
     """数据提取结果"""
     embeddings: np.ndarray
     texts: List[str]
-    metadata: List[Dict[str, Any]]
+    metadata: Sequence  # 每项的元数据字典（列表或 ColumnarMetadata）
     items_info: Dict[str, Any]
+    # 近重复折叠（DeduplicationStage）：只聚类代表点，inverse 为每个点的代表在代表数组中的位置
+    representatives: Optional[np.ndarray] = None
+    duplicate_inverse: Optional[np.ndarray] = None
+
+@dataclass
+class ColumnarBatch:
+    """列式输入：ID数组、已解码的嵌入矩阵与可选的文本/元数据列（data_type='columnar'）"""
+    ids: List[Any]
+    embeddings: np.ndarray
+    texts: Optional[List[str]] = None
+    columns: Optional[Dict[str, List[Any]]] = None
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+
+AI_WORKER_FORMATS = ('ai_worker_embedding', 'ai_worker_embedding_extended', 'ai_worker_article')
+
+# AI Worker格式的字段：(字段名, 是否必填)；元数据中的字段顺序与逐项解析路径一致
+_AI_WORKER_EMBEDDING_FIELDS = (
+    ('title', False), ('url', False), ('publish_date', False), ('status', False),
+)
+_AI_WORKER_ARTICLE_FIELDS = (
+    ('title', True), ('url', True), ('publishDate', True), ('status', True),
+    ('contentFileKey', False), ('processedAt', False),
+)
+
+
+class ColumnarMetadata(Sequence):
+    """按列存储的元数据：常量字段只存一份，每行的字典在访问时才构建"""
+    
+    def __init__(self, keys: Tuple[str, ...], columns: Dict[str, List[Any]], constants: Dict[str, Any], length: int):
+        self.keys = keys
+        self.columns = columns
+        self.constants = constants
+        self.length = length
+    
+    def __len__(self) -> int:
+        return self.length
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        return {
+            key: self.constants[key] if key in self.constants else self.columns[key][index]
+            for key in self.keys
+        }
+
+
+def extract_ai_worker_per_item(
+    items: List[Any],
+    data_type: str
+) -> Tuple[np.ndarray, List[str], List[Dict[str, Any]]]:
+    """逐项解析AI Worker数据：每项构建Pydantic模型，再由嵌入列表构建矩阵"""
+    embeddings = []
+    texts = []
+    metadata = []
+    if data_type == 'ai_worker_article':
+        for i, item in enumerate(items):
+            # 转换为标准格式进行处理
+            if isinstance(item, dict):
+                ai_article = AIWorkerArticleDataItem(**item)
+            else:
+                ai_article = item
+            
+            embeddings.append(ai_article.embedding)
+            # 组合标题和内容作为文本
+            text_content = f"{ai_article.title}\n\n{ai_article.content[:500]}..."
+            texts.append(text_content)
+            metadata.append({
+                'id': ai_article.id,
+                'source': 'ai_worker',
+                'original_format': 'ai_worker_article',
+                'title': ai_article.title,
+                'url': ai_article.url,
+                'publishDate': ai_article.publishDate,
+                'status': ai_article.status,
+                'contentFileKey': ai_article.contentFileKey,
+                'processedAt': ai_article.processedAt
+            })
+    else:
+        for i, item in enumerate(items):
+            # 转换为标准格式进行处理
+            if isinstance(item, dict):
+                ai_item = AIWorkerEmbeddingItem(**item)
+            else:
+                ai_item = item
+            
+            embeddings.append(ai_item.embedding)
+            texts.append(ai_item.title or f"Article {ai_item.id}")
+            metadata.append({
+                'id': ai_item.id,
+                'source': 'ai_worker',
+                'original_format': 'ai_worker_embedding',
+                'title': ai_item.title,
+                'url': ai_item.url,
+                'publish_date': ai_item.publish_date,
+                'status': ai_item.status
+            })
+    
+    # 验证嵌入向量
+    return validate_embeddings(embeddings), texts, metadata
+
+
+def extract_ai_worker_bulk(
+    items: List[Any],
+    data_type: str
+) -> Optional[Tuple[np.ndarray, List[str], ColumnarMetadata]]:
+    """整批解析AI Worker数据：按列校验字段类型，嵌入直接写入预分配的float32矩阵
+
+    只接受严格符合模式的字典（id为int，字符串字段为str或None，嵌入为等长数值列表）；
+    任何一项不符合时返回None，由调用方回退到逐项解析（得到Pydantic的详细错误信息）。
+    嵌入数值本身的校验（维度、NaN/Inf）与逐项路径相同，由 validate_embeddings 对整个矩阵执行。
+    """
+    if not items or not all(type(item) is dict for item in items):
+        return None
+    article = data_type == 'ai_worker_article'
+    fields = _AI_WORKER_ARTICLE_FIELDS if article else _AI_WORKER_EMBEDDING_FIELDS
+    required = ['id', 'embedding'] + [name for name, is_required in fields if is_required]
+    if article:
+        required.append('content')
+    if not all(all(key in item for key in required) for item in items):
+        return None
+    
+    ids = [item['id'] for item in items]
+    if not all(type(value) is int for value in ids):
+        return None
+    columns: Dict[str, List[Any]] = {'id': ids}
+    for name, is_required in fields:
+        column = [item.get(name) for item in items]
+        if not all(type(value) is str or (value is None and not is_required) for value in column):
+            return None
+        columns[name] = column
+    
+    vectors = [item['embedding'] for item in items]
+    dim = len(vectors[0]) if type(vectors[0]) is list else 0
+    if dim == 0 or not all(type(vector) is list and len(vector) == dim for vector in vectors):
+        return None
+    try:
+        # 一次性把所有分量读入连续的float32缓冲区，不构建中间的嵌套列表数组
+        matrix = np.fromiter(
+            itertools.chain.from_iterable(vectors), dtype=np.float32, count=len(vectors) * dim
+        ).reshape(len(vectors), dim)
+    except (TypeError, ValueError):
+        return None
+    matrix = validate_embeddings(matrix)
+    
+    if article:
+        contents = [item['content'] for item in items]
+        if not all(type(value) is str for value in contents):
+            return None
+        texts = [f"{title}\n\n{content[:500]}..." for title, content in zip(columns['title'], contents)]
+    else:
+        texts = [title or f"Article {article_id}" for title, article_id in zip(columns['title'], ids)]
+    
+    original_format = 'ai_worker_article' if article else 'ai_worker_embedding'
+    keys = ('id', 'source', 'original_format') + tuple(name for name, _ in fields)
+    metadata = ColumnarMetadata(
+        keys, columns, {'source': 'ai_worker', 'original_format': original_format}, len(items)
+    )
+    return matrix, texts, metadata
+
+def extract_columnar(batch: ColumnarBatch) -> Tuple[np.ndarray, List[str], ColumnarMetadata]:
+    """解析列式输入：嵌入矩阵直接使用（float32时不复制），元数据保持按列存储"""
+    n_items = len(batch.ids)
+    if batch.embeddings.ndim != 2 or len(batch.embeddings) != n_items:
+        raise ValueError(f"嵌入矩阵行数 {len(batch.embeddings)} 与ids数量 {n_items} 不一致")
+    if batch.texts is not None and len(batch.texts) != n_items:
+        raise ValueError(f"texts 数量 {len(batch.texts)} 与ids数量 {n_items} 不一致")
+    columns = dict(batch.columns or {})
+    for name, column in columns.items():
+        if name in ('id', 'source', 'original_format'):
+            raise ValueError(f"元数据列名 {name} 为保留字段")
+        if len(column) != n_items:
+            raise ValueError(f"元数据列 {name} 长度 {len(column)} 与ids数量 {n_items} 不一致")
+    
+    embeddings = validate_embeddings(batch.embeddings)
+    texts = batch.texts if batch.texts is not None else [f"Article {item_id}" for item_id in batch.ids]
+    metadata = ColumnarMetadata(
+        ('id', 'source', 'original_format') + tuple(columns),
+        {'id': batch.ids, **columns},
+        {'source': 'columnar', 'original_format': 'columnar'},
+        n_items
+    )
+    return embeddings, texts, metadata
 
 class DataExtractionStage(ProcessingStage):
     """数据提取和验证阶段"""
@@ -135,58 +335,19 @@ class DataExtractionStage(ProcessingStage):
         context['detected_data_type'] = data_type
         print(f"[DataExtraction] 检测到数据类型: {data_type}")
         
-        # AI Worker 格式处理
-        if data_type == 'ai_worker_embedding' or data_type == 'ai_worker_embedding_extended':
-            print("[DataExtraction] 处理AI Worker嵌入格式")
-            for i, item in enumerate(items):
-                # 转换为标准格式进行处理
-                if isinstance(item, dict):
-                    ai_item = AIWorkerEmbeddingItem(**item)
-                else:
-                    ai_item = item
-                
-                embeddings.append(ai_item.embedding)
-                texts.append(ai_item.title or f"Article {ai_item.id}")
-                metadata.append({
-                    'id': ai_item.id,
-                    'source': 'ai_worker',
-                    'original_format': 'ai_worker_embedding',
-                    'title': ai_item.title,
-                    'url': ai_item.url,
-                    'publish_date': ai_item.publish_date,
-                    'status': ai_item.status
-                })
-            
-            # 验证嵌入向量
-            embeddings_array = validate_embeddings(embeddings)
-            
-        elif data_type == 'ai_worker_article':
-            print("[DataExtraction] 处理AI Worker完整文章格式")
-            for i, item in enumerate(items):
-                # 转换为标准格式进行处理
-                if isinstance(item, dict):
-                    ai_article = AIWorkerArticleDataItem(**item)
-                else:
-                    ai_article = item
-                
-                embeddings.append(ai_article.embedding)
-                # 组合标题和内容作为文本
-                text_content = f"{ai_article.title}\n\n{ai_article.content[:500]}..."
-                texts.append(text_content)
-                metadata.append({
-                    'id': ai_article.id,
-                    'source': 'ai_worker',
-                    'original_format': 'ai_worker_article',
-                    'title': ai_article.title,
-                    'url': ai_article.url,
-                    'publishDate': ai_article.publishDate,
-                    'status': ai_article.status,
-                    'contentFileKey': ai_article.contentFileKey,
-                    'processedAt': ai_article.processedAt
-                })
+        # AI Worker 格式处理：整批校验后直接写入float32矩阵，批量校验未通过时逐项解析
+        if data_type in AI_WORKER_FORMATS:
+            print(f"[DataExtraction] 处理AI Worker格式: {data_type}")
+            extracted = extract_ai_worker_bulk(items, data_type)
+            if extracted is None:
+                print("[DataExtraction] 批量校验未通过，逐项解析")
+                extracted = extract_ai_worker_per_item(items, data_type)
+            embeddings_array, texts, metadata = extracted
             
-            # 验证嵌入向量
-            embeddings_array = validate_embeddings(embeddings)
+        elif data_type == 'columnar':
+            # 列式二进制传输：嵌入已由缓冲区解码为矩阵
+            print("[DataExtraction] 处理列式输入")
+            embeddings_array, texts, metadata = extract_columnar(items)
             
         elif data_type == 'vectors':
             # 预生成向量模式（原有逻辑）
@@ -236,8 +397,8 @@ class DataExtractionStage(ProcessingStage):
                         **{k: v for k, v in item.dict().items() if k != 'text'}
                     })
             
-            # 生成嵌入向量
-            embeddings_array = compute_embeddings(texts, self.model_components)
+            # 生成嵌入向量（在推理执行池中运行）
+            embeddings_array = await run_inference(compute_embeddings, texts, self.model_components)
             
         elif data_type == 'text_item':
             # text_item 格式处理 - 与 texts 相同的逻辑
@@ -266,8 +427,8 @@ class DataExtractionStage(ProcessingStage):
                         **{k: v for k, v in item.dict().items() if k != 'text'}
                     })
             
-            # 生成嵌入向量
-            embeddings_array = compute_embeddings(texts, self.model_components)
+            # 生成嵌入向量（在推理执行池中运行）
+            embeddings_array = await run_inference(compute_embeddings, texts, self.model_components)
             
         else:
             raise ValueError(f"不支持的数据类型: {data_type}")
@@ -291,6 +452,45 @@ class DataExtractionStage(ProcessingStage):
     def get_stage_name(self) -> str:
         return "data_extraction"
 
+class DeduplicationStage(ProcessingStage):
+    """近重复折叠阶段：转载新闻的嵌入几乎相同，只把每组的代表送入聚类"""
+    
+    def __init__(self, config: Optional[BaseClusteringConfig] = None):
+        self.config = config
+    
+    async def process(self, data: DataExtractionResult, context: Dict[str, Any]) -> DataExtractionResult:
+        """分组近重复向量，未启用时原样返回"""
+        if not (self.config and self.config.deduplicate):
+            return data
+        
+        representatives, inverse = await run_clustering(
+            collapse_near_duplicates, data.embeddings, self.config.dedup_threshold
+        )
+        print(f"[Deduplication] {len(data.embeddings)} 个向量折叠为 {len(representatives)} 个代表")
+        data.representatives = representatives
+        data.duplicate_inverse = inverse
+        return data
+    
+    def get_stage_name(self) -> str:
+        return "deduplication"
+
+def resolve_clustering_config(
+    config: Optional[BaseClusteringConfig]
+) -> Tuple[Dict[str, Any], str, Dict[str, Any]]:
+    """API聚类配置 -> (内部配置字典, 执行模式, 预设参数)
+
+    请求未指定执行模式时使用服务配置；预设只填充请求中未显式设置的参数。
+    """
+    internal_config = convert_to_internal_config(config)
+    execution_mode = internal_config.pop('execution_mode', settings.clustering_execution_mode)
+    preset_settings = get_preset_settings(internal_config.get('preset'))
+    internal_config = {
+        **{key: value for key, value in preset_settings.items() if key not in PRESET_SEARCH_KEYS},
+        **internal_config,
+    }
+    return internal_config, execution_mode, preset_settings
+
+
 class ClusteringStage(ProcessingStage):
     """聚类分析阶段"""
     
@@ -306,12 +506,48 @@ class ClusteringStage(ProcessingStage):
         texts = data.texts
         
         # 转换配置
-        internal_config = convert_to_internal_config(self.config)
+        internal_config, execution_mode, preset_settings = resolve_clustering_config(self.config)
         
-        # 决定是否使用优化
+        # 决定是否使用优化（参数优化路径使用默认聚类配置，不移除异常点）
         use_optimization = self.optimization and self.optimization.enabled
+        remove_outliers = bool(internal_config.get('remove_outliers')) and not use_optimization
+        
+        # 近重复折叠时只聚类代表点，异常点在展开到全部点之后再移除
+        collapsed = data.duplicate_inverse is not None
+        if collapsed:
+            embeddings = embeddings[data.representatives]
+            internal_config['remove_outliers'] = False
+        
+        persist_model = bool(self.config and self.config.persist_model)
+        partitioning = self.config.partitioning if self.config else 'none'
+        use_partitioning = partitioning == 'kmeans' or (
+            partitioning == 'auto' and len(embeddings) > settings.clustering_partition_threshold
+        )
         
-        if use_optimization:
+        if use_partitioning:
+            # 每个分区各自拟合UMAP与HDBSCAN：既没有整体的参数搜索，也没有可保存的单一模型
+            unsupported = [
+                name for name, enabled in (
+                    ('optimization.enabled', use_optimization), ('persist_model', persist_model)
+                ) if enabled
+            ]
+            if unsupported:
+                raise UnsupportedConfigurationError(
+                    f"分区聚类 (partitioning={partitioning}, {len(embeddings)} 个样本) 不支持 "
+                    f"{' / '.join(unsupported)}，请关闭这些选项或设置 partitioning=none"
+                )
+            print("使用分区聚类...")
+            from .partitioning import PartitionConfig, cluster_embeddings_partitioned
+            internal_config_obj = InternalClusteringConfig(**internal_config, execution_mode=execution_mode)
+            partition_config = PartitionConfig(
+                partition_size=self.config.partition_size,
+                n_jobs=settings.clustering_search_workers
+            )
+            clustering_result = await run_clustering(
+                cluster_embeddings_partitioned, embeddings, internal_config_obj, partition_config
+            )
+            clustering_result['optimization'] = {'used': False}
+        elif use_optimization:
             print("使用参数优化聚类...")
             grid_config = build_optimization_grid(self.optimization)
             
@@ -322,22 +558,46 @@ class ClusteringStage(ProcessingStage):
                 hdbscan_min_cluster_size=grid_config.get('hdbscan_min_cluster_size', [3, 5, 8]),
                 hdbscan_min_samples=grid_config.get('hdbscan_min_samples', [2, 3]),
                 hdbscan_epsilon=grid_config.get('hdbscan_epsilon', [0.1, 0.2]),
+                n_jobs=settings.clustering_search_workers,
+                search_strategy=self._search_setting('search_strategy', preset_settings),
+                max_combinations=self.optimization.max_combinations,
+                early_stopping_patience=self.optimization.early_stopping_patience,
+                scorer=self._search_setting('scorer', preset_settings),
+                rerank_top_k=self.optimization.rerank_top_k,
+                execution_mode=execution_mode,
+                pre_reduction=internal_config.get('pre_reduction', 'none'),
+                pre_reduction_dim=internal_config.get('pre_reduction_dim', 50),
+                umap_n_epochs=internal_config.get('umap_n_epochs'),
+                nndescent_n_trees=internal_config.get('nndescent_n_trees'),
+                nndescent_n_iters=internal_config.get('nndescent_n_iters'),
+                preset=internal_config.get('preset'),
             )
             
-            clustering_result = cluster_embeddings_with_optimization(
+            clustering_result = await run_clustering(
+                cluster_embeddings_with_optimization,
                 embeddings,
                 use_optimization=True,
-                grid_config=internal_grid
+                grid_config=internal_grid,
+                persist_model=persist_model
             )
         else:
             print("使用标准聚类...")
-            internal_config_obj = InternalClusteringConfig(**internal_config) if internal_config else None
-            clustering_result = cluster_embeddings(embeddings, internal_config_obj)
+            internal_config_obj = InternalClusteringConfig(**internal_config, execution_mode=execution_mode)
+            clustering_result = await run_clustering(
+                cluster_embeddings, embeddings, internal_config_obj, persist_model
+            )
             clustering_result['optimization'] = {'used': False}
         
-        # 分析簇内容
-        cluster_labels = np.array(clustering_result['cluster_labels'])
-        cluster_content = analyze_cluster_content(texts, cluster_labels)
+        if collapsed:
+            clustering_result = expand_collapsed_result(
+                clustering_result, data.duplicate_inverse, remove_outliers
+            )
+        
+        # 分析簇内容（已移除异常点时标签只覆盖 item_indices 中的项目）
+        cluster_labels = np.asarray(clustering_result['cluster_labels'])
+        item_indices = clustering_result.get('item_indices')
+        kept_texts = texts if item_indices is None else [texts[i] for i in item_indices.tolist()]
+        cluster_content = analyze_cluster_content(kept_texts, cluster_labels)
         
         # 构建增强的结果
         enhanced_result = {
@@ -350,17 +610,38 @@ class ClusteringStage(ProcessingStage):
         
         return enhanced_result
     
+    def _search_setting(self, name: str, preset_settings: Dict[str, Any]) -> Any:
+        """网格搜索参数：请求显式设置时使用请求值，否则使用预设值（无预设时为请求默认值）"""
+        if name in preset_settings and name not in self.optimization.model_fields_set:
+            return preset_settings[name]
+        return getattr(self.optimization, name)
+    
     def get_stage_name(self) -> str:
         return "clustering_analysis"
 
+def _item_ids(metadata: Sequence) -> List[Any]:
+    """每项的ID（列式元数据直接取ID列，不构建逐行字典）"""
+    if isinstance(metadata, ColumnarMetadata) and 'id' in metadata.columns:
+        return metadata.columns['id']
+    return [row.get('id', i) for i, row in enumerate(metadata)]
+
+
 class ContentAnalysisStage(ProcessingStage):
     """内容分析和结果构建阶段"""
     
-    def __init__(self, config: Optional[ContentAnalysisConfig] = None):
+    def __init__(self, config: Optional[ContentAnalysisConfig] = None, response_mode: str = 'full'):
         self.config = config or ContentAnalysisConfig()
+        self.response_mode = response_mode
     
     async def process(self, data: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
-        """分析内容并构建最终结果"""
+        """分析内容并构建最终结果
+
+        结果中的模型均用 model_construct 构建（字段来自已校验的请求与聚类结果，无需再次校验），
+        标签与降维坐标保持为NumPy数组，由 FastJSONResponse 直接序列化。
+        """
+        if self.response_mode == 'compact':
+            return self._build_compact_result(data, context)
+        
         if not self.config.enabled:
             # 跳过内容分析，直接构建基础结果
             return self._build_basic_result(data, context)
@@ -371,16 +652,10 @@ class ContentAnalysisStage(ProcessingStage):
         clusters = self._build_cluster_info(data)
         
         # 构建统计信息
-        stats = ClusteringStats(**data['clustering_stats'])
+        stats = ClusteringStats.model_construct(**data['clustering_stats'])
         
         # 构建优化结果
-        opt_result = OptimizationResult(
-            used=data['optimization']['used'],
-            best_params=data['optimization'].get('best_params'),
-            best_score=data['optimization'].get('best_dbcv_score'),
-            search_space_size=None,  # 可以从优化过程中获取
-            evaluated_combinations=None
-        )
+        opt_result = self._build_optimization_result(data)
         
         # 构建最终响应
         result = {
@@ -390,29 +665,34 @@ class ContentAnalysisStage(ProcessingStage):
             'config_used': data['config_used'],
             'reduced_embeddings': data.get('reduced_embeddings'),
             'processing_time': context.get('total_processing_time'),
-            'model_info': data.get('items_info')
+            'model_info': data.get('items_info'),
+            'model_id': data.get('model_id')
         }
         
         return result
     
     def _build_cluster_info(self, data: Dict[str, Any]) -> List[ClusterInfo]:
         """构建聚类信息列表"""
-        cluster_labels = data['cluster_labels']
+        cluster_labels = np.asarray(data['cluster_labels'])
         texts = data['texts']
         metadata = data['metadata']
         cluster_content = data.get('cluster_content', {})
-        reduced_embeddings = data.get('reduced_embeddings', [])
+        reduced_embeddings = data.get('reduced_embeddings')
+        # 已移除异常点时，标签的第 i 项对应原始输入的第 item_indices[i] 项
+        item_indices = data.get('item_indices')
         
         clusters = []
-        unique_labels = set(cluster_labels)
+        # 按标签排序一次得到每个簇的项目索引（替代逐簇扫描全部标签）
+        order = np.argsort(cluster_labels, kind='stable')
+        unique_labels, starts = np.unique(cluster_labels[order], return_index=True)
         
-        for cluster_id in unique_labels:
-            # 获取属于此聚类的项目索引
-            indices = [i for i, label in enumerate(cluster_labels) if label == cluster_id]
+        for cluster_id, members in zip(unique_labels.tolist(), np.split(order, starts[1:])):
+            indices = members.tolist()
             
             # 构建项目列表
             cluster_items = []
-            for idx in indices:
+            for position in indices:
+                idx = int(item_indices[position]) if item_indices is not None else position
                 item = {
                     'index': idx,
                     'text': texts[idx] if idx < len(texts) else '',
@@ -422,14 +702,13 @@ class ContentAnalysisStage(ProcessingStage):
             
             # 计算中心点（如果有降维数据）
             centroid = None
-            if reduced_embeddings and indices:
-                cluster_points = np.array([reduced_embeddings[i] for i in indices])
-                centroid = np.mean(cluster_points, axis=0).tolist()
+            if reduced_embeddings is not None and len(reduced_embeddings) and indices:
+                centroid = np.asarray(reduced_embeddings)[members].mean(axis=0)
             
             # 获取代表性内容
             representative_content = cluster_content.get(cluster_id, [])[:self.config.top_n_per_cluster]
             
-            cluster_info = ClusterInfo(
+            cluster_info = ClusterInfo.model_construct(
                 cluster_id=cluster_id,
                 size=len(indices),
                 items=cluster_items,
@@ -443,18 +722,77 @@ class ContentAnalysisStage(ProcessingStage):
         
         return sorted(clusters, key=lambda x: x.size, reverse=True)
     
+    def _build_compact_result(self, data: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+        """构建精简结果：ID/标签/归属强度并列数组与簇摘要，不构建逐项的文本、元数据与向量"""
+        cluster_labels = np.asarray(data['cluster_labels'])
+        strengths = np.asarray(data['membership_strengths'])
+        reduced_embeddings = data.get('reduced_embeddings')
+        cluster_content = data.get('cluster_content', {}) if self.config.enabled else {}
+        
+        ids = _item_ids(data['metadata'])
+        if data.get('item_indices') is not None:
+            # 已移除异常点：只保留仍在结果中的项目
+            ids = [ids[i] for i in data['item_indices'].tolist()]
+        
+        # 按标签排序一次，分段求和得到每个簇的大小、平均归属强度与中心点
+        order = np.argsort(cluster_labels, kind='stable')
+        unique_labels, starts, sizes = np.unique(cluster_labels[order], return_index=True, return_counts=True)
+        mean_membership = np.add.reduceat(strengths[order], starts) / sizes if len(order) else np.empty(0)
+        centroids = None
+        if reduced_embeddings is not None and len(reduced_embeddings):
+            reduced = np.asarray(reduced_embeddings)
+            centroids = np.add.reduceat(reduced[order], starts, axis=0) / sizes[:, None]
+        
+        clusters = []
+        for position in np.argsort(-sizes, kind='stable').tolist():
+            cluster_id = int(unique_labels[position])
+            clusters.append(CompactClusterSummary.model_construct(
+                cluster_id=cluster_id,
+                size=int(sizes[position]),
+                mean_membership=float(mean_membership[position]),
+                centroid=centroids[position] if centroids is not None else None,
+                representative_content=cluster_content.get(cluster_id, [])[:self.config.top_n_per_cluster]
+            ))
+        
+        return {
+            'ids': ids,
+            'cluster_labels': cluster_labels,
+            'membership_strengths': strengths,
+            'clusters': clusters,
+            'clustering_stats': ClusteringStats.model_construct(**data['clustering_stats']),
+            'optimization_result': self._build_optimization_result(data),
+            'config_used': data['config_used'],
+            'processing_time': context.get('total_processing_time'),
+            'model_info': data.get('items_info'),
+            'model_id': data.get('model_id')
+        }
+    
+    def _build_optimization_result(self, data: Dict[str, Any]) -> OptimizationResult:
+        """构建优化结果（含搜索空间与实际评估数）"""
+        optimization = data['optimization']
+        return OptimizationResult.model_construct(
+            used=optimization['used'],
+            best_params=optimization.get('best_params'),
+            best_score=optimization.get('best_dbcv_score'),
+            search_space_size=optimization.get('search_space_size'),
+            evaluated_combinations=optimization.get('evaluated_combinations'),
+            search_strategy=optimization.get('search_strategy'),
+            stopped_early=optimization.get('stopped_early'),
+            scorer=optimization.get('scorer'),
+            final_scorer=optimization.get('final_scorer'),
+            reranked_candidates=optimization.get('reranked_candidates'),
+            scoring_time=optimization.get('scoring_seconds')
+        )
+    
     def _build_basic_result(self, data: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """构建基础结果（跳过详细内容分析）"""
         # 简化版本，适用于高性能场景
         return {
-            'clustering_stats': ClusteringStats(**data['clustering_stats']),
-            'optimization_result': OptimizationResult(
-                used=data['optimization']['used'],
-                best_params=data['optimization'].get('best_params'),
-                best_score=data['optimization'].get('best_dbcv_score')
-            ),
+            'clustering_stats': ClusteringStats.model_construct(**data['clustering_stats']),
+            'optimization_result': self._build_optimization_result(data),
             'config_used': data['config_used'],
-            'processing_time': context.get('total_processing_time')
+            'processing_time': context.get('total_processing_time'),
+            'model_id': data.get('model_id')
         }
     
     def get_stage_name(self) -> str:
@@ -472,25 +810,29 @@ class MLPipelineFactory:
         model_components,
         config: Optional[BaseClusteringConfig] = None,
         optimization: Optional[OptimizationConfig] = None,
-        content_analysis: Optional[ContentAnalysisConfig] = None
+        content_analysis: Optional[ContentAnalysisConfig] = None,
+        response_mode: str = 'full'
     ) -> MLPipeline:
         """创建文本聚类管道"""
         return (MLPipeline()
                 .add_stage(DataExtractionStage(model_components))
+                .add_stage(DeduplicationStage(config))
                 .add_stage(ClusteringStage(config, optimization))
-                .add_stage(ContentAnalysisStage(content_analysis)))
+                .add_stage(ContentAnalysisStage(content_analysis, response_mode)))
     
     @staticmethod
     def create_vector_clustering_pipeline(
         config: Optional[BaseClusteringConfig] = None,
         optimization: Optional[OptimizationConfig] = None,
-        content_analysis: Optional[ContentAnalysisConfig] = None
+        content_analysis: Optional[ContentAnalysisConfig] = None,
+        response_mode: str = 'full'
     ) -> MLPipeline:
         """创建向量聚类管道"""
         return (MLPipeline()
                 .add_stage(DataExtractionStage())  # 不需要model_components
+                .add_stage(DeduplicationStage(config))
                 .add_stage(ClusteringStage(config, optimization))
-                .add_stage(ContentAnalysisStage(content_analysis)))
+                .add_stage(ContentAnalysisStage(content_analysis, response_mode)))
     
     @staticmethod
     def create_fast_clustering_pipeline(
@@ -500,6 +842,7 @@ class MLPipelineFactory:
         content_config = ContentAnalysisConfig(enabled=False)
         return (MLPipeline()
                 .add_stage(DataExtractionStage())
+                .add_stage(DeduplicationStage(config))
                 .add_stage(ClusteringStage(config, None))
                 .add_stage(ContentAnalysisStage(content_config)))
 
@@ -513,18 +856,22 @@ async def process_clustering_request(
     optimization: Optional[OptimizationConfig] = None,
     content_analysis: Optional[ContentAnalysisConfig] = None,
     model_components=None,
-    data_type: str = 'auto'
+    data_type: str = 'auto',
+    response_mode: str = 'full'
 ) -> Dict[str, Any]:
-    """统一的聚类处理函数 - 替代所有端点中的重复逻辑"""
+    """统一的聚类处理函数 - 替代所有端点中的重复逻辑
+
+    response_mode='compact' 时返回 CompactClusteringResponse 所需的字段（见 ContentAnalysisStage）
+    """
     
     # 选择合适的管道
     if data_type in ['texts', 'text_item', 'auto'] and model_components:
         pipeline = MLPipelineFactory.create_text_clustering_pipeline(
-            model_components, config, optimization, content_analysis
+            model_components, config, optimization, content_analysis, response_mode
         )
     else:
         pipeline = MLPipelineFactory.create_vector_clustering_pipeline(
-            config, optimization, content_analysis
+            config, optimization, content_analysis, response_mode
         )
     
     # 准备输入数据
@@ -0,0 +1,50 @@
+"""
+Meridian ML Service - 快速JSON响应
+聚类端点的响应用 model_construct 构建（不重复校验），由 orjson 直接序列化NumPy数组与模型字段
+"""
+
+import json
+from typing import Any
+
+import numpy as np
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _default(obj: Any) -> Any:
+    """orjson/json 无法原生处理的类型：Pydantic模型按字段展开，NumPy数组与标量转为Python值"""
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"无法序列化类型: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为JSON字节；float32数组按float32最短表示输出，NaN/Inf输出为null（仅orjson）"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(
+            content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """跳过 response_model 校验的JSON响应
+
+    内容可以是用 model_construct 构建的Pydantic模型（含嵌套模型）、字典，以及其中的NumPy数组。
+    未安装 orjson 时回退到标准库 json（结果相同，速度较慢）。
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
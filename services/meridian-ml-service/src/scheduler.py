@@ -0,0 +1,168 @@
+"""
+嵌入请求动态微批处理调度器
+将并发 /embeddings 请求的文本合并为一次前向推理，再按请求切片返回
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+
+from .embeddings import ModelComponents, compute_embeddings
+from .executors import run_inference
+
+
+@dataclass
+class _PendingRequest:
+    """排队中的单个请求"""
+    texts: List[str]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class EmbeddingBatchScheduler:
+    """跨请求的异步微批处理调度器
+
+    排队文本数达到 max_batch_size，或最早的请求已等待 max_wait_ms 时触发一次推理。
+    单个请求不会被拆分；超过 max_batch_size 的请求单独成批。
+    """
+
+    def __init__(
+        self,
+        model_components: ModelComponents,
+        max_batch_size: int = 256,
+        max_wait_ms: float = 10.0,
+    ):
+        self.model_components = model_components
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._queue: Deque[_PendingRequest] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._pending_texts = 0
+
+        # 统计信息
+        self._batches = 0
+        self._requests = 0
+        self._texts = 0
+        self._fill_ratio_sum = 0.0
+        self._wait_ms_sum = 0.0
+        self._wait_ms_max = 0.0
+        self._retried_requests = 0
+
+    async def submit(self, texts: List[str]) -> np.ndarray:
+        """提交一组文本，等待所在批次完成后返回对应的嵌入向量"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append(_PendingRequest(texts=texts, future=future))
+        self._pending_texts += len(texts)
+        self._wakeup.set()
+        return await future
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        """调度循环：收集请求 -> 触发条件满足 -> 单次推理 -> 分发结果"""
+        while True:
+            while not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            deadline = self._queue[0].enqueued_at + self.max_wait_ms / 1000
+            while self._pending_texts < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+            await self._flush(self._take_batch())
+
+    def _take_batch(self) -> List[_PendingRequest]:
+        """从队首取出不超过 max_batch_size 个文本的完整请求（至少一个）"""
+        batch: List[_PendingRequest] = []
+        n_texts = 0
+        while self._queue:
+            request = self._queue[0]
+            if batch and n_texts + len(request.texts) > self.max_batch_size:
+                break
+            self._queue.popleft()
+            batch.append(request)
+            n_texts += len(request.texts)
+        self._pending_texts -= n_texts
+        return batch
+
+    async def _flush(self, batch: List[_PendingRequest]) -> None:
+        flushed_at = time.perf_counter()
+        texts = [text for request in batch for text in request.texts]
+
+        try:
+            embeddings = await run_inference(compute_embeddings, texts, self.model_components)
+        except Exception as e:
+            print(f"[Scheduler] 批次推理失败 ({len(batch)} 个请求): {e}")
+            if len(batch) == 1:
+                if not batch[0].future.done():
+                    batch[0].future.set_exception(e)
+                return
+            # 合并批次失败时逐个请求重试，只让真正出错的请求收到异常
+            for request in batch:
+                await self._flush_single(request)
+            return
+
+        offset = 0
+        for request in batch:
+            end = offset + len(request.texts)
+            if not request.future.done():
+                request.future.set_result(embeddings[offset:end])
+            offset = end
+
+            wait_ms = (flushed_at - request.enqueued_at) * 1000
+            self._wait_ms_sum += wait_ms
+            self._wait_ms_max = max(self._wait_ms_max, wait_ms)
+
+        self._batches += 1
+        self._requests += len(batch)
+        self._texts += len(texts)
+        self._fill_ratio_sum += min(1.0, len(texts) / self.max_batch_size)
+
+    async def _flush_single(self, request: _PendingRequest) -> None:
+        """单独为一个请求推理（合并批次失败后的重试路径）"""
+        if request.future.done():
+            return
+        self._retried_requests += 1
+        try:
+            embeddings = await run_inference(compute_embeddings, request.texts, self.model_components)
+        except Exception as e:
+            print(f"[Scheduler] 单请求重试失败 ({len(request.texts)} 条文本): {e}")
+            if not request.future.done():
+                request.future.set_exception(e)
+            return
+        if not request.future.done():
+            request.future.set_result(embeddings)
+
+    def stats(self) -> Dict[str, Any]:
+        """调度器指标：队列深度、批次填充率、等待时间"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queue_depth_requests": len(self._queue),
+            "queue_depth_texts": self._pending_texts,
+            "batches": self._batches,
+            "requests": self._requests,
+            "texts": self._texts,
+            "avg_requests_per_batch": self._requests / self._batches if self._batches else 0.0,
+            "avg_batch_fill_ratio": self._fill_ratio_sum / self._batches if self._batches else 0.0,
+            "avg_wait_ms": self._wait_ms_sum / self._requests if self._requests else 0.0,
+            "max_wait_ms_observed": self._wait_ms_max,
+            "retried_requests": self._retried_requests,
+        }
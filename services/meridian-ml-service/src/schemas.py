@@ -13,6 +13,13 @@ from pydantic import BaseModel, Field
 class BaseClusteringConfig(BaseModel):
     """核心聚类配置"""
     
+    # 速度/质量预设
+    preset: Optional[Literal['fast', 'balanced', 'best']] = Field(
+        default=None,
+        description="速度/质量预设: fast=交互式低延迟, balanced=常规, best=离线批处理最高质量；"
+                    "决定UMAP轮数、NN-descent精度、预降维、评分器与搜索策略，显式设置的字段优先"
+    )
+    
     # UMAP参数
     umap_n_components: int = Field(default=10, ge=2, le=50, description="UMAP降维目标维度")
     umap_n_neighbors: int = Field(default=15, ge=2, le=100, description="UMAP邻居数量")
@@ -25,9 +32,40 @@ class BaseClusteringConfig(BaseModel):
     hdbscan_metric: Literal['euclidean', 'manhattan', 'chebyshev'] = Field(default='euclidean', description="HDBSCAN距离度量")
     hdbscan_cluster_selection_epsilon: float = Field(default=0.0, ge=0.0, description="HDBSCAN epsilon参数")
     
+    # UMAP前的线性预降维
+    pre_reduction: Literal['none', 'pca', 'random_projection'] = Field(
+        default='none',
+        description="UMAP前的线性预降维: none=不预降维, pca=随机化PCA（报告保留方差）, random_projection=稀疏随机投影"
+    )
+    pre_reduction_dim: int = Field(default=50, ge=2, le=1024, description="预降维目标维度")
+    
     # 预处理选项
     normalize_embeddings: bool = Field(default=True, description="是否L2归一化嵌入向量")
     remove_outliers: bool = Field(default=False, description="是否移除异常点")
+    
+    # 模型保存
+    persist_model: bool = Field(
+        default=False, description="是否保存拟合的降维器与聚类器，返回的 model_id 可用于 /clustering/assign 增量分配"
+    )
+    
+    # 执行模式
+    execution_mode: Optional[Literal['reproducible', 'parallel']] = Field(
+        default=None,
+        description="执行模式: reproducible=固定随机种子单线程（结果可复现）, "
+                    "parallel=UMAP与HDBSCAN使用全部CPU核（结果不保证逐位一致）；为空时使用服务配置"
+    )
+    
+    # 大规模语料的两级分区聚类
+    partitioning: Literal['none', 'auto', 'kmeans'] = Field(
+        default='none',
+        description="分区聚类: none=整体聚类, kmeans=k-means粗分区后逐分区UMAP+HDBSCAN再合并跨分区的簇, "
+                    "auto=样本数超过服务阈值时使用kmeans"
+    )
+    partition_size: int = Field(default=20000, ge=1000, description="分区聚类时每个分区的目标样本数")
+    
+    # 近重复折叠
+    deduplicate: bool = Field(default=False, description="是否在聚类前折叠近重复向量（只聚类代表，标签展开到全部成员）")
+    dedup_threshold: float = Field(default=0.97, ge=0.8, le=1.0, description="近重复的余弦相似度阈值")
 
 class OptimizationConfig(BaseModel):
     """参数优化配置"""
@@ -40,8 +78,19 @@ class OptimizationConfig(BaseModel):
     hdbscan_epsilon_range: List[float] = Field(default=[0.1, 0.2, 0.3], description="HDBSCAN epsilon搜索范围")
     
     # 优化控制
-    max_combinations: int = Field(default=24, description="最大参数组合数")
-    early_stopping_patience: int = Field(default=5, description="早停耐心值")
+    search_strategy: Literal['exhaustive', 'random', 'successive_halving', 'early_stopping'] = Field(
+        default='random',
+        description="搜索策略: exhaustive=完整网格, random=随机抽取max_combinations个组合, "
+                    "successive_halving=子样本上逐轮淘汰, early_stopping=DBCV连续无提升时停止"
+    )
+    max_combinations: int = Field(default=24, ge=1, description="最大参数组合数（exhaustive策略不受限制）")
+    early_stopping_patience: int = Field(default=5, ge=1, description="早停耐心值（early_stopping策略）")
+    scorer: Literal['dbcv', 'relative_validity', 'dbcv_subsample'] = Field(
+        default='relative_validity',
+        description="候选排序评分器: dbcv=精确DBCV, relative_validity=HDBSCAN基于最小生成树的近似, "
+                    "dbcv_subsample=固定种子子采样DBCV"
+    )
+    rerank_top_k: int = Field(default=3, ge=0, le=20, description="用精确DBCV重排的前k名候选（0为不重排）")
 
 class ContentAnalysisConfig(BaseModel):
     """内容分析配置"""
@@ -149,6 +198,66 @@ class EmbeddingRequest(BaseModel):
     texts: List[str] = Field(..., description="文本列表")
     model_name: Optional[str] = Field(default=None, description="指定嵌入模型")
     normalize: bool = Field(default=True, description="是否归一化")
+    encoding: Literal['json', 'base64', 'npy'] = Field(default='json', description="输出编码：JSON浮点数组、base64缓冲区（精简JSON封装）或 .npy 二进制（也可用 Accept: application/x-npy 指定）")
+    dtype: Literal['float32', 'float16', 'int8'] = Field(default='float32', description="base64/npy 输出的分量数据类型（int8按整体最大绝对值缩放）")
+
+class ClusterAssignRequest(BaseModel):
+    """增量簇分配请求"""
+    model_id: str = Field(..., description="聚类时返回的模型ID")
+    embeddings: List[List[float]] = Field(..., description="待分配的嵌入向量（维度与建模数据一致）")
+    return_reduced_embeddings: bool = Field(default=False, description="是否返回降维后向量")
+
+class ClusterAssignResponse(BaseModel):
+    """增量簇分配响应"""
+    model_id: str = Field(..., description="使用的模型ID")
+    cluster_labels: List[int] = Field(..., description="簇标签（-1表示异常点）")
+    membership_strengths: List[float] = Field(..., description="簇归属强度（0-1）")
+    n_outliers: int = Field(..., description="异常点数量")
+    reduced_embeddings: Optional[List[List[float]]] = Field(default=None, description="降维后向量")
+    processing_time: Optional[float] = Field(default=None, description="处理时间（秒）")
+
+class StreamSessionCreateRequest(BaseModel):
+    """流式聚类会话创建请求"""
+    model_id: Optional[str] = Field(default=None, description="已保存的聚类模型ID；为空时用最初的文章拟合新模型")
+    config: Optional[BaseClusteringConfig] = Field(default=None, description="拟合初始模型使用的聚类配置（仅model_id为空时生效）")
+    bootstrap_size: int = Field(default=200, ge=10, description="拟合初始模型前累计的文章数")
+    consolidate_every: int = Field(default=200, ge=1, description="每新增多少篇文章重新整合一次宏观簇")
+    max_micro_clusters: int = Field(default=500, ge=10, le=10000, description="微簇数量上限")
+    radius_factor: float = Field(default=2.0, gt=0, description="微簇吸收半径相对训练布局最近邻距离中位数的倍数")
+    min_micro_cluster_size: int = Field(default=2, ge=1, description="参与整合的微簇最少文章数")
+    min_cluster_size: int = Field(default=5, ge=2, le=100, description="整合时的最小簇大小（以文章计）")
+
+class StreamItem(BaseModel):
+    """流式聚类的单篇文章"""
+    id: Union[str, int] = Field(..., description="文章ID")
+    embedding: List[float] = Field(..., description="嵌入向量")
+
+class StreamUpdateRequest(BaseModel):
+    """向流式会话追加文章"""
+    items: List[StreamItem] = Field(..., description="新到达的文章")
+
+class StreamUpdateResponse(BaseModel):
+    """流式会话追加响应"""
+    session_id: str = Field(..., description="会话ID")
+    ready: bool = Field(..., description="会话是否已有聚类模型（否则文章仍在累计中）")
+    cluster_labels: Optional[List[int]] = Field(default=None, description="本批文章当前的簇标签（-1表示异常点）")
+    consolidated: bool = Field(..., description="本次更新是否触发了宏观簇整合")
+    processing_time: Optional[float] = Field(default=None, description="处理时间（秒）")
+
+class StreamSessionState(BaseModel):
+    """流式会话状态与当前簇成员"""
+    session_id: str = Field(..., description="会话ID")
+    ready: bool = Field(..., description="会话是否已有聚类模型")
+    model_id: Optional[str] = Field(default=None, description="使用的聚类模型ID")
+    n_items: int = Field(..., description="已聚类的文章数")
+    n_pending: int = Field(..., description="等待拟合初始模型的文章数")
+    n_micro_clusters: int = Field(..., description="微簇数量")
+    n_clusters: int = Field(..., description="宏观簇数量")
+    n_updates: int = Field(..., description="追加请求次数")
+    n_consolidations: int = Field(..., description="整合次数")
+    update_seconds: float = Field(..., description="追加累计耗时（秒）")
+    consolidation_seconds: float = Field(..., description="整合累计耗时（秒）")
+    clusters: Optional[Dict[int, List[Union[str, int]]]] = Field(default=None, description="簇标签 -> 文章ID（-1为异常点）")
 
 class EmbeddingResponse(BaseModel):
     """嵌入生成响应"""
@@ -178,11 +287,40 @@ class FlexibleClusteringRequest(BaseModel):
     # 输出控制
     return_embeddings: bool = Field(default=False, description="是否返回原始嵌入向量")
     return_reduced_embeddings: bool = Field(default=True, description="是否返回降维后向量")
+    response_mode: Literal['full', 'compact'] = Field(default='full', description="响应模式：full 为完整簇信息；compact 只返回ID/标签/归属强度数组与簇摘要")
     
     # AI Worker 兼容选项
     preserve_original_format: bool = Field(default=True, description="保持原始数据格式在响应中")
     include_ai_worker_metadata: bool = Field(default=True, description="包含AI Worker兼容的元数据")
 
+class EmbeddingBuffer(BaseModel):
+    """二进制嵌入缓冲区（小端字节序，按行连续存放）"""
+    data: str = Field(..., description="base64编码的嵌入字节")
+    shape: List[int] = Field(..., min_length=2, max_length=2, description="矩阵形状 [n, dim]")
+    dtype: Literal['float32', 'float16', 'int8'] = Field(default='float32', description="分量数据类型")
+    scale: Optional[float] = Field(default=None, gt=0, description="int8反量化系数（x = q * scale），默认1/127")
+
+class EmbeddingBinaryResponse(BaseModel):
+    """嵌入生成响应（base64缓冲区）"""
+    embeddings: EmbeddingBuffer = Field(..., description="嵌入矩阵缓冲区（int8时附带scale）")
+    model_name: str = Field(..., description="使用的模型名称")
+    dimensions: int = Field(..., description="嵌入维度")
+    processing_time: Optional[float] = Field(default=None, description="处理时间")
+
+class ColumnarClusteringRequest(BaseModel):
+    """列式聚类请求 - 嵌入以单个二进制缓冲区传输"""
+    ids: List[Union[int, str]] = Field(..., min_length=1, description="文章ID，顺序与嵌入矩阵的行一致")
+    embeddings: EmbeddingBuffer = Field(..., description="嵌入矩阵缓冲区")
+    texts: Optional[List[str]] = Field(default=None, description="每项的文本（如标题），为空时使用 'Article {id}'")
+    metadata: Optional[Dict[str, List[Any]]] = Field(default=None, description="元数据列：列名 -> 与ids等长的值列表")
+    config: Optional[BaseClusteringConfig] = Field(default=None, description="聚类算法配置")
+    optimization: Optional[OptimizationConfig] = Field(default=None, description="参数优化配置")
+    content_analysis: Optional[ContentAnalysisConfig] = Field(default=None, description="内容分析配置")
+    
+    # 输出控制
+    return_reduced_embeddings: bool = Field(default=True, description="是否返回降维后向量")
+    response_mode: Literal['full', 'compact'] = Field(default='full', description="响应模式：full 为完整簇信息；compact 只返回ID/标签/归属强度数组与簇摘要")
+
 # ============================================================================
 # 响应模型
 # ============================================================================
@@ -195,6 +333,10 @@ class ClusteringStats(BaseModel):
     outlier_ratio: float = Field(..., description="异常点比例")
     cluster_sizes: Dict[int, int] = Field(..., description="每个簇的大小")
     dbcv_score: Optional[float] = Field(default=None, description="DBCV质量分数")
+    pre_reduction_explained_variance: Optional[float] = Field(default=None, description="PCA预降维保留的方差比例")
+    n_partitions: Optional[int] = Field(default=None, description="分区聚类的分区数")
+    partition_merges: Optional[int] = Field(default=None, description="分区聚类中跨分区合并的簇对数")
+    duplicates_collapsed: Optional[int] = Field(default=None, description="近重复折叠中并入代表的向量数")
     silhouette_score: Optional[float] = Field(default=None, description="轮廓系数")
 
 class OptimizationResult(BaseModel):
@@ -204,6 +346,12 @@ class OptimizationResult(BaseModel):
     best_score: Optional[float] = Field(default=None, description="最佳质量分数")
     search_space_size: Optional[int] = Field(default=None, description="搜索空间大小")
     evaluated_combinations: Optional[int] = Field(default=None, description="实际评估的组合数")
+    search_strategy: Optional[str] = Field(default=None, description="使用的搜索策略")
+    stopped_early: Optional[bool] = Field(default=None, description="是否因早停提前结束")
+    scorer: Optional[str] = Field(default=None, description="候选排序使用的评分器")
+    final_scorer: Optional[str] = Field(default=None, description="最佳分数对应的评分器")
+    reranked_candidates: Optional[int] = Field(default=None, description="用精确DBCV重排的候选数")
+    scoring_time: Optional[float] = Field(default=None, description="评分累计耗时（秒）")
 
 class ClusterInfo(BaseModel):
     """聚类信息"""
@@ -227,6 +375,28 @@ class BaseClusteringResponse(BaseModel):
     reduced_embeddings: Optional[List[List[float]]] = Field(default=None, description="降维后向量")
     processing_time: Optional[float] = Field(default=None, description="处理时间（秒）")
     model_info: Optional[Dict[str, Any]] = Field(default=None, description="模型信息")
+    model_id: Optional[str] = Field(default=None, description="已保存的聚类模型ID（persist_model=true时）")
+
+class CompactClusterSummary(BaseModel):
+    """簇摘要（compact 响应模式）"""
+    cluster_id: int = Field(..., description="聚类ID (-1表示异常点)")
+    size: int = Field(..., description="聚类大小")
+    mean_membership: float = Field(..., description="簇内平均归属强度")
+    centroid: Optional[List[float]] = Field(default=None, description="聚类中心点（降维空间）")
+    representative_content: List[str] = Field(default_factory=list, description="代表性内容")
+
+class CompactClusteringResponse(BaseModel):
+    """精简聚类响应：按项目对齐的并列数组 + 簇摘要，不含逐项文本、元数据与向量"""
+    ids: List[Union[int, str]] = Field(..., description="项目ID（与 cluster_labels、membership_strengths 一一对应）")
+    cluster_labels: List[int] = Field(..., description="簇标签（-1表示异常点）")
+    membership_strengths: List[float] = Field(..., description="HDBSCAN簇归属强度（0-1，异常点为0）")
+    clusters: List[CompactClusterSummary] = Field(..., description="簇摘要（按大小降序）")
+    clustering_stats: ClusteringStats = Field(..., description="聚类统计信息")
+    optimization_result: OptimizationResult = Field(..., description="优化结果")
+    config_used: Dict[str, Any] = Field(..., description="实际使用的配置参数")
+    processing_time: Optional[float] = Field(default=None, description="处理时间（秒）")
+    model_info: Optional[Dict[str, Any]] = Field(default=None, description="模型信息")
+    model_id: Optional[str] = Field(default=None, description="已保存的聚类模型ID（persist_model=true时）")
 
 # ============================================================================
 # 配置转换工具函数
@@ -253,6 +423,17 @@ def convert_to_internal_config(api_config: Optional[BaseClusteringConfig]) -> Di
         # 预处理配置
         "normalize_embeddings": api_config.normalize_embeddings,
         "remove_outliers": api_config.remove_outliers,
+        
+        # 预降维（使用预设时逐个字段判断：未显式设置的由预设决定）
+        **{
+            field: getattr(api_config, field)
+            for field in ("pre_reduction", "pre_reduction_dim")
+            if api_config.preset is None or field in api_config.model_fields_set
+        },
+        "preset": api_config.preset,
+        
+        # 执行模式（为空时由调用方使用服务配置）
+        **({"execution_mode": api_config.execution_mode} if api_config.execution_mode else {}),
     }
 
 def build_optimization_grid(config: OptimizationConfig) -> Dict[str, List[Any]]:
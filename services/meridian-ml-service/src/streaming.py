@@ -0,0 +1,445 @@
+"""
+流式聚类会话
+文章分小批到达：先用已保存的聚类模型映射到降维空间，再增量更新微簇（聚类特征向量），
+定期只在微簇中心上重新运行HDBSCAN得到宏观簇；每次更新的开销与窗口总大小无关
+"""
+
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from .clustering import (
+    ClusteringConfig,
+    _exact_knn_blas,
+    cluster_embeddings,
+    transform_embeddings,
+    validate_clustering_availability,
+)
+from .config import settings
+from .model_store import ClusterModel, get_model_store
+
+try:
+    import hdbscan
+except ImportError:
+    pass
+
+logger = logging.getLogger(__name__)
+
+ItemId = Union[str, int]
+
+_RADIUS_SAMPLE_SIZE = 2000  # 估计基准半径时最多使用的训练布局点数
+
+
+class SessionNotFoundError(KeyError):
+    """会话ID不存在（或已过期）"""
+
+
+@dataclass
+class StreamingConfig:
+    """流式会话参数"""
+    bootstrap_size: int = 200  # 未指定模型时，累计到该数量后拟合模型
+    consolidate_every: int = 200  # 每新增多少篇文章重新整合一次宏观簇
+    max_micro_clusters: int = 500  # 微簇数量上限，超出时合并最近的两个
+    radius_factor: float = 2.0  # 吸收阈值 = radius_factor × 基准半径（训练布局最近邻距离中位数）
+    min_micro_cluster_size: int = 2  # 参与整合的微簇最少文章数，更小的微簇视为异常点
+    min_cluster_size: int = 5  # 整合时HDBSCAN的最小簇大小（以文章计，微簇按文章数加权）
+    transform_batch_size: int = 1024
+
+
+class MicroClusterSet:
+    """降维空间中的微簇集合
+
+    每个微簇保存聚类特征 (文章数 n, 线性和 LS, 平方范数和 SS) 和成员文章ID；
+    新点就近吸收或新建微簇，数量超过上限时合并最近的两个微簇。
+    每个点的插入开销为 O(微簇数 × 维度)，与已处理文章总数无关；
+    slot_of 记录每篇文章当前所在的微簇下标，合并时只更新被移动的成员。
+    """
+
+    def __init__(self, dim: int, capacity: int, absorb_radius: float):
+        self.dim = dim
+        self.capacity = max(2, capacity)
+        self.absorb_radius = absorb_radius
+        # 预分配 capacity + 1 行：新建微簇后再合并回上限
+        self.counts = np.zeros(self.capacity + 1, dtype=np.float64)
+        self.linear_sums = np.zeros((self.capacity + 1, dim), dtype=np.float64)
+        self.square_sums = np.zeros(self.capacity + 1, dtype=np.float64)
+        self.labels = np.full(self.capacity + 1, -1, dtype=np.int64)
+        self.members: List[List[ItemId]] = []
+        self.slot_of: Dict[ItemId, int] = {}
+        self.size = 0
+        self.merges = 0
+
+    def centers(self) -> np.ndarray:
+        return self.linear_sums[:self.size] / self.counts[:self.size, None]
+
+    def radii(self) -> np.ndarray:
+        """均方根半径"""
+        centers = self.centers()
+        variance = self.square_sums[:self.size] / self.counts[:self.size] - np.einsum('ij,ij->i', centers, centers)
+        return np.sqrt(np.maximum(variance, 0.0))
+
+    def insert(self, item_id: ItemId, point: np.ndarray, new_label: int = -1) -> int:
+        """插入一个点，返回所在微簇的下标；新建的微簇使用 new_label 作为宏观标签"""
+        if self.size:
+            centers = self.centers()
+            distances = np.sqrt(np.einsum('ij,ij->i', centers - point, centers - point))
+            nearest = int(np.argmin(distances))
+            threshold = max(self.absorb_radius, 2.0 * self.radii()[nearest])
+            if distances[nearest] <= threshold:
+                self.counts[nearest] += 1
+                self.linear_sums[nearest] += point
+                self.square_sums[nearest] += float(point @ point)
+                self.members[nearest].append(item_id)
+                self.slot_of[item_id] = nearest
+                return nearest
+
+        index = self.size
+        self.counts[index] = 1
+        self.linear_sums[index] = point
+        self.square_sums[index] = float(point @ point)
+        self.labels[index] = new_label
+        self.members.append([item_id])
+        self.slot_of[item_id] = index
+        self.size += 1
+        if self.size > self.capacity:
+            return self._merge_closest(index)
+        return index
+
+    def _merge_closest(self, tracked: int) -> int:
+        """合并中心最近的两个微簇（宏观标签取文章数多的一方），返回 tracked 合并后的下标"""
+        centers = self.centers()
+        sq_norms = np.einsum('ij,ij->i', centers, centers)
+        distances = sq_norms[:, None] + sq_norms[None, :] - 2.0 * centers @ centers.T
+        np.fill_diagonal(distances, np.inf)
+        first, second = sorted(np.unravel_index(int(np.argmin(distances)), distances.shape))
+
+        if self.counts[second] > self.counts[first]:
+            self.labels[first] = self.labels[second]
+        self.counts[first] += self.counts[second]
+        self.linear_sums[first] += self.linear_sums[second]
+        self.square_sums[first] += self.square_sums[second]
+        self.members[first].extend(self.members[second])
+        for member in self.members[second]:
+            self.slot_of[member] = first
+
+        # 用最后一个微簇填补 second 的位置
+        last = self.size - 1
+        if second != last:
+            self.counts[second] = self.counts[last]
+            self.linear_sums[second] = self.linear_sums[last]
+            self.square_sums[second] = self.square_sums[last]
+            self.labels[second] = self.labels[last]
+            self.members[second] = self.members[last]
+            for member in self.members[second]:
+                self.slot_of[member] = second
+        self.members.pop()
+        self.size -= 1
+        self.merges += 1
+
+        if tracked == second:
+            return first
+        if tracked == last:
+            return second
+        return tracked
+
+
+class StreamingSession:
+    """单个流式聚类会话（线程安全）"""
+
+    def __init__(
+        self,
+        session_id: str,
+        config: StreamingConfig,
+        clustering_config: Optional[ClusteringConfig] = None,
+        model_id: Optional[str] = None,
+    ):
+        self.session_id = session_id
+        self.config = config
+        self.clustering_config = clustering_config
+        self.model: Optional[ClusterModel] = None
+        self.micro_clusters: Optional[MicroClusterSet] = None
+        self._consolidator = None  # 给新微簇预测标签的HDBSCAN：首次整合前为模型自身的聚类器
+        self._pending_ids: List[ItemId] = []
+        self._pending_embeddings: List[np.ndarray] = []
+        self._since_consolidation = 0
+        self._lock = threading.Lock()
+
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.n_items = 0
+        self.n_updates = 0
+        self.n_consolidations = 0
+        self.update_seconds = 0.0
+        self.consolidation_seconds = 0.0
+
+        if model_id is not None:
+            self._attach_model(get_model_store().load(model_id))
+
+    @property
+    def ready(self) -> bool:
+        return self.micro_clusters is not None
+
+    def _attach_model(self, model: ClusterModel) -> None:
+        if model.reducer is None:
+            raise ValueError("模型没有UMAP降维器，无法用于流式聚类")
+        self.model = model
+        self._consolidator = model.clusterer
+        layout = np.asarray(model.reducer.embedding_, dtype=np.float32)
+        self.micro_clusters = MicroClusterSet(
+            layout.shape[1], self.config.max_micro_clusters,
+            self.config.radius_factor * _median_nn_distance(layout)
+        )
+
+    def add(self, item_ids: List[ItemId], embeddings: np.ndarray) -> Dict[str, Any]:
+        """加入一批文章，返回它们当前的宏观簇标签（未完成初始化时为None）
+
+        完成初始化的那一批会连同缓冲的文章一起插入微簇，但只返回本批文章的标签。
+        """
+        validate_clustering_availability()
+        with self._lock:
+            start = time.perf_counter()
+            self.last_used = time.time()
+            self.n_updates += 1
+            n_batch = len(item_ids)
+
+            if not self.ready:
+                embeddings = np.asarray(embeddings, dtype=np.float32)
+                if self._pending_embeddings and embeddings.shape[1] != self._pending_embeddings[0].shape[1]:
+                    raise ValueError(
+                        f"嵌入维度 {embeddings.shape[1]} 与已缓冲的文章 ({self._pending_embeddings[0].shape[1]}) 不一致"
+                    )
+                self._pending_ids.extend(item_ids)
+                self._pending_embeddings.append(embeddings)
+                if len(self._pending_ids) < self.config.bootstrap_size:
+                    self.update_seconds += time.perf_counter() - start
+                    return {"labels": None, "consolidated": False}
+                item_ids = self._pending_ids
+                embeddings = np.vstack(self._pending_embeddings)
+                try:
+                    self._bootstrap(embeddings)
+                except Exception as e:
+                    # 拟合失败（如文章不足）时文章已进入缓冲，按未初始化返回，下一批到达后重试
+                    logger.warning(f"会话 {self.session_id} 初始拟合失败，保留 {len(item_ids)} 篇缓冲文章: {e}")
+                    self.update_seconds += time.perf_counter() - start
+                    return {"labels": None, "consolidated": False}
+                self._pending_ids, self._pending_embeddings = [], []
+
+            merges_before = self.micro_clusters.merges
+            reduced = transform_embeddings(self.model, embeddings, self.config.transform_batch_size)
+            slots = self._insert(item_ids, reduced)
+            self.n_items += len(item_ids)
+            self._since_consolidation += len(item_ids)
+
+            consolidated = False
+            if self._since_consolidation >= self.config.consolidate_every:
+                self._consolidate()
+                consolidated = True
+            if self.micro_clusters.merges != merges_before:
+                slots = self._resolve(item_ids)
+            labels = [int(label) for label in self.micro_clusters.labels[slots[len(slots) - n_batch:]]]
+            self.update_seconds += time.perf_counter() - start
+            return {"labels": labels, "consolidated": consolidated}
+
+    def consolidate(self) -> bool:
+        """立即整合宏观簇，会话未初始化时返回False"""
+        with self._lock:
+            self.last_used = time.time()
+            if not self.ready:
+                return False
+            self._consolidate()
+            return True
+
+    def _bootstrap(self, embeddings: np.ndarray) -> None:
+        """用最初累计的文章拟合并保存模型"""
+        result = cluster_embeddings(embeddings, self.clustering_config, persist_model=True)
+        if result.get('model_id') is None:
+            raise ValueError("初始文章不足以拟合聚类模型")
+        self._attach_model(get_model_store().load(result['model_id']))
+
+    def _insert(self, item_ids: List[ItemId], reduced: np.ndarray) -> List[int]:
+        micro_clusters = self.micro_clusters
+        if self._consolidator is not None:
+            # 新建微簇的标签由模型或最近一次整合的HDBSCAN近似预测（同一降维空间）
+            new_labels, _ = hdbscan.approximate_predict(self._consolidator, reduced)
+        else:
+            new_labels = np.full(len(reduced), -1)
+        return [
+            micro_clusters.insert(item_id, point, int(label))
+            for item_id, point, label in zip(item_ids, reduced.astype(np.float64), new_labels)
+        ]
+
+    def _resolve(self, item_ids: List[ItemId]) -> List[int]:
+        """批内后续插入触发合并并移动了微簇时，按 slot_of 重新定位本批文章"""
+        slot_of = self.micro_clusters.slot_of
+        return [slot_of[item_id] for item_id in item_ids]
+
+    def _consolidate(self) -> None:
+        """在足够大的微簇中心上运行HDBSCAN，更新每个微簇的宏观标签
+
+        HDBSCAN不支持样本权重：每个微簇按其中心与均方根半径重采样 min(文章数, 2 × min_cluster_size)
+        个点（固定种子），使密集微簇保留权重、相互重叠的微簇连成一片；
+        输入点数不超过 微簇数 × 2 × min_cluster_size，与窗口大小无关。微簇标签取其采样点的多数标签。
+        """
+        start = time.perf_counter()
+        micro_clusters = self.micro_clusters
+        counts = micro_clusters.counts[:micro_clusters.size]
+        eligible = np.flatnonzero(counts >= self.config.min_micro_cluster_size)
+        labels = np.full(micro_clusters.size, -1, dtype=np.int64)
+
+        min_cluster_size = max(2, self.config.min_cluster_size)
+        weights = np.minimum(counts[eligible], 2 * min_cluster_size).astype(np.int64)
+        if weights.sum() > min_cluster_size:
+            # 单篇文章的微簇半径为0，按吸收半径的一半采样
+            radii = np.maximum(micro_clusters.radii()[eligible], micro_clusters.absorb_radius / 2)
+            owners = np.repeat(np.arange(len(eligible)), weights)
+            rng = np.random.default_rng(42)
+            samples = micro_clusters.centers()[eligible][owners] + rng.normal(
+                size=(len(owners), micro_clusters.dim)
+            ) * (radii[owners] / np.sqrt(micro_clusters.dim))[:, None]
+
+            clusterer = hdbscan.HDBSCAN(
+                min_cluster_size=min_cluster_size,
+                prediction_data=True,
+                core_dist_n_jobs=1,
+            )
+            sample_labels = clusterer.fit_predict(samples)
+            offsets = np.cumsum(weights) - weights
+            for position, index in enumerate(eligible):
+                owned = sample_labels[offsets[position]:offsets[position] + weights[position]]
+                values, votes = np.unique(owned, return_counts=True)
+                labels[index] = values[np.argmax(votes)]
+            self._consolidator = clusterer
+        elif len(eligible):
+            # 微簇太少时全部视为一个簇
+            labels[eligible] = 0
+            self._consolidator = None
+
+        micro_clusters.labels[:micro_clusters.size] = labels
+        self._since_consolidation = 0
+        self.n_consolidations += 1
+        self.consolidation_seconds += time.perf_counter() - start
+
+    def membership(self) -> Dict[int, List[ItemId]]:
+        """当前宏观簇成员（-1为异常点）"""
+        with self._lock:
+            self.last_used = time.time()
+            clusters: Dict[int, List[ItemId]] = {}
+            if self.micro_clusters is None:
+                if self._pending_ids:
+                    clusters[-1] = list(self._pending_ids)
+                return clusters
+            for index in range(self.micro_clusters.size):
+                label = int(self.micro_clusters.labels[index])
+                clusters.setdefault(label, []).extend(self.micro_clusters.members[index])
+            return clusters
+
+    def stats(self) -> Dict[str, Any]:
+        micro_clusters = self.micro_clusters
+        labels = micro_clusters.labels[:micro_clusters.size] if micro_clusters is not None else np.empty(0)
+        return {
+            "session_id": self.session_id,
+            "ready": self.ready,
+            "model_id": self.model.model_id if self.model is not None else None,
+            "n_items": self.n_items,
+            "n_pending": len(self._pending_ids),
+            "n_micro_clusters": micro_clusters.size if micro_clusters is not None else 0,
+            "n_clusters": int(len(set(labels.tolist()) - {-1})),
+            "n_updates": self.n_updates,
+            "n_consolidations": self.n_consolidations,
+            "update_seconds": self.update_seconds,
+            "consolidation_seconds": self.consolidation_seconds,
+            "created_at": self.created_at,
+            "last_used": self.last_used,
+        }
+
+
+def _median_nn_distance(layout: np.ndarray) -> float:
+    """训练布局中最近邻距离的中位数（最多抽样 _RADIUS_SAMPLE_SIZE 个点）"""
+    if len(layout) > _RADIUS_SAMPLE_SIZE:
+        rng = np.random.default_rng(42)
+        layout = layout[rng.choice(len(layout), _RADIUS_SAMPLE_SIZE, replace=False)]
+    _, distances = _exact_knn_blas(layout, 2, 'euclidean')
+    return float(np.median(distances[:, 1]))
+
+
+class StreamingSessionManager:
+    """会话注册表：超过 max_sessions 或闲置超过 ttl_seconds 的会话被淘汰"""
+
+    def __init__(self, max_sessions: int, ttl_seconds: float):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: Dict[str, StreamingSession] = {}
+        self._lock = threading.Lock()
+        self._evicted = 0
+
+    def create(
+        self,
+        config: StreamingConfig,
+        clustering_config: Optional[ClusteringConfig] = None,
+        model_id: Optional[str] = None,
+    ) -> StreamingSession:
+        session = StreamingSession(uuid.uuid4().hex, config, clustering_config, model_id)
+        with self._lock:
+            self._expire()
+            while len(self._sessions) >= self.max_sessions:
+                oldest = min(self._sessions.values(), key=lambda s: s.last_used)
+                del self._sessions[oldest.session_id]
+                self._evicted += 1
+            self._sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id: str) -> StreamingSession:
+        """按ID获取会话，不存在时抛出 SessionNotFoundError"""
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise SessionNotFoundError(session_id)
+        return session
+
+    def delete(self, session_id: str) -> None:
+        """删除会话，不存在时抛出 SessionNotFoundError"""
+        with self._lock:
+            if self._sessions.pop(session_id, None) is None:
+                raise SessionNotFoundError(session_id)
+
+    def _expire(self) -> None:
+        now = time.time()
+        for session_id, session in list(self._sessions.items()):
+            if now - session.last_used > self.ttl_seconds:
+                del self._sessions[session_id]
+                self._evicted += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "evicted": self._evicted,
+        }
+
+
+_manager_instance: Optional[StreamingSessionManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_session_manager() -> StreamingSessionManager:
+    """获取全局会话注册表（会话保存在API进程内存中）"""
+    global _manager_instance
+    if _manager_instance is None:
+        with _manager_lock:
+            if _manager_instance is None:
+                _manager_instance = StreamingSessionManager(
+                    max_sessions=settings.stream_max_sessions,
+                    ttl_seconds=settings.stream_session_ttl_seconds,
+                )
+    return _manager_instance
+
+
+def peek_session_manager() -> Optional[StreamingSessionManager]:
+    """返回已创建的会话注册表，不触发创建"""
+    return _manager_instance
@@ -0,0 +1,90 @@
+"""
+Meridian ML Service - 嵌入向量二进制传输
+请求中的base64/原始字节缓冲区直接解码为NumPy数组，响应中的嵌入直接从NumPy缓冲区编码，
+避免JSON浮点数组的解析、装箱与序列化开销
+"""
+
+import base64
+import binascii
+import io
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# 传输格式一律为小端字节序；float32 在小端主机上可直接作为视图使用，无需复制
+EMBEDDING_DTYPES = {
+    'float32': np.dtype('<f4'),
+    'float16': np.dtype('<f2'),
+    'int8': np.dtype('i1'),
+}
+
+# int8 量化的默认缩放系数：q = round(x * 127)，适用于分量落在 [-1, 1] 的归一化嵌入
+DEFAULT_INT8_SCALE = 1.0 / 127.0
+
+
+def decode_embedding_buffer(
+    data: Union[str, bytes, bytearray, memoryview],
+    shape: Sequence[int],
+    dtype: str = 'float32',
+    scale: Optional[float] = None
+) -> np.ndarray:
+    """把嵌入缓冲区解码为 (n, dim) 的float32矩阵
+
+    data 为base64字符串或原始字节。float32 返回直接指向解码后字节的只读视图；
+    float16 与 int8 需要转换为float32（聚类与UMAP只接受float32），各复制一次。
+    int8 按 x = q * scale 反量化，scale 为空时使用 1/127。
+    """
+    if dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"不支持的嵌入数据类型: {dtype}，可选 {sorted(EMBEDDING_DTYPES)}")
+    if len(shape) != 2 or shape[0] <= 0 or shape[1] <= 0:
+        raise ValueError(f"shape 必须是两个正整数 [n, dim]，实际为 {list(shape)}")
+
+    if isinstance(data, str):
+        try:
+            raw = base64.b64decode(data, validate=True)
+        except (binascii.Error, ValueError) as e:
+            raise ValueError(f"嵌入缓冲区不是合法的base64: {e}")
+    else:
+        raw = data
+
+    wire_dtype = EMBEDDING_DTYPES[dtype]
+    n, dim = int(shape[0]), int(shape[1])
+    expected = n * dim * wire_dtype.itemsize
+    if len(raw) != expected:
+        raise ValueError(f"嵌入缓冲区长度 {len(raw)} 字节与 shape {[n, dim]} / {dtype} 不符（应为 {expected} 字节）")
+
+    vectors = np.frombuffer(raw, dtype=wire_dtype).reshape(n, dim)
+    if dtype == 'int8':
+        matrix = vectors.astype(np.float32)
+        matrix *= np.float32(DEFAULT_INT8_SCALE if scale is None else scale)
+        return matrix
+    # 小端主机上 '<f4' 即原生float32，不复制
+    return vectors.astype(np.float32, copy=False)
+
+
+def quantize_embeddings(embeddings: np.ndarray, dtype: str = 'float32') -> Tuple[np.ndarray, Optional[float]]:
+    """把float32嵌入矩阵转换为传输数据类型，返回 (按行连续的小端数组, int8缩放系数)
+
+    int8 按整个矩阵的最大绝对值缩放：q = round(x / scale)，scale = max|x| / 127，
+    接收方以 x = q * scale 反量化（与 decode_embedding_buffer 的约定一致）。
+    """
+    if dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"不支持的嵌入数据类型: {dtype}，可选 {sorted(EMBEDDING_DTYPES)}")
+    if dtype == 'int8':
+        peak = float(np.max(np.abs(embeddings))) if embeddings.size else 0.0
+        scale = peak / 127.0 if peak > 0 else DEFAULT_INT8_SCALE
+        quantized = np.rint(embeddings / np.float32(scale))
+        return np.ascontiguousarray(quantized, dtype=EMBEDDING_DTYPES['int8']), scale
+    return np.ascontiguousarray(embeddings, dtype=EMBEDDING_DTYPES[dtype]), None
+
+
+def encode_base64(vectors: np.ndarray) -> str:
+    """直接从NumPy缓冲区编码base64（不经过Python列表）"""
+    return base64.b64encode(memoryview(vectors).cast('B')).decode('ascii')
+
+
+def encode_npy(vectors: np.ndarray) -> bytes:
+    """编码为 .npy 格式（np.load 可直接读取）"""
+    buffer = io.BytesIO()
+    np.lib.format.write_array(buffer, vectors, allow_pickle=False)
+    return buffer.getvalue()
@@ -0,0 +1,9 @@
+"""
+pytest 配置：把服务根目录加入 sys.path，使单元测试可以直接导入 src 包
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
@@ -0,0 +1,71 @@
+"""
+嵌入缓存单元测试：磁盘层的键核对、读写互斥、多实例共享目录，以及缓存键与文本的对应关系
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from src import cache
+from src.cache import DiskEmbeddingStore, EmbeddingCache
+
+
+def digest(i: int) -> bytes:
+    return bytes([i % 256]) * 32
+
+
+def vectors(n: int, start: int = 0) -> np.ndarray:
+    return np.arange(start, start + n, dtype=np.float32)[:, None] * np.ones((1, 4), dtype=np.float32)
+
+
+def test_overwritten_row_is_a_miss(tmp_path):
+    store = DiskEmbeddingStore(tmp_path, capacity=4)
+    store.put_many([digest(1)], vectors(1))
+
+    # 另一个实例（模拟另一个进程）写满环形缓冲区，覆盖第0行
+    other = DiskEmbeddingStore(tmp_path, capacity=4)
+    other.put_many([digest(i) for i in range(10, 14)], vectors(4, start=10))
+
+    assert store.get_many([digest(1)])[0] is None
+    np.testing.assert_array_equal(other.get_many([digest(10)])[0], vectors(1, start=10)[0])
+
+
+@pytest.mark.skipif(not cache.FCNTL_AVAILABLE, reason="需要 fcntl 文件锁")
+def test_read_waits_for_concurrent_write(tmp_path):
+    store = DiskEmbeddingStore(tmp_path, capacity=4)
+    store.put_many([digest(1)], vectors(1, start=1))
+    other = DiskEmbeddingStore(tmp_path, capacity=4)
+
+    results = []
+    with other._locked():
+        # 另一个进程正在写入：读取必须等到写锁释放
+        reader = threading.Thread(target=lambda: results.append(store.get_many([digest(1)])[0]))
+        reader.start()
+        reader.join(timeout=0.5)
+        assert reader.is_alive()
+    reader.join(timeout=5)
+    np.testing.assert_array_equal(results[0], vectors(1, start=1)[0])
+
+
+def test_second_writer_does_not_truncate_or_overwrite(tmp_path):
+    first = DiskEmbeddingStore(tmp_path, capacity=8)
+    second = DiskEmbeddingStore(tmp_path, capacity=8)
+
+    first.put_many([digest(1), digest(2)], vectors(2, start=1))
+    # second 在 first 写入前打开目录，首次写入不能截断文件，也要从磁盘上的游标继续
+    second.put_many([digest(3)], vectors(1, start=3))
+
+    np.testing.assert_array_equal(first.get_many([digest(1)])[0], vectors(1, start=1)[0])
+    np.testing.assert_array_equal(first.get_many([digest(2)])[0], vectors(1, start=2)[0])
+    reopened = DiskEmbeddingStore(tmp_path, capacity=8)
+    assert len(reopened) == 3
+    np.testing.assert_array_equal(reopened.get_many([digest(3)])[0], vectors(1, start=3)[0])
+
+
+def test_cache_key_distinguishes_exact_text():
+    cache = EmbeddingCache(model_name="m", memory_entries=10)
+    key = cache.make_key("hello  world", None, 512, True)
+    assert key == cache.make_key("hello  world", None, 512, True)
+    assert key != cache.make_key("hello world", None, 512, True)
+    assert key != cache.make_key("hello  world", "query: ", 512, True)
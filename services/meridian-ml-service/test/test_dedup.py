@@ -0,0 +1,83 @@
+"""
+近重复折叠单元测试：大于近邻数的重复组、与精确贪心分组的一致性，以及结果展开
+"""
+
+import numpy as np
+
+from src.clustering import _DEDUP_NEIGHBORS, collapse_near_duplicates, expand_collapsed_result
+
+THRESHOLD = 0.97
+
+
+def duplicated_embeddings(group_sizes, n_singletons=100, dim=64, seed=0):
+    """每组为同一向量加微小扰动（组内余弦相似度远高于阈值），另有互不相似的单点"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for size in group_sizes:
+        base = rng.normal(size=dim)
+        rows.append(base + rng.normal(scale=0.01, size=(size, dim)))
+    rows.append(rng.normal(size=(n_singletons, dim)))
+    embeddings = np.vstack(rows).astype(np.float32)
+    return embeddings[rng.permutation(len(embeddings))]
+
+
+def greedy_reference(embeddings, threshold):
+    """按输入顺序贪心分组，邻域取全部相似度达到阈值的点"""
+    normed = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    within = 1.0 - normed @ normed.T <= 1.0 - threshold
+    owner = np.full(len(embeddings), -1)
+    for index in range(len(embeddings)):
+        if owner[index] < 0:
+            owner[index] = index
+            neighbors = np.flatnonzero(within[index])
+            owner[neighbors[owner[neighbors] < 0]] = index
+    return owner
+
+
+def test_groups_larger_than_neighbor_count_collapse_fully():
+    group_sizes = [3, _DEDUP_NEIGHBORS, 40, 90]
+    embeddings = duplicated_embeddings(group_sizes)
+
+    representatives, inverse = collapse_near_duplicates(embeddings, THRESHOLD)
+
+    assert len(representatives) == len(group_sizes) + 100
+    assert sorted(np.bincount(inverse))[-4:] == sorted(group_sizes)
+    owner = greedy_reference(embeddings, THRESHOLD)
+    np.testing.assert_array_equal(representatives[inverse], owner)
+
+
+def test_expand_collapsed_result_restores_items():
+    embeddings = duplicated_embeddings([5, 30], n_singletons=20, seed=1)
+    representatives, inverse = collapse_near_duplicates(embeddings, THRESHOLD)
+    n_reps = len(representatives)
+    rep_labels = np.arange(n_reps) % 3 - 1  # 含异常点 -1
+    rep_reduced = np.random.default_rng(1).normal(size=(n_reps, 2)).astype(np.float32)
+    rep_strengths = np.where(rep_labels >= 0, 0.8, 0.0).astype(np.float32)
+
+    def result():
+        return {
+            "cluster_labels": rep_labels.copy(),
+            "reduced_embeddings": rep_reduced.copy(),
+            "membership_strengths": rep_strengths.copy(),
+            "clustering_stats": {"n_samples": n_reps, "dbcv_score": 0.5},
+        }
+
+    expanded = expand_collapsed_result(result(), inverse)
+    np.testing.assert_array_equal(expanded["cluster_labels"], rep_labels[inverse])
+    np.testing.assert_array_equal(expanded["reduced_embeddings"], rep_reduced[inverse])
+    np.testing.assert_array_equal(expanded["membership_strengths"], rep_strengths[inverse])
+    assert expanded["item_indices"] is None
+    stats = expanded["clustering_stats"]
+    assert stats["n_samples"] == len(embeddings)
+    assert stats["duplicates_collapsed"] == len(embeddings) - n_reps
+    assert stats["n_outliers"] == int(np.sum(rep_labels[inverse] == -1))
+    labels, sizes = np.unique(rep_labels[inverse][rep_labels[inverse] >= 0], return_counts=True)
+    assert stats["cluster_sizes"] == dict(zip(labels.tolist(), sizes.tolist()))
+    assert stats["dbcv_score"] == 0.5
+
+    trimmed = expand_collapsed_result(result(), inverse, remove_outliers=True)
+    keep = np.flatnonzero(rep_labels[inverse] != -1)
+    np.testing.assert_array_equal(trimmed["item_indices"], keep)
+    np.testing.assert_array_equal(trimmed["cluster_labels"], rep_labels[inverse][keep])
+    np.testing.assert_array_equal(trimmed["membership_strengths"], rep_strengths[inverse][keep])
+    assert trimmed["clustering_stats"]["duplicates_collapsed"] == len(embeddings) - n_reps
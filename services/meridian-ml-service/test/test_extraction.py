@@ -0,0 +1,94 @@
+"""
+AI Worker 数据提取单元测试：整批解析与逐项解析结果一致，不符合模式的输入回退到逐项解析
+"""
+
+import copy
+
+import numpy as np
+import pytest
+
+from src.pipeline import extract_ai_worker_bulk, extract_ai_worker_per_item
+
+DIM = 384
+
+
+def embedding_items(n_items: int = 20):
+    rng = np.random.default_rng(0)
+    items = []
+    for i in range(n_items):
+        item = {"id": i, "embedding": rng.normal(size=DIM).tolist()}
+        if i % 3:
+            item.update(title=f"Title {i}", url=f"https://example.com/{i}", publish_date="2025-01-01")
+        if i % 4 == 0:
+            item["status"] = "PROCESSED"
+        items.append(item)
+    return items
+
+
+def article_items(n_items: int = 20):
+    rng = np.random.default_rng(1)
+    return [
+        {
+            "id": 1000 + i,
+            "title": f"Title {i}",
+            "content": "正文 " * (i * 40),
+            "url": f"https://example.com/{i}",
+            "embedding": rng.normal(size=DIM).tolist(),
+            "publishDate": "2025-01-01T00:00:00Z",
+            "status": "PROCESSED",
+            **({"contentFileKey": f"key-{i}", "processedAt": "2025-01-02"} if i % 2 else {}),
+        }
+        for i in range(n_items)
+    ]
+
+
+@pytest.mark.parametrize("data_type,make_items", [
+    ("ai_worker_embedding", embedding_items),
+    ("ai_worker_article", article_items),
+])
+def test_bulk_matches_per_item(data_type, make_items):
+    items = make_items()
+    bulk = extract_ai_worker_bulk(items, data_type)
+    assert bulk is not None
+    matrix, texts, metadata = bulk
+    expected_matrix, expected_texts, expected_metadata = extract_ai_worker_per_item(items, data_type)
+
+    assert matrix.dtype == expected_matrix.dtype == np.float32
+    np.testing.assert_array_equal(matrix, expected_matrix)
+    assert texts == expected_texts
+    assert len(metadata) == len(expected_metadata)
+    assert list(metadata) == expected_metadata
+
+
+def with_change(items, index, **changes):
+    items = copy.deepcopy(items)
+    for key, value in changes.items():
+        if value is KeyError:
+            del items[index][key]
+        else:
+            items[index][key] = value
+    return items
+
+
+@pytest.mark.parametrize("data_type,items", [
+    ("ai_worker_embedding", with_change(embedding_items(), 3, id=True)),
+    ("ai_worker_embedding", with_change(embedding_items(), 3, id="3")),
+    ("ai_worker_embedding", with_change(embedding_items(), 5, embedding=[0.1] * (DIM - 1))),
+    ("ai_worker_embedding", with_change(embedding_items(), 0, embedding=np.zeros(DIM).tolist()[:10])),
+    ("ai_worker_embedding", with_change(embedding_items(), 4, embedding=tuple([0.1] * DIM))),
+    ("ai_worker_embedding", with_change(embedding_items(), 2, embedding=KeyError)),
+    ("ai_worker_embedding", with_change(embedding_items(), 1, title=7)),
+    ("ai_worker_article", with_change(article_items(), 6, url=KeyError)),
+    ("ai_worker_article", with_change(article_items(), 6, content=KeyError)),
+    ("ai_worker_article", with_change(article_items(), 6, status=None)),
+    ("ai_worker_article", with_change(article_items(), 6, content=123)),
+    ("ai_worker_article", with_change(article_items(), 6, id=False)),
+])
+def test_bulk_falls_back_on_nonconforming_items(data_type, items):
+    assert extract_ai_worker_bulk(items, data_type) is None
+
+
+def test_bulk_falls_back_on_non_dict_items():
+    assert extract_ai_worker_bulk([], "ai_worker_embedding") is None
+    items = embedding_items(3)
+    assert extract_ai_worker_bulk(items[:2] + [list(items[2].items())], "ai_worker_embedding") is None
@@ -0,0 +1,59 @@
+"""
+_HdbscanSweep 回归测试：复用单链接树得到的标签与归属强度必须与 hdbscan.HDBSCAN.fit 完全一致
+"""
+
+import itertools
+
+import hdbscan
+import numpy as np
+import pytest
+from sklearn.datasets import make_blobs
+
+from src import clustering
+from src.clustering import _HdbscanSweep
+
+MIN_SAMPLES = [1, 3, 5, 10]
+MIN_CLUSTER_SIZES = [5, 10, 25]
+EPSILONS = [0.0, 0.3, 1.0]
+
+
+@pytest.fixture(scope="module")
+def reduced_data():
+    """带噪声点、密度不一的低维数据（类似UMAP降维后的输入）"""
+    blobs, _ = make_blobs(
+        n_samples=400, centers=6, n_features=5, cluster_std=[0.3, 0.5, 0.8, 1.0, 0.4, 1.5], random_state=7
+    )
+    noise = np.random.default_rng(7).uniform(blobs.min(), blobs.max(), size=(40, 5))
+    return np.vstack([blobs, noise]).astype(np.float32)
+
+
+def reference(data, min_cluster_size, min_samples, epsilon):
+    clusterer = hdbscan.HDBSCAN(
+        min_cluster_size=min_cluster_size, min_samples=min_samples,
+        cluster_selection_epsilon=epsilon, metric="euclidean"
+    ).fit(data)
+    return clusterer.labels_, clusterer.probabilities_
+
+
+def assert_grid_matches(sweep, data):
+    for min_samples, min_cluster_size, epsilon in itertools.product(MIN_SAMPLES, MIN_CLUSTER_SIZES, EPSILONS):
+        labels, probabilities = sweep.labels(min_cluster_size, min_samples, epsilon)
+        expected_labels, expected_probabilities = reference(data, min_cluster_size, min_samples, epsilon)
+        params = (min_samples, min_cluster_size, epsilon)
+        np.testing.assert_array_equal(labels, expected_labels, err_msg=f"labels {params}")
+        np.testing.assert_allclose(probabilities, expected_probabilities, rtol=1e-12, err_msg=f"probabilities {params}")
+
+
+def test_sweep_matches_full_fit(reduced_data):
+    sweep = _HdbscanSweep(reduced_data, metric="euclidean")
+    assert_grid_matches(sweep, reduced_data)
+    if clustering.TREE_RELABEL_AVAILABLE:
+        # 每个 min_samples 只完整拟合一次
+        assert sorted(sweep._trees) == MIN_SAMPLES
+
+
+def test_sweep_without_tree_relabel_falls_back_to_full_fit(reduced_data, monkeypatch):
+    monkeypatch.setattr(clustering, "TREE_RELABEL_AVAILABLE", False)
+    sweep = _HdbscanSweep(reduced_data, metric="euclidean")
+    assert_grid_matches(sweep, reduced_data)
+    assert sweep._trees == {}
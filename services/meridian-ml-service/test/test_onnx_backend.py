@@ -0,0 +1,59 @@
+"""
+ONNX导出单元测试：产物原子落盘，导出中途失败不会留下被当作完成的残缺文件
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+
+from src import onnx_backend
+from src.onnx_backend import OnnxEmbeddingModel, export_onnx_model, onnx_model_path
+
+pytest.importorskip("onnxruntime")
+
+
+class TinyEncoder(torch.nn.Module):
+    """与 transformers 编码器调用方式一致的最小模型"""
+
+    def __init__(self):
+        super().__init__()
+        self.embed = torch.nn.Embedding(100, 8)
+        self.proj = torch.nn.Linear(8, 8)
+
+    def forward(self, input_ids, attention_mask):
+        hidden = self.proj(self.embed(input_ids)) * attention_mask.unsqueeze(-1)
+        return SimpleNamespace(last_hidden_state=hidden)
+
+
+def tokenizer(texts, return_tensors="pt"):
+    return {
+        "input_ids": torch.tensor([[1, 2, 3, 4]] * len(texts)),
+        "attention_mask": torch.ones((len(texts), 4), dtype=torch.int64),
+    }
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_export_leaves_only_final_files(tmp_path, quantize):
+    path = export_onnx_model(tokenizer, TinyEncoder().eval(), tmp_path, quantize)
+
+    assert path == onnx_model_path(tmp_path, quantize)
+    assert not list(tmp_path.glob("*.tmp*"))
+    output = OnnxEmbeddingModel(path)(**tokenizer(["a", "b"])).last_hidden_state
+    assert output.shape == (2, 4, 8)
+    assert np.isfinite(output.numpy()).all()
+
+
+def test_failed_export_does_not_leave_target(tmp_path, monkeypatch):
+    def crash(model, args, path, **kwargs):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+        raise RuntimeError("killed mid-export")
+
+    monkeypatch.setattr(onnx_backend.torch.onnx, "export", crash)
+    with pytest.raises(RuntimeError):
+        export_onnx_model(tokenizer, TinyEncoder().eval(), tmp_path, quantize=False)
+
+    assert not onnx_model_path(tmp_path, quantize=False).exists()
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,183 @@
+"""
+聚类管道单元测试（向量输入，不需要嵌入模型）
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+from sklearn.datasets import make_blobs
+
+from src.pipeline import UnsupportedConfigurationError, process_clustering_request, resolve_clustering_config
+from src.schemas import BaseClusteringConfig, OptimizationConfig
+
+
+def make_items(n_items: int, seed: int = 0):
+    embeddings, _ = make_blobs(n_samples=n_items, centers=5, n_features=384, cluster_std=0.6, random_state=seed)
+    return [
+        {"id": i, "embedding": vector.astype(np.float32).tolist(), "title": f"Title {i}", "content": f"Content {i}"}
+        for i, vector in enumerate(embeddings)
+    ]
+
+
+@pytest.mark.parametrize("config,optimization", [
+    (BaseClusteringConfig(partitioning="kmeans", persist_model=True), None),
+    (BaseClusteringConfig(partitioning="kmeans"), OptimizationConfig(enabled=True)),
+])
+def test_partitioning_rejects_unsupported_options(config, optimization):
+    with pytest.raises(UnsupportedConfigurationError):
+        asyncio.run(process_clustering_request(
+            items=make_items(60), config=config, optimization=optimization, data_type="vectors"
+        ))
+
+
+@pytest.mark.parametrize("fields,expected", [
+    ({}, ("pca", 32)),
+    ({"pre_reduction_dim": 100}, ("pca", 100)),
+    ({"pre_reduction": "random_projection"}, ("random_projection", 32)),
+    ({"pre_reduction": "none", "pre_reduction_dim": 64}, ("none", 64)),
+])
+def test_preset_fills_only_unset_pre_reduction_fields(fields, expected):
+    internal_config, _, _ = resolve_clustering_config(BaseClusteringConfig(preset="fast", **fields))
+    assert (internal_config["pre_reduction"], internal_config["pre_reduction_dim"]) == expected
+
+
+# ----------------------------------------------------------------------------
+# response_mode=compact：ids / cluster_labels / membership_strengths 按项目对齐
+# ----------------------------------------------------------------------------
+
+N_BASE, N_DUPLICATES = 300, 50
+
+
+@pytest.fixture
+def thread_executor(monkeypatch):
+    """聚类在线程池中运行，使替换的聚类函数生效（进程池会在子进程中重新导入模块）"""
+    from src import executors
+    from src.config import settings
+    monkeypatch.setattr(settings, "clustering_executor", "thread")
+    monkeypatch.setattr(executors, "_clustering_executor", None)
+    yield
+    if executors._clustering_executor is not None:
+        executors._clustering_executor.shutdown()
+
+
+@pytest.fixture
+def labeled_items():
+    """300 个互不相似的向量（每 10 个中 1 个为异常点）加 50 个完全重复的副本（新ID）
+
+    返回 (items, 每个嵌入对应的 (标签, 归属强度))；副本与原项目的嵌入相同，应得到相同的标签与强度。
+    """
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(N_BASE, 384)).astype(np.float32)
+    labels = np.where(np.arange(N_BASE) % 10 == 0, -1, np.arange(N_BASE) % 4)
+    strengths = np.where(labels >= 0, rng.uniform(0.1, 1.0, N_BASE), 0.0).astype(np.float32)
+    items = [
+        {"id": i, "embedding": embeddings[i].tolist(), "title": f"Title {i}"} for i in range(N_BASE)
+    ] + [
+        {"id": 10_000 + i, "embedding": embeddings[i].tolist(), "title": f"Title {i}"} for i in range(N_DUPLICATES)
+    ]
+    truth = {embeddings[i].tobytes(): (int(labels[i]), float(strengths[i])) for i in range(N_BASE)}
+    return items, truth
+
+
+@pytest.fixture
+def fake_clustering(monkeypatch, thread_executor, labeled_items):
+    """用按嵌入查表的确定性聚类替代UMAP+HDBSCAN，其余管道（折叠、展开、移除异常点、结果构建）照常运行"""
+    from src import pipeline
+    from src.clustering import _build_clustering_result
+
+    _, truth = labeled_items
+
+    def cluster_embeddings(embeddings, config, persist_model=False):
+        rows = [truth[np.asarray(row, dtype=np.float32).tobytes()] for row in embeddings]
+        labels = np.array([label for label, _ in rows], dtype=np.int64)
+        strengths = np.array([strength for _, strength in rows], dtype=np.float32)
+        return _build_clustering_result(
+            len(embeddings), np.asarray(embeddings)[:, :2], labels, config, None,
+            membership_strengths=strengths
+        )
+
+    monkeypatch.setattr(pipeline, "cluster_embeddings", cluster_embeddings)
+
+
+def run_request(items, config, response_mode):
+    return asyncio.run(process_clustering_request(
+        items=items, config=config, data_type="vectors", response_mode=response_mode
+    ))
+
+
+@pytest.mark.parametrize("remove_outliers,deduplicate", [(True, False), (False, True), (True, True)])
+def test_compact_arrays_stay_aligned(labeled_items, fake_clustering, remove_outliers, deduplicate):
+    items, truth = labeled_items
+    config = BaseClusteringConfig(remove_outliers=remove_outliers, deduplicate=deduplicate)
+    result = run_request(items, config, "compact")
+
+    ids = list(result["ids"])
+    labels = np.asarray(result["cluster_labels"])
+    strengths = np.asarray(result["membership_strengths"])
+    assert len(ids) == len(labels) == len(strengths)
+
+    expected = {item["id"]: truth[np.asarray(item["embedding"], dtype=np.float32).tobytes()] for item in items}
+    kept = [item_id for item_id, (label, _) in expected.items() if label >= 0 or not remove_outliers]
+    assert sorted(ids) == sorted(kept)
+    for item_id, label, strength in zip(ids, labels.tolist(), strengths.tolist()):
+        assert (label, strength) == pytest.approx(expected[item_id])
+    if remove_outliers:
+        assert -1 not in labels
+
+    stats = result["clustering_stats"]
+    assert stats.n_samples == len(items)
+    assert stats.n_outliers == sum(label == -1 for label, _ in expected.values())
+    if deduplicate:
+        assert stats.duplicates_collapsed == N_DUPLICATES
+    summaries = {cluster.cluster_id: cluster for cluster in result["clusters"]}
+    for cluster_id, cluster in summaries.items():
+        members = labels == cluster_id
+        assert cluster.size == int(members.sum())
+        assert cluster.mean_membership == pytest.approx(float(strengths[members].mean()), rel=1e-6)
+        # 代表内容来自该簇成员的文本
+        member_titles = {f"Title {item_id if item_id < 10_000 else item_id - 10_000}"
+                         for item_id, member in zip(ids, members) if member}
+        assert set(cluster.representative_content) <= member_titles
+
+
+@pytest.mark.parametrize("remove_outliers,deduplicate", [(True, False), (True, True)])
+def test_full_items_match_compact(labeled_items, fake_clustering, remove_outliers, deduplicate):
+    items, _ = labeled_items
+    config = BaseClusteringConfig(remove_outliers=remove_outliers, deduplicate=deduplicate)
+    compact = run_request(items, config, "compact")
+    full = run_request(items, config, "full")
+
+    compact_labels = dict(zip(compact["ids"], np.asarray(compact["cluster_labels"]).tolist()))
+    full_labels = {
+        item["metadata"]["id"]: cluster.cluster_id for cluster in full["clusters"] for item in cluster.items
+    }
+    assert full_labels == compact_labels
+    for cluster in full["clusters"]:
+        for item in cluster.items:
+            assert item["metadata"]["id"] == items[item["index"]]["id"]
+
+
+def test_optimization_keeps_outliers_with_or_without_dedup(labeled_items, fake_clustering, monkeypatch):
+    """参数优化路径使用默认聚类配置（不移除异常点）；开启近重复折叠不应改变这一点"""
+    from src import pipeline
+    from src.clustering import ClusteringConfig
+
+    fake_cluster_embeddings = pipeline.cluster_embeddings
+
+    def cluster_embeddings_with_optimization(embeddings, use_optimization, grid_config, persist_model=False):
+        result = fake_cluster_embeddings(embeddings, ClusteringConfig(), persist_model)
+        result['optimization'] = {'used': True}
+        return result
+
+    monkeypatch.setattr(pipeline, "cluster_embeddings_with_optimization", cluster_embeddings_with_optimization)
+    items, _ = labeled_items
+    ids = {}
+    for deduplicate in (False, True):
+        result = asyncio.run(process_clustering_request(
+            items=items, config=BaseClusteringConfig(remove_outliers=True, deduplicate=deduplicate),
+            optimization=OptimizationConfig(enabled=True), data_type="vectors", response_mode="compact"
+        ))
+        ids[deduplicate] = sorted(result["ids"])
+
+    assert ids[False] == ids[True] == sorted(item["id"] for item in items)
@@ -0,0 +1,55 @@
+"""
+relative_validity 评分器（参数搜索的默认评分器）与 hdbscan 的 HDBSCAN.relative_validity_ 的一致性测试
+"""
+
+import itertools
+
+import hdbscan
+import numpy as np
+import pytest
+from sklearn.datasets import make_blobs
+
+from src.clustering import _HdbscanSweep, _relative_validity_score
+
+GRID = list(itertools.product([2, 5, 10], [5, 15, 40], [0.0, 4.0]))
+
+
+@pytest.fixture(scope="module")
+def reduced_data():
+    """大小与密度差异明显的簇加均匀噪声，网格中不同参数得到不同的分数"""
+    blobs, _ = make_blobs(
+        n_samples=[120, 80, 40, 20, 12, 8], n_features=4, cluster_std=[0.5, 0.8, 0.3, 0.3, 0.2, 0.2],
+        center_box=(-6, 6), random_state=3
+    )
+    noise = np.random.default_rng(3).uniform(blobs.min(), blobs.max(), size=(30, 4))
+    return np.vstack([blobs, noise]).astype(np.float32)
+
+
+def fit(data, min_samples, min_cluster_size, epsilon):
+    return hdbscan.HDBSCAN(
+        min_cluster_size=min_cluster_size, min_samples=min_samples, cluster_selection_epsilon=epsilon,
+        metric="euclidean", gen_min_span_tree=True
+    ).fit(data)
+
+
+@pytest.mark.parametrize("min_samples,min_cluster_size,epsilon", GRID)
+def test_matches_hdbscan_relative_validity(reduced_data, min_samples, min_cluster_size, epsilon):
+    clusterer = fit(reduced_data, min_samples, min_cluster_size, epsilon)
+    if clusterer.labels_.max() < 0:
+        pytest.skip("全部为噪声，hdbscan 不定义 relative_validity_")
+
+    score = _relative_validity_score(
+        reduced_data, clusterer.labels_, clusterer.minimum_spanning_tree_.to_numpy()
+    )
+    assert score == pytest.approx(clusterer.relative_validity_, rel=1e-9, abs=1e-12)
+
+
+def test_sweep_scores_match_full_fit(reduced_data):
+    """参数扫描复用同一 min_samples 的最小生成树评分，结果与每个组合单独拟合一致"""
+    sweep = _HdbscanSweep(reduced_data, metric="euclidean", scorer="relative_validity")
+    for min_samples, min_cluster_size, epsilon in GRID:
+        evaluation = sweep.evaluate(min_cluster_size, min_samples, epsilon)
+        clusterer = fit(reduced_data, min_samples, min_cluster_size, epsilon)
+        if evaluation is None:
+            continue
+        assert evaluation["score"] == pytest.approx(clusterer.relative_validity_, rel=1e-9, abs=1e-12)
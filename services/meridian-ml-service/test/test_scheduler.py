@@ -0,0 +1,78 @@
+"""
+EmbeddingBatchScheduler 单元测试：合并批次的结果切片与失败后的逐请求重试
+（用假推理函数替代模型，不需要下载嵌入模型）
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from src import scheduler as scheduler_module
+from src.scheduler import EmbeddingBatchScheduler
+
+
+def fake_embeddings(texts, model_components):
+    """每条文本的嵌入为 [len(text), 首字符编码]，便于核对切片"""
+    if any(text == "boom" for text in texts):
+        raise RuntimeError("bad text")
+    return np.array([[len(text), ord(text[0])] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """替换推理函数，记录每次推理收到的文本"""
+    recorded = []
+
+    def compute(texts, model_components):
+        recorded.append(list(texts))
+        return fake_embeddings(texts, model_components)
+
+    async def run_inline(fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+    monkeypatch.setattr(scheduler_module, "compute_embeddings", compute)
+    monkeypatch.setattr(scheduler_module, "run_inference", run_inline)
+    return recorded
+
+
+async def submit_all(scheduler, requests):
+    return await asyncio.gather(*(scheduler.submit(texts) for texts in requests), return_exceptions=True)
+
+
+def test_merged_batch_is_sliced_per_request(calls):
+    requests = [["a", "bb"], ["ccc"], ["dddd", "e", "ff"]]
+    scheduler = EmbeddingBatchScheduler(model_components=None, max_batch_size=64, max_wait_ms=20)
+
+    results = asyncio.run(submit_all(scheduler, requests))
+
+    assert calls == [[text for texts in requests for text in texts]]
+    for texts, result in zip(requests, results):
+        np.testing.assert_array_equal(result, fake_embeddings(texts, None))
+    stats = scheduler.stats()
+    assert stats["batches"] == 1 and stats["requests"] == 3 and stats["texts"] == 6
+    assert stats["retried_requests"] == 0
+
+
+def test_failed_batch_retries_each_request(calls):
+    requests = [["a", "bb"], ["boom"], ["ccc"]]
+    scheduler = EmbeddingBatchScheduler(model_components=None, max_batch_size=64, max_wait_ms=20)
+
+    results = asyncio.run(submit_all(scheduler, requests))
+
+    # 一次合并推理失败，随后每个请求各推理一次
+    assert calls == [["a", "bb", "boom", "ccc"], ["a", "bb"], ["boom"], ["ccc"]]
+    np.testing.assert_array_equal(results[0], fake_embeddings(["a", "bb"], None))
+    assert isinstance(results[1], RuntimeError)
+    np.testing.assert_array_equal(results[2], fake_embeddings(["ccc"], None))
+    assert scheduler.stats()["retried_requests"] == 3
+
+
+def test_single_request_failure_is_not_retried(calls):
+    scheduler = EmbeddingBatchScheduler(model_components=None, max_batch_size=64, max_wait_ms=1)
+
+    results = asyncio.run(submit_all(scheduler, [["boom"]]))
+
+    assert calls == [["boom"]]
+    assert isinstance(results[0], RuntimeError)
+    assert scheduler.stats()["retried_requests"] == 0
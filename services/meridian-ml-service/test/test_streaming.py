@@ -0,0 +1,65 @@
+"""
+流式聚类单元测试：微簇合并后的文章定位，以及初始拟合失败时保留缓冲的文章
+"""
+
+import numpy as np
+import pytest
+from sklearn.datasets import make_blobs
+
+from src import model_store, streaming
+from src.model_store import ClusterModelStore
+from src.streaming import MicroClusterSet, StreamingConfig, StreamingSession
+
+
+def scanned_slots(micro_clusters):
+    """逐个扫描成员列表得到的 文章ID -> 微簇下标"""
+    return {member: index for index, members in enumerate(micro_clusters.members) for member in members}
+
+
+def test_slot_index_tracks_merges():
+    rng = np.random.default_rng(0)
+    micro_clusters = MicroClusterSet(dim=3, capacity=8, absorb_radius=0.05)
+    for item_id in range(500):
+        slot = micro_clusters.insert(item_id, rng.normal(size=3))
+        assert micro_clusters.slot_of[item_id] == slot
+
+    assert micro_clusters.merges > 50
+    assert micro_clusters.slot_of == scanned_slots(micro_clusters)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ClusterModelStore(directory=tmp_path, memory_entries=4, max_models=4)
+    monkeypatch.setattr(model_store, "_store_instance", store)
+    return store
+
+
+def test_failed_bootstrap_keeps_pending_items(store, monkeypatch):
+    embeddings, _ = make_blobs(n_samples=120, centers=3, n_features=16, cluster_std=0.5, random_state=1)
+    embeddings = embeddings.astype(np.float32)
+    session = StreamingSession("s", StreamingConfig(bootstrap_size=40, consolidate_every=1000, max_micro_clusters=10))
+
+    real_cluster_embeddings = streaming.cluster_embeddings
+    monkeypatch.setattr(streaming, "cluster_embeddings", lambda *args, **kwargs: {"model_id": None})
+    assert session.add(list(range(30)), embeddings[:30])["labels"] is None
+    # 拟合失败不是请求错误：文章已缓冲，按未初始化返回
+    assert session.add(list(range(30, 60)), embeddings[30:60])["labels"] is None
+
+    assert not session.ready
+    assert session.stats()["n_pending"] == 60
+    assert session.membership() == {-1: list(range(60))}
+
+    # 维度不一致的批次直接拒绝，不进入缓冲
+    with pytest.raises(ValueError):
+        session.add([999], np.zeros((1, 8), dtype=np.float32))
+    assert session.stats()["n_pending"] == 60
+
+    monkeypatch.setattr(streaming, "cluster_embeddings", real_cluster_embeddings)
+    result = session.add(list(range(60, 120)), embeddings[60:120])
+
+    assert session.ready
+    # 只返回本批文章的标签，与缓冲文章拼接后的标签尾部一致
+    assert len(result["labels"]) == 60
+    assert result["labels"] == [session.micro_clusters.labels[session.micro_clusters.slot_of[i]] for i in range(60, 120)]
+    assert session.stats()["n_pending"] == 0
+    assert sorted(member for members in session.membership().values() for member in members) == list(range(120))